@@ -2,6 +2,13 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The recipe and tag views are async under ASGI and run their queries in a
+bounded pool of threads (core.async_api). Serve it with uvicorn:
+
+    uvicorn app.asgi:application --lifespan off --host 0.0.0.0 --port 8000
+
+or with `python -m app.asgi`, configured by the ASGI_HOST, ASGI_PORT and
+ASGI_WORKERS environment variables.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -12,5 +19,19 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('ASYNC_API', '1')
 
 application = get_asgi_application()
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    # Django 3.2 doesn't implement the lifespan protocol
+    uvicorn.run(
+        'app.asgi:application',
+        host=os.environ.get('ASGI_HOST', '127.0.0.1'),
+        port=int(os.environ.get('ASGI_PORT', 8000)),
+        workers=int(os.environ.get('ASGI_WORKERS', 1)),
+        lifespan='off',
+    )
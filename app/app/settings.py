@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -81,13 +83,65 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL=1 reuses the connections from a bounded pool of the process
+# (core.db_pool), DB_CONN_MAX_AGE keeps one per thread instead
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db_pool' if os.environ.get('DB_POOL') == '1'
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 1800)
+            ),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+            'CHECK_IDLE': float(os.environ.get('DB_POOL_CHECK_IDLE', 10)),
+        },
+    }
+}
+
+# Replicas of the default database read by the recipe, tag and user views,
+# DB_REPLICA_HOSTS=host[:port],... (core.replicas)
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5)),
+    'CACHE_ALIAS': 'default',
+}
+for index, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port,
+        # The tests read the test database through the replicas
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS['ALIASES'].append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -138,6 +192,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Fail the requests which run more queries than the budget of their view
+QUERY_BUDGETS_ENFORCED = DEBUG
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Default page size of the cursor paginated lists (recipe.pagination)
+    'PAGE_SIZE': 50,
+    # JSON with orjson when it's installed, same output as the DRF classes
+    # (core.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+# Cache of the authentication tokens (core.authentication)
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': None,
+}
+
+# Per-user cache of the recipe and tag lists (core.cache) - The writes of a
+# process only invalidate the lists of the others through a shared cache, so
+# it's only on by default with CACHE_BACKEND
+LIST_CACHE = {
+    'ENABLED': os.environ.get(
+        'LIST_CACHE', '1' if os.environ.get('CACHE_BACKEND') else '0',
+    ) == '1',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Pool hashing the passwords off the request workers (core.hashing)
+PASSWORD_HASHING = {
+    'EXECUTOR': os.environ.get('PASSWORD_HASHING_EXECUTOR', 'process'),
+    'MAX_WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 0)) or None,
+    'MAX_PENDING': 16,
+    'ADMISSION_TIMEOUT': 0.5,
+}
+
+# Async recipe and tag views under ASGI, turned on by app.asgi
+# (core.async_api)
+ASYNC_API = {
+    'ENABLED': os.environ.get('ASYNC_API') == '1',
+    'MAX_WORKERS': int(os.environ.get('ASYNC_API_WORKERS', 16)),
+}
+
+# Server-Timing headers and Prometheus histograms of the recipe and user
+# views, served on /api/metrics/ (core.metrics)
+METRICS = {
+    'ENABLED': os.environ.get('METRICS', '1') == '1',
+    'SERVER_TIMING': os.environ.get('METRICS_SERVER_TIMING', '1') == '1',
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+}
+
+# PAGE_SIZE is only used by the views which set a pagination_class
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
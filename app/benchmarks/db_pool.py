@@ -0,0 +1,98 @@
+"""
+    Benchmark of the pooled database backend
+
+    Runs --requests short "requests" (connect, one query, close as Django
+    does at the end of a request) from --threads threads with the PostgreSQL
+    backend, which opens a connection for each of them, and with the pooled
+    one (core.db_pool). Run it from the app directory:
+
+        python -m benchmarks.db_pool --requests 2000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.db import connections  # noqa: E402
+from django.db.utils import load_backend  # noqa: E402
+
+from core.db_pool import close_pools, get_pool_stats  # noqa: E402
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(engine, requests, threads, pool_size):
+    """ Return the latencies and throughput of the requests """
+    settings_dict = {
+        **connections['default'].settings_dict,
+        'ENGINE': engine,
+        'POOL': {'MAX_SIZE': pool_size},
+    }
+    backend = load_backend(engine)
+
+    def request(_):
+        start = time.perf_counter()
+        wrapper = backend.DatabaseWrapper(settings_dict, alias='benchmark')
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM core_tag WHERE id < 100')
+            cursor.fetchone()
+        wrapper.close()
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = sorted(executor.map(request, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests_per_s': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    report = {
+        'new connection': measure(
+            'django.db.backends.postgresql', args.requests, args.threads,
+            args.pool_size,
+        ),
+        'pooled': measure(
+            'core.db_pool', args.requests, args.threads, args.pool_size,
+        ),
+    }
+    report['pooled']['pool'] = get_pool_stats()['benchmark:' + (
+        connections['default'].settings_dict['NAME']
+    )]
+    close_pools()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{args.requests} requests, {args.threads} threads')
+    print(f'{"":<16}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for name, row in report.items():
+        print(
+            f'{name:<16}{row["requests_per_s"]:>10.0f}'
+            f'{row["p50_ms"]:>10.2f}{row["p99_ms"]:>10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
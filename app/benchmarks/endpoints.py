@@ -0,0 +1,399 @@
+"""
+    Benchmark of every endpoint of the API on a reproducible dataset
+
+    Creates --users users with --recipes recipes each, --tags-per-recipe tags
+    per recipe drawn from a vocabulary of --vocabulary tags per user, all
+    drawn from a random generator seeded with --seed: the same options give
+    the same data. The dataset is kept for the next runs with the same
+    options and replaced otherwise.
+
+    Every endpoint is then requested --requests times in turn for the users,
+    in the process through the Django test client with the middleware and
+    without a server or network (python -m benchmarks.load measures those).
+    Reports the throughput and the latency percentiles of each endpoint. The
+    writes are undone afterwards: the created recipes are deleted and the
+    updated recipes and tags restored. Run it from the app directory against
+    a database made for it:
+
+        python -m benchmarks.endpoints --output before.json
+        git checkout other-branch
+        python -m benchmarks.endpoints --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core.models import Recipe, Tag, User  # noqa: E402
+
+EMAIL = 'endpoints-benchmark-{}@example.com'
+
+PASSWORD = 'benchmark-pass'
+
+
+def dataset_name(options):
+    """ Name of the dataset, stored in the name of its users """
+    return 'endpoints-benchmark ' + ' '.join(
+        f'{key}={value}' for key, value in sorted(options.items())
+    )
+
+
+def load_dataset(users, recipes, tags_per_recipe, vocabulary, seed):
+    """
+    Create the dataset of the options unless it exists - Return the users,
+    with their token key, tags and recipe ids
+    """
+    name = dataset_name({
+        'users': users, 'recipes': recipes,
+        'tags_per_recipe': tags_per_recipe, 'vocabulary': vocabulary,
+        'seed': seed,
+    })
+    existing = User.objects.filter(email__in=[
+        EMAIL.format(i) for i in range(users)
+    ])
+    if existing.filter(name=name).count() != users:
+        create_dataset(
+            name, users, recipes, tags_per_recipe, vocabulary, seed,
+        )
+
+    dataset = []
+    for user in User.objects.filter(name=name).order_by('email'):
+        dataset.append({
+            'user': user,
+            'token': Token.objects.get(user=user).key,
+            'tags': list(
+                Tag.objects.filter(user=user).order_by('id')
+                .values_list('id', 'name')
+            ),
+            'recipes': list(
+                Recipe.objects.filter(user=user).order_by('id')
+                .values_list('id', flat=True)
+            ),
+        })
+    return dataset
+
+
+def create_dataset(name, users, recipes, tags_per_recipe, vocabulary, seed):
+    """ Replace the users of the benchmark and their data """
+    rng = random.Random(seed)
+    # A single hash, the hasher is slow on purpose
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        User.objects.filter(
+            email__startswith='endpoints-benchmark-',
+        ).delete()
+        created = User.objects.bulk_create([
+            User(email=EMAIL.format(i), name=name, password=password)
+            for i in range(users)
+        ])
+        Token.objects.bulk_create([
+            Token(user=user, key=Token.generate_key()) for user in created
+        ])
+
+        for user in created:
+            tags = Tag.objects.get_or_create_many(
+                user, [f'Tag {i}' for i in range(vocabulary)],
+            )
+            user_recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=rng.randint(1, 180),
+                    price=Decimal(rng.randint(100, 10000)) / 100,
+                    link=f'https://example.com/{user.pk}/{i}',
+                    description=f'Description of the recipe {i}',
+                )
+                for i in range(recipes)
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in user_recipes
+                for tag in rng.sample(
+                    tags, min(tags_per_recipe, len(tags)),
+                )
+            ])
+            Tag.objects.refresh_recipe_counts([tag.id for tag in tags])
+
+
+def recipe_data(data, index):
+    """ Fields of a recipe, with two or one tags in turn """
+    names = [name for _, name in data['tags'][:2 - index % 2]]
+    return {
+        'title': f'Recipe {index % 2}',
+        'time_minutes': 30,
+        'price': '12.50',
+        'tags': [{'name': name} for name in names],
+    }
+
+
+# Name, method and function returning the path and body of the request
+ENDPOINTS = [
+    ('recipe-list', 'get',
+     lambda data, index: (reverse('recipe:recipe-list'), None)),
+    ('recipe-detail', 'get', lambda data, index: (
+        reverse('recipe:recipe-detail', args=[
+            data['recipes'][index % len(data['recipes'])],
+        ]),
+        None,
+    )),
+    ('recipe-create', 'post', lambda data, index: (
+        reverse('recipe:recipe-list'), recipe_data(data, index),
+    )),
+    ('recipe-update', 'patch', lambda data, index: (
+        reverse('recipe:recipe-detail', args=[data['recipes'][0]]),
+        recipe_data(data, index),
+    )),
+    ('tag-list', 'get',
+     lambda data, index: (reverse('recipe:tag-list'), None)),
+    ('tag-update', 'patch', lambda data, index: (
+        reverse('recipe:tag-detail', args=[data['tags'][0][0]]),
+        {'name': data['tags'][0][1] + ('' if index % 2 else ' 2')},
+    )),
+    ('token', 'post', lambda data, index: (
+        reverse('user:token'),
+        {'email': data['user'].email, 'password': PASSWORD},
+    )),
+    ('me', 'get', lambda data, index: (reverse('user:me'), None)),
+]
+
+
+def run_endpoint(client, dataset, method, request, count, warmup):
+    """ Send the requests - Return the latencies and the errors """
+    latencies = []
+    errors = 0
+    for index in range(warmup + count):
+        data = dataset[index % len(dataset)]
+        path, body = request(data, index // len(dataset))
+        kwargs = {'HTTP_AUTHORIZATION': f'Token {data["token"]}'}
+        if body is not None:
+            kwargs['data'] = json.dumps(body)
+            kwargs['content_type'] = 'application/json'
+
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        if index >= warmup:
+            latencies.append(elapsed)
+            errors += response.status_code >= 400
+    return latencies, errors
+
+
+def snapshot(dataset):
+    """ Return the state of the recipes and tags the updates change """
+    recipes = Recipe.objects.filter(
+        id__in=[data['recipes'][0] for data in dataset],
+    ).prefetch_related('tags')
+    tags = Tag.objects.filter(
+        id__in=[data['tags'][0][0] for data in dataset],
+    )
+    return [
+        (recipe, list(recipe.tags.all())) for recipe in recipes
+    ], list(tags)
+
+
+def restore(dataset, state):
+    """ Undo the writes of the benchmark """
+    recipes, tags = state
+    with transaction.atomic():
+        # The recipes of recipe-create
+        Recipe.objects.filter(
+            user__in=[data['user'] for data in dataset],
+        ).exclude(id__in=[
+            recipe_id for data in dataset for recipe_id in data['recipes']
+        ]).delete()
+        for recipe, recipe_tags in recipes:
+            recipe.save()
+            recipe.tags.set(recipe_tags)
+        for tag in tags:
+            tag.save()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summary(latencies, errors):
+    total = sum(latencies)
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'requests_per_s': len(latencies) / total,
+        'mean_ms': total / len(latencies) * 1000,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'errors': errors,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """ Return the report of the benchmark """
+    dataset = load_dataset(
+        args.users, args.recipes, args.tags_per_recipe, args.vocabulary,
+        args.seed,
+    )
+    state = snapshot(dataset)
+
+    overrides = {'DEBUG': False, 'ALLOWED_HOSTS': ['testserver']}
+    if args.no_list_cache:
+        overrides['LIST_CACHE'] = {'ENABLED': False}
+
+    results = {}
+    try:
+        with override_settings(**overrides):
+            client = Client()
+            for name, method, request in ENDPOINTS:
+                if args.endpoints and name not in args.endpoints:
+                    continue
+                latencies, errors = run_endpoint(
+                    client, dataset, method, request, args.requests,
+                    args.warmup,
+                )
+                results[name] = summary(latencies, errors)
+    finally:
+        restore(dataset, state)
+
+    return {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': {
+            'users': args.users,
+            'recipes_per_user': args.recipes,
+            'tags_per_recipe': args.tags_per_recipe,
+            'vocabulary': args.vocabulary,
+            'seed': args.seed,
+        },
+        'settings': {
+            'database_engine': settings.DATABASES['default']['ENGINE'],
+            'list_cache': not args.no_list_cache and settings.LIST_CACHE.get(
+                'ENABLED', True,
+            ),
+            'requests': args.requests,
+            'warmup': args.warmup,
+        },
+        'results': results,
+    }
+
+
+def print_report(report, baseline=None):
+    dataset = report['dataset']
+    print(
+        f'{dataset["users"]} users x {dataset["recipes_per_user"]} recipes '
+        f'x {dataset["tags_per_recipe"]} tags (vocabulary '
+        f'{dataset["vocabulary"]}, seed {dataset["seed"]}), '
+        f'{report["settings"]["requests"]} requests per endpoint'
+    )
+    if baseline is not None:
+        print(f'compared with {baseline.get("commit") or "the baseline"}')
+        if baseline['dataset'] != dataset:
+            print('warning: the datasets differ')
+
+    columns = ('req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms')
+    header = f'{"":<16}' + ''.join(f'{column:>10}' for column in columns)
+    header += f'{"errors":>8}'
+    if baseline is not None:
+        header += f'{"req/s %":>10}{"p50 %":>8}'
+    print(header)
+    for name, row in report['results'].items():
+        line = (
+            f'{name:<16}{row["requests_per_s"]:>10.0f}'
+            + ''.join(
+                f'{row[key]:>10.2f}'
+                for key in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')
+            )
+            + f'{row["errors"]:>8}'
+        )
+        base = (baseline or {}).get('results', {}).get(name)
+        if base:
+            line += (
+                f'{change(row["requests_per_s"], base["requests_per_s"]):>10}'
+                f'{change(row["p50_ms"], base["p50_ms"]):>8}'
+            )
+        print(line)
+
+
+def change(value, base):
+    return f'{(value - base) / base * 100:+.0f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument(
+        '--recipes', type=int, default=100, help='Recipes per user',
+    )
+    parser.add_argument('--tags-per-recipe', type=int, default=3)
+    parser.add_argument(
+        '--vocabulary', type=int, default=20, help='Tags per user',
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--requests', type=int, default=200, help='Requests per endpoint',
+    )
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument(
+        '--endpoints', nargs='+', choices=[name for name, _, _ in ENDPOINTS],
+    )
+    parser.add_argument(
+        '--no-list-cache', action='store_true',
+        help='Build the lists on every request',
+    )
+    parser.add_argument('--output', help='Write the results to this file')
+    parser.add_argument(
+        '--compare', help='Results of another run to compare with',
+    )
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+    Benchmark of the password hashing executors under mixed load
+
+    Login threads check passwords (the work of the token endpoint) while
+    reader threads render recipe lists (the work of the read endpoints), for
+    every executor of core.hashing. Run it from the app directory:
+
+        python -m benchmarks.hashing --duration 10 --logins 8 --readers 8
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.hashing import HashingBusy, HashingExecutor  # noqa: E402
+
+PASSWORD = 'benchmark-password'
+
+# A page of the recipe list as the serializers return it
+RECIPES = [
+    {
+        'id': i,
+        'title': f'Recipe {i}',
+        'time_minutes': 10 + i,
+        'price': Decimal('5.25'),
+        'link': 'https://example.com/recipe.pdf',
+        'tags': [{'id': t, 'name': f'Tag {t}'} for t in range(5)],
+    }
+    for i in range(50)
+]
+
+
+def run_mixed_load(executor, logins, readers, duration):
+    """ Run the login and reader threads and return their counters """
+    encoded = make_password(PASSWORD)
+    renderer = JSONRenderer()
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'logins': 0, 'rejected': 0, 'reads': 0, 'latencies': []}
+
+    def login():
+        while not stop.is_set():
+            try:
+                executor.check_password(PASSWORD, encoded)
+                key = 'logins'
+            except HashingBusy:
+                key = 'rejected'
+            with lock:
+                results[key] += 1
+
+    def read():
+        latencies = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            renderer.render(RECIPES)
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            results['reads'] += len(latencies)
+            results['latencies'].extend(latencies)
+
+    # Warm up the pool so the start of the workers isn't measured
+    executor.check_password(PASSWORD, encoded)
+
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(results.pop('latencies')) or [0.0]
+    return {
+        'logins_per_s': results['logins'] / duration,
+        'rejected_per_s': results['rejected'] / duration,
+        'reads_per_s': results['reads'] / duration,
+        'read_p50_ms': statistics.median(latencies) * 1000,
+        'read_p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    report = {}
+    for kind in ('inline', 'thread', 'process'):
+        executor = HashingExecutor(kind=kind, max_workers=args.workers)
+        try:
+            report[kind] = run_mixed_load(
+                executor, args.logins, args.readers, args.duration,
+            )
+        finally:
+            executor.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    columns = list(next(iter(report.values())))
+    print(f'{"executor":<10}' + ''.join(f'{c:>16}' for c in columns))
+    for kind, row in report.items():
+        print(f'{kind:<10}' + ''.join(f'{row[c]:>16.1f}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
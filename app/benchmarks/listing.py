@@ -0,0 +1,140 @@
+"""
+    Benchmark of the recipe list with and without the serializer
+
+    Loads --recipes recipes with 3 tags each for a user (once, they are kept
+    for the next runs), then builds the representation of a page and of all
+    of them with RecipeSerializer and with recipe.listing, with the queries
+    and with the recipes already loaded (recipe.listing still queries the
+    tags). Run it from the app directory against a database made for it:
+
+        python -m benchmarks.listing --recipes 10000
+
+    Measured on a development machine (1 CPU, PostgreSQL on localhost,
+    --repeat 30, three runs): a page of 50 recipes is 3.6 to 5.1x faster
+    with the queries and 2.6 to 3.3x with the recipes loaded, where
+    recipe.listing still runs the query of the tags. All the 10000 recipes
+    are 9.5 to 10.9x faster with the queries and about 3x loaded, but the
+    API serves at most 100 recipes per page. The query of the tags of 10000
+    recipes sometimes gets a plan on the tag index which takes a second
+"""
+
+import argparse
+import json
+import os
+import time
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Prefetch  # noqa: E402
+
+from core.models import Recipe, Tag, User  # noqa: E402
+from recipe.listing import recipe_rows  # noqa: E402
+from recipe.serializers import RecipeSerializer  # noqa: E402
+
+EMAIL = 'listing-benchmark@example.com'
+
+FIELDS = ['id', 'title', 'time_minutes', 'price', 'link']
+
+
+def load_recipes(count):
+    """ Create the user, its tags and the missing recipes """
+    user, _ = User.objects.get_or_create(email=EMAIL)
+    tags = Tag.objects.get_or_create_many(
+        user, [f'Tag {i}' for i in range(20)],
+    )
+    existing = Recipe.objects.filter(user=user).count()
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=i % 90,
+                price=Decimal(f'{i % 1000}.{i % 100:02d}'),
+                link=f'https://example.com/{i}',
+            )
+            for i in range(existing, count)
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for i, recipe in enumerate(recipes)
+            for tag in tags[i % 18:i % 18 + 3]
+        ])
+        Tag.objects.refresh_recipe_counts([tag.id for tag in tags])
+    return user
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def measure(user, size, repeat):
+    """ Return the milliseconds of both paths for size recipes """
+    queryset = Recipe.objects.filter(user=user).order_by('-id')[:size]
+    tags = Prefetch('tags', queryset=Tag.objects.order_by('id'))
+
+    def serializer():
+        return RecipeSerializer(
+            list(queryset.prefetch_related(tags)), many=True,
+        ).data
+
+    def values():
+        return recipe_rows(list(queryset.values(*FIELDS)))
+
+    if json.dumps(serializer()) != json.dumps(values()):
+        raise SystemExit('the representations differ')
+
+    # The recipes already loaded
+    instances = list(queryset.prefetch_related(tags))
+    rows = list(queryset.values(*FIELDS))
+    return {
+        'serializer_ms': best_time(serializer, repeat),
+        'values_ms': best_time(values, repeat),
+        'serializer_loaded_ms': best_time(
+            lambda: RecipeSerializer(instances, many=True).data, repeat,
+        ),
+        'values_loaded_ms': best_time(lambda: recipe_rows(rows), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    user = load_recipes(args.recipes)
+    report = {
+        f'{size} recipes': measure(user, size, args.repeat)
+        for size in (args.page_size, args.recipes)
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{"":<20}{"serializer":>12}{"values":>10}{"speedup":>10}')
+    for name, row in report.items():
+        for label, suffix in (('', '_ms'), (' (loaded)', '_loaded_ms')):
+            slow = row[f'serializer{suffix}']
+            fast = row[f'values{suffix}']
+            print(
+                f'{name + label:<20}{slow:>12.1f}{fast:>10.1f}'
+                f'{slow / fast:>9.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
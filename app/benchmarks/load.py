@@ -0,0 +1,282 @@
+"""
+    Load test of the recipe API under ASGI and WSGI
+
+    Loads --recipes recipes with their tags for a user (once, they are kept
+    for the next runs), starts the API under uvicorn (app.asgi, async views)
+    and under gunicorn (app.wsgi, threads) in turn, and keeps --connections
+    keep-alive connections busy on the recipe list, the tag list and the
+    recipe details for --duration seconds. Reports the throughput and the
+    latency percentiles of each server. Run it from the app directory
+    against a database made for it, gunicorn must be installed:
+
+        python -m benchmarks.load --connections 1000 --duration 30
+
+    or against a server already running with --url http://host:port
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from core.models import Recipe, Tag, User  # noqa: E402
+
+EMAIL = 'load-benchmark@example.com'
+
+
+def load_recipes(count):
+    """ Create the user, its token, its tags and the missing recipes """
+    user, _ = User.objects.get_or_create(email=EMAIL)
+    token, _ = Token.objects.get_or_create(user=user)
+    tags = Tag.objects.get_or_create_many(
+        user, [f'Tag {i}' for i in range(20)],
+    )
+    existing = Recipe.objects.filter(user=user).count()
+    with transaction.atomic():
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=i % 90,
+                price=Decimal(f'{i % 1000}.{i % 100:02d}'),
+                link=f'https://example.com/{i}',
+            )
+            for i in range(existing, count)
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for i, recipe in enumerate(recipes)
+            for tag in tags[i % 18:i % 18 + 3]
+        ])
+        Tag.objects.refresh_recipe_counts([tag.id for tag in tags])
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)[:100]
+    )
+    return token.key, recipe_ids
+
+
+def server_command(name, port, workers, threads):
+    """ Return the command starting the server name on the port """
+    bind = ['--host', '127.0.0.1', '--port', str(port)]
+    if name == 'asgi':
+        return [
+            sys.executable, '-m', 'uvicorn', 'app.asgi:application',
+            *bind, '--workers', str(workers), '--lifespan', 'off',
+            '--no-access-log', '--backlog', '4096',
+        ]
+    return [
+        sys.executable, '-m', 'gunicorn', 'app.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+        '--worker-class', 'gthread', '--threads', str(threads),
+        '--worker-connections', '4096', '--backlog', '4096',
+    ]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'the server exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'the server is not listening on {port}')
+
+
+async def read_response(reader):
+    """ Read an HTTP/1.1 response - Return its status and if it's the last """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+async def client(host, port, requests, index, stats, recording, deadline):
+    """ Send the requests in turn on a keep-alive connection """
+    connection = None
+    while time.monotonic() < deadline:
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(host, port)
+            reader, writer = connection
+            start = time.perf_counter()
+            writer.write(requests[index % len(requests)])
+            status, closed = await read_response(reader)
+            elapsed = time.perf_counter() - start
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats['errors'] += recording.is_set()
+            if connection is not None:
+                connection[1].close()
+                connection = None
+            await asyncio.sleep(0.1)
+            continue
+
+        index += 1
+        if closed:
+            connection[1].close()
+            connection = None
+        if recording.is_set():
+            stats['latencies'].append(elapsed)
+            stats['errors'] += status != 200
+
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_load(url, token, recipe_ids, connections, duration, warmup):
+    """ Return the stats of duration seconds of load after the warmup """
+    parts = urlsplit(url)
+    paths = ['/api/recipe/recipes/', '/api/recipe/tags/'] + [
+        f'/api/recipe/recipes/{recipe_id}/' for recipe_id in recipe_ids
+    ]
+    # The lists are requested as often as all the details together
+    paths = paths[:2] * max(1, len(paths) // 4) + paths[2:]
+    requests = [
+        (
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {parts.hostname}\r\n'
+            f'Authorization: Token {token}\r\n'
+            'Accept: application/json\r\n\r\n'
+        ).encode()
+        for path in paths
+    ]
+
+    stats = {'latencies': [], 'errors': 0}
+    recording = asyncio.Event()
+    deadline = time.monotonic() + warmup + duration
+    clients = [
+        asyncio.ensure_future(client(
+            parts.hostname, parts.port or 80, requests, index, stats,
+            recording, deadline,
+        ))
+        for index in range(connections)
+    ]
+    await asyncio.sleep(warmup)
+    recording.set()
+    await asyncio.gather(*clients)
+    return stats
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summary(stats, duration):
+    latencies = sorted(stats['latencies'])
+    if not latencies:
+        return {'requests_per_s': 0.0, 'errors': stats['errors']}
+    return {
+        'requests_per_s': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'errors': stats['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument(
+        '--servers', nargs='+', choices=['asgi', 'wsgi'],
+        default=['asgi', 'wsgi'],
+    )
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        '--threads', type=int, default=16,
+        help='Threads of every gunicorn worker',
+    )
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='Load this server instead')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    # A socket per connection, on both sides when the server is local
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    token, recipe_ids = load_recipes(args.recipes)
+    names = ['url'] if args.url else args.servers
+
+    report = {}
+    for name in names:
+        process = None
+        url = args.url
+        if url is None:
+            process = subprocess.Popen(
+                server_command(name, args.port, args.workers, args.threads),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            wait_for_port(args.port, process)
+            url = f'http://127.0.0.1:{args.port}'
+        try:
+            stats = asyncio.run(run_load(
+                url, token, recipe_ids, args.connections, args.duration,
+                args.warmup,
+            ))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        report[name] = summary(stats, args.duration)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f'{args.connections} connections, {args.duration:.0f}s, '
+        f'{args.workers} workers'
+    )
+    print(
+        f'{"":<8}{"req/s":>10}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}'
+        f'{"max ms":>10}{"errors":>10}'
+    )
+    for name, row in report.items():
+        print(
+            f'{name:<8}{row["requests_per_s"]:>10.0f}'
+            + ''.join(
+                f'{row.get(key, float("nan")):>10.1f}'
+                for key in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')
+            )
+            + f'{row["errors"]:>10}'
+        )
+
+
+if __name__ == '__main__':
+    main()
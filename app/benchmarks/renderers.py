@@ -0,0 +1,108 @@
+"""
+    Benchmark of the JSON renderers and parsers
+
+    Renders a list of --recipes recipes shaped like the responses of the
+    recipe list (prices as strings, nested tags) and the same list with
+    Decimal prices, with the DRF renderer and the orjson one, then parses
+    the rendered document with both parsers. Run it from the app directory:
+
+        python -m benchmarks.renderers --recipes 10000
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.renderers import ORJSONParser, ORJSONRenderer  # noqa: E402
+
+
+def make_recipes(count, price):
+    return [
+        {
+            'id': i,
+            'title': f'Recipe {i} à la crème',
+            'time_minutes': 10 + i % 50,
+            'price': price(i),
+            'link': f'https://example.com/recipes/{i}.pdf',
+            'tags': [
+                {'id': t, 'name': f'Tag {t}', 'recipe_count': t * 7}
+                for t in range(i % 5)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def throughput(fn, repeat):
+    """ Return the calls per second of fn, best of repeat """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1 / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    payloads = {
+        'string prices': make_recipes(
+            args.recipes, lambda i: f'{i % 1000}.{i % 100:02d}',
+        ),
+        'decimal prices': make_recipes(
+            args.recipes, lambda i: Decimal(f'{i % 1000}.{i % 100:02d}'),
+        ),
+    }
+
+    report = {}
+    for name, payload in payloads.items():
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+        body = drf.render(payload)
+        if fast.render(payload) != body:
+            raise SystemExit(f'{name}: the renderers output differs')
+        report[f'render {name}'] = {
+            'drf': throughput(lambda: drf.render(payload), args.repeat),
+            'orjson': throughput(lambda: fast.render(payload), args.repeat),
+        }
+
+    report['parse'] = {
+        'drf': throughput(
+            lambda: JSONParser().parse(io.BytesIO(body)), args.repeat,
+        ),
+        'orjson': throughput(
+            lambda: ORJSONParser().parse(io.BytesIO(body)), args.repeat,
+        ),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{args.recipes} recipes, {len(body) / 1024:.0f} KiB, documents/s')
+    print(f'{"":<24}{"drf":>10}{"orjson":>10}{"speedup":>10}')
+    for name, row in report.items():
+        print(
+            f'{name:<24}{row["drf"]:>10.1f}{row["orjson"]:>10.1f}'
+            f'{row["orjson"] / row["drf"]:>9.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
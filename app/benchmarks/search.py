@@ -0,0 +1,170 @@
+"""
+    Benchmark of the full-text search of recipes
+
+    Loads --rows recipes of random words spread over --users users (once,
+    they are kept for the next runs), then measures the latency of the
+    first and the next page of the search of a few terms, from the most
+    common to the rarest word, for a single user. Run it from the app
+    directory against a database made for it:
+
+        python -m benchmarks.search --rows 10000000 --users 1000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from core.models import Recipe, User  # noqa: E402
+from recipe.search import search_recipes  # noqa: E402
+
+EMAIL = 'search-benchmark-{}@example.com'
+
+# The first words are picked much more often than the last ones, like in
+# real text, so the terms cover a wide range of selectivities
+WORDS = [
+    'chicken', 'rice', 'tomato', 'garlic', 'onion', 'pasta', 'cheese',
+    'salad', 'soup', 'beef', 'potato', 'lemon', 'butter', 'curry', 'bean',
+    'mushroom', 'pepper', 'spinach', 'pork', 'bread', 'carrot', 'ginger',
+    'honey', 'lentil', 'salmon', 'apple', 'coconut', 'basil', 'chili',
+    'yogurt', 'almond', 'pumpkin', 'tofu', 'cabbage', 'shrimp', 'mint',
+    'avocado', 'fennel', 'chickpea', 'walnut', 'lime', 'cucumber', 'leek',
+    'quinoa', 'asparagus', 'saffron', 'tamarind', 'sorrel', 'quince',
+    'kohlrabi',
+]
+
+TERMS = ['chicken', 'garlic soup', 'mushroom', 'saffron', 'kohlrabi']
+
+INSERT_BATCH = 100000
+
+# 3 words of title and 12 of description per recipe - Referencing i in the
+# subqueries makes them run for every row
+INSERT_RECIPES = """
+    INSERT INTO core_recipe (
+        user_id, title, description, time_minutes, price, link, updated_at
+    )
+    SELECT
+        (%(users)s::bigint[])[1 + i %% cardinality(%(users)s::bigint[])],
+        array_to_string(ARRAY(
+            SELECT (%(words)s::text[])[1 + floor(
+                cardinality(%(words)s::text[]) * random() ^ 2)::int]
+            FROM generate_series(1, 3 + i * 0)
+        ), ' '),
+        array_to_string(ARRAY(
+            SELECT (%(words)s::text[])[1 + floor(
+                cardinality(%(words)s::text[]) * random() ^ 2)::int]
+            FROM generate_series(1, 12 + i * 0)
+        ), ' '),
+        10, 5.00, '', now()
+    FROM generate_series(%(start)s, %(stop)s - 1) AS i
+"""
+
+
+def load_recipes(rows, users):
+    """ Create the users and the missing recipes """
+    user_ids = []
+    for index in range(users):
+        user, _ = User.objects.get_or_create(email=EMAIL.format(index))
+        user_ids.append(user.pk)
+
+    existing = Recipe.objects.filter(user__in=user_ids).count()
+    started = time.monotonic()
+    for start in range(existing, rows, INSERT_BATCH):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(INSERT_RECIPES, {
+                'users': user_ids,
+                'words': WORDS,
+                'start': start,
+                'stop': min(start + INSERT_BATCH, rows),
+            })
+        print(
+            f'{min(start + INSERT_BATCH, rows)} recipes loaded '
+            f'({time.monotonic() - started:.0f}s)',
+            flush=True,
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE core_recipe')
+    return user_ids[0]
+
+
+def measure(user_id, term, page_size, repeat):
+    """ Return the latencies of the first and the next page of a search """
+    queryset = search_recipes(
+        Recipe.objects.filter(user_id=user_id), term,
+    ).order_by('-rank', '-id')
+
+    first = []
+    following = []
+    matches = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = list(queryset[:page_size])
+        first.append(time.perf_counter() - start)
+        if not page:
+            continue
+
+        # Keyset query of the next page, after the last (rank, id)
+        last = page[-1]
+        start = time.perf_counter()
+        list(queryset.filter(rank__lte=last.rank).exclude(
+            rank=last.rank, id__gte=last.id,
+        )[:page_size])
+        following.append(time.perf_counter() - start)
+    matches = queryset.count()
+
+    def ms(latencies):
+        latencies = sorted(latencies) or [0.0]
+        return {
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+        }
+
+    return {
+        'matches': matches,
+        'first_page': ms(first),
+        'next_page': ms(following),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    user_id = load_recipes(args.rows, args.users)
+    report = {
+        term: measure(user_id, term, args.page_size, args.repeat)
+        for term in TERMS
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{"term":<14}{"matches":>10}{"first p50":>12}{"first p99":>12}'
+          f'{"next p50":>12}{"next p99":>12}')
+    for term, row in report.items():
+        print(
+            f'{term:<14}{row["matches"]:>10}'
+            f'{row["first_page"]["p50_ms"]:>12.1f}'
+            f'{row["first_page"]["p99_ms"]:>12.1f}'
+            f'{row["next_page"]["p50_ms"]:>12.1f}'
+            f'{row["next_page"]["p99_ms"]:>12.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+    Benchmark of the tag filters of the recipe list
+
+    Loads --rows recipes for one user with up to 5 of --tags tags each (once,
+    they are kept for the next runs), then measures the latency of the
+    first page of the list filtered by 3 tags, matching any or all of them.
+    Run it from the app directory against a database made for it:
+
+        python -m benchmarks.tags --rows 1000000 --tags 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from core.models import Recipe, Tag, User  # noqa: E402
+from recipe.filters import ALL, ANY, filter_by_tags  # noqa: E402
+
+EMAIL = 'tags-benchmark@example.com'
+
+INSERT_BATCH = 100000
+
+INSERT_RECIPES = """
+    INSERT INTO core_recipe (
+        user_id, title, description, time_minutes, price, link, updated_at
+    )
+    SELECT %(user)s, 'Recipe ' || i, '', 10, 5.00, '', now()
+    FROM generate_series(%(start)s, %(stop)s - 1) AS i
+"""
+
+# Up to 5 tags per recipe, the first tags much more often than the last
+INSERT_RECIPE_TAGS = """
+    INSERT INTO core_recipe_tags (recipe_id, tag_id)
+    SELECT recipe.id, (%(tags)s::bigint[])[1 + floor(
+        cardinality(%(tags)s::bigint[]) * random() ^ 2)::int]
+    FROM core_recipe AS recipe
+    CROSS JOIN generate_series(1, 5) AS n
+    WHERE recipe.user_id = %(user)s AND recipe.id > %(after)s
+    ON CONFLICT DO NOTHING
+"""
+
+
+def load_recipes(rows, tags):
+    """ Create the user, the tags and the missing recipes """
+    user, _ = User.objects.get_or_create(email=EMAIL)
+    tag_ids = [
+        tag.id for tag in Tag.objects.get_or_create_many(
+            user, [f'Tag {index}' for index in range(tags)],
+        )
+    ]
+
+    existing = Recipe.objects.filter(user=user).count()
+    last_id = Recipe.objects.filter(user=user).order_by('-id').values_list(
+        'id', flat=True,
+    ).first() or 0
+    started = time.monotonic()
+    for start in range(existing, rows, INSERT_BATCH):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(INSERT_RECIPES, {
+                'user': user.pk,
+                'start': start,
+                'stop': min(start + INSERT_BATCH, rows),
+            })
+            cursor.execute(INSERT_RECIPE_TAGS, {
+                'user': user.pk,
+                'tags': tag_ids,
+                'after': last_id,
+            })
+            cursor.execute(
+                'SELECT max(id) FROM core_recipe WHERE user_id = %s',
+                [user.pk],
+            )
+            last_id = cursor.fetchone()[0]
+        print(
+            f'{min(start + INSERT_BATCH, rows)} recipes loaded '
+            f'({time.monotonic() - started:.0f}s)',
+            flush=True,
+        )
+
+    Tag.objects.refresh_recipe_counts(tag_ids)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE core_recipe')
+        cursor.execute('ANALYZE core_recipe_tags')
+    return user, tag_ids
+
+
+def measure(user, tag_ids, match, page_size, repeat):
+    """ Return the latencies of the first page of the filtered list """
+    queryset = filter_by_tags(
+        Recipe.objects.filter(user=user), tag_ids, match,
+    ).order_by('-id')
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset[:page_size])
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        'matches': queryset.count(),
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--tags', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    user, tag_ids = load_recipes(args.rows, args.tags)
+    cases = {
+        'common': tag_ids[:3],
+        'mixed': [tag_ids[0], tag_ids[len(tag_ids) // 2], tag_ids[-1]],
+        'rare': tag_ids[-3:],
+    }
+    report = {
+        f'{name} {match}': measure(
+            user, ids, match, args.page_size, args.repeat,
+        )
+        for name, ids in cases.items()
+        for match in (ANY, ALL)
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f'{"tags":<14}{"matches":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for name, row in report.items():
+        print(
+            f'{name:<14}{row["matches"]:>10}'
+            f'{row["p50_ms"]:>10.1f}{row["p99_ms"]:>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+    Async views of the API reads under ASGI
+
+    Django 3.2 has no async ORM, so the async views run the DRF views in a
+    bounded pool of threads with a database connection each: the event loop
+    keeps thousands of client connections open while at most MAX_WORKERS
+    requests use the database, instead of a thread per client connection.
+
+    The views are made async only by the ASGI entry point (app.asgi), which
+    turns on the ASYNC_API setting. Under WSGI an async view would start an
+    event loop for every request
+"""
+
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.urls import URLPattern
+
+from core.query_budget import QueryCounter
+
+DEFAULT_ASYNC_API = {
+    # Serve the views of async_patterns() asynchronously
+    'ENABLED': False,
+    # Threads running the views, each one opens its own database connection
+    'MAX_WORKERS': 16,
+}
+
+
+def get_async_api_config():
+    """ Return the ASYNC_API setting with the defaults """
+    return {**DEFAULT_ASYNC_API, **getattr(settings, 'ASYNC_API', {})}
+
+
+class DatabaseExecutor:
+    """ Run the blocking database work of the async views in threads """
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """ Create the executor configured in the ASYNC_API setting """
+        return cls(max_workers=get_async_api_config()['MAX_WORKERS'])
+
+    def _get_pool(self):
+        # The pool is started on the first use, not when Django loads
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='db',
+                )
+            return self._pool
+
+    @staticmethod
+    def _call(fn, args, kwargs):
+        # Same as the request_started and request_finished signals do for
+        # the connections of the request thread
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    def submit(self, fn, *args, **kwargs):
+        """ Start fn(*args, **kwargs) in the pool and return its future """
+        context = contextvars.copy_context()
+        return self._get_pool().submit(
+            context.run, self._call, fn, args, kwargs,
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        """ Run fn(*args, **kwargs) in the pool and return its result """
+        loop = asyncio.get_running_loop()
+        # The context variables (active language...) follow the call
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._get_pool(),
+            functools.partial(context.run, self._call, fn, args, kwargs),
+        )
+
+    def shutdown(self):
+        """ Stop the pool, it's started again on the next use """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_executor = None
+
+
+def get_database_executor():
+    """ Return the database executor of the process """
+    global _executor
+    if _executor is None:
+        _executor = DatabaseExecutor.from_settings()
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_database_executor(setting, **kwargs):
+    """ Rebuild the executor when the tests change its settings """
+    global _executor
+    if setting == 'ASYNC_API' and _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def threaded_iterator(iterable, buffer_size=2):
+    """
+    Iterate over the iterable in a thread of the database executor, at most
+    buffer_size items ahead
+
+    Django 3.2 iterates the streaming responses on the event loop under
+    ASGI, where the queries raise SynchronousOnlyOperation. The iterable is
+    consumed by a single thread, a server-side cursor stays on its
+    connection. Waiting for the next item blocks the event loop, the items
+    should be large chunks read ahead of the client
+    """
+    items = queue.Queue(buffer_size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        # Until the response is closed, if the client goes away
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as error:
+            put((done, error))
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    get_database_executor().submit(produce)
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def async_view(view):
+    """
+    Return an async version of the view, which runs it in the database
+    executor - The response is rendered there as well, the lazy querysets
+    of the data can run queries
+    """
+    def call(request, *args, **kwargs):
+        with QueryCounter() as counter:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+        # Checked by QueryBudgetMiddleware, which only sees the queries of
+        # the event loop thread
+        request._query_count = counter.count
+        return response
+
+    # The attributes of the DRF views (cls, actions, csrf_exempt...) are
+    # copied by wraps
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await get_database_executor().run(
+            call, request, *args, **kwargs,
+        )
+
+    return wrapper
+
+
+def async_patterns(patterns, names):
+    """ Return the URL patterns with the views of the given names async """
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,222 @@
+"""
+    Authentication for the APIs
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    # Number of tokens kept in the memory of every process
+    'MAX_SIZE': 10000,
+    # Seconds a token is trusted without checking the database
+    'TTL': 60,
+    # Optional alias of a CACHES backend shared by all the processes
+    'CACHE_ALIAS': None,
+}
+
+
+# Values of a token and of its user - The cache never hands out the same
+# objects twice, a request changing its user doesn't change the others
+CachedToken = namedtuple(
+    'CachedToken', ['key', 'created', 'user_id', 'db', 'user_fields'],
+)
+
+
+def freeze_token(token):
+    """ Return the values of the token and its user to cache """
+    user = token.user
+    return CachedToken(
+        key=token.key,
+        created=token.created,
+        user_id=token.user_id,
+        db=user._state.db,
+        user_fields={
+            field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+        },
+    )
+
+
+def thaw_token(cached):
+    """ Return a new token with a new user from the cached values """
+    user = Token.user.field.related_model(**cached.user_fields)
+    token = Token(key=cached.key, user=user, created=cached.created)
+    for instance in (user, token):
+        instance._state.adding = False
+        instance._state.db = cached.db
+    return token
+
+
+class TokenCache:
+    """
+    LRU cache with expiration of token key -> Token (with its user loaded)
+
+    The tokens are kept in the memory of the process and, if a cache alias is
+    given, in a Django cache shared by all the processes. Only the values of
+    the tokens and their users are kept, every get() returns new objects.
+    Entries are removed by the signals in core.signals when the token is
+    deleted or the user is saved or deleted. The TTL bounds how long other
+    processes can keep using a removed token from their own memory
+    """
+
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size=10000, ttl=60, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = caches[cache_alias] if cache_alias else None
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        """ Create the cache configured in the TOKEN_AUTH_CACHE setting """
+        config = {
+            **DEFAULT_TOKEN_AUTH_CACHE,
+            **getattr(settings, 'TOKEN_AUTH_CACHE', {}),
+        }
+        return cls(
+            max_size=config['MAX_SIZE'],
+            ttl=config['TTL'],
+            cache_alias=config['CACHE_ALIAS'],
+        )
+
+    def _shared_key(self, key):
+        # The token keys are credentials, don't store them in plain text
+        return self.key_prefix + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """ Return the cached token or None """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return thaw_token(token)
+                self._remove(key)
+
+        token = None
+        if self.shared is not None:
+            token = self.shared.get(self._shared_key(key))
+
+        with self._lock:
+            if token is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, token, now)
+        return thaw_token(token)
+
+    def set(self, key, token):
+        """ Cache the token """
+        token = freeze_token(token)
+        with self._lock:
+            self._store(key, token, time.monotonic())
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), token, self.ttl)
+
+    def delete(self, key):
+        """ Remove the token from the cache """
+        with self._lock:
+            self._remove(key)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+    def delete_user(self, user_id, keys=()):
+        """
+        Remove the tokens of the user - The keys known by the other processes
+        must be given to remove them from the shared cache
+        """
+        with self._lock:
+            keys = set(keys) | self._user_keys.get(user_id, set())
+            for key in keys:
+                self._remove(key)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """ Remove every token from the memory of the process """
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self):
+        """ Return the hit and miss counters of the process """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+            }
+
+    def _store(self, key, token, now):
+        """ Add the cached token to the memory - The lock must be held """
+        self._remove(key)
+        self._entries[key] = (token, now + self.ttl)
+        self._user_keys.setdefault(token.user_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        """ Remove the token from the memory - The lock must be held """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_keys = self._user_keys.get(entry[0].user_id)
+            if user_keys is not None:
+                user_keys.discard(key)
+                if not user_keys:
+                    del self._user_keys[entry[0].user_id]
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """ Return the token cache of the process """
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache.from_settings()
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    """ Rebuild the token cache when the tests change its settings """
+    global _token_cache
+    if setting in ('TOKEN_AUTH_CACHE', 'CACHES'):
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication which avoids the token and user query for the tokens
+    seen recently - Drop-in replacement of TokenAuthentication
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        token = cache.get(key)
+        if token is None:
+            # Raises AuthenticationFailed for unknown keys and inactive users
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, token)
+
+        return (token.user, token)
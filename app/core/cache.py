@@ -0,0 +1,176 @@
+"""
+    Per-user cache of the list responses
+
+    The data of the recipe and tag lists is stored in the Django cache under
+    a key with the user, the kind of list, the URL and a version of the data
+    of the user. Any change of a recipe, a tag or the tags of a recipe bumps
+    the version (see core.signals) so the old entries are never read again
+    and expire by themselves
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from rest_framework.response import Response
+
+DEFAULT_LIST_CACHE = {
+    'ENABLED': True,
+    # Alias of the CACHES backend storing the lists
+    'CACHE_ALIAS': 'default',
+    # Seconds a list is kept
+    'TIMEOUT': 300,
+}
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+
+
+class ListCache:
+    """ Cache of the list responses of every user """
+
+    key_prefix = 'list-cache'
+
+    def __init__(self, cache_alias='default', timeout=300):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    @classmethod
+    def from_settings(cls):
+        """ Create the cache configured in the LIST_CACHE setting """
+        config = {**DEFAULT_LIST_CACHE, **getattr(settings, 'LIST_CACHE', {})}
+        if not config['ENABLED']:
+            return None
+        return cls(
+            cache_alias=config['CACHE_ALIAS'],
+            timeout=config['TIMEOUT'],
+        )
+
+    def _version_key(self, kind, user_id):
+        return f'{self.key_prefix}:{kind}:{user_id}:version'
+
+    def _version(self, kind, user_id):
+        key = self._version_key(kind, user_id)
+        version = self.cache.get(key)
+        if version is None:
+            # A version evicted from the cache must not start again from a
+            # number used before, the old entries could still be there
+            version = time.time_ns()
+            if not self.cache.add(key, version, None):
+                version = self.cache.get(key, version)
+        return version
+
+    def _key(self, kind, request):
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        version = self._version(kind, request.user.pk)
+        return f'{self.key_prefix}:{kind}:{request.user.pk}:{version}:{url}'
+
+    def _count(self, kind, counter):
+        with self._lock:
+            counters = self._counters.setdefault(kind, {'hits': 0,
+                                                        'misses': 0})
+            counters[counter] += 1
+
+    def get(self, kind, request):
+        """ Return the cached data of the list or None """
+        data = self.cache.get(self._key(kind, request))
+        self._count(kind, 'misses' if data is None else 'hits')
+        return data
+
+    def set(self, kind, request, data, timeout=None):
+        """ Cache the data of the list, for timeout seconds if given """
+        self.cache.set(
+            self._key(kind, request),
+            data,
+            self.timeout if timeout is None else timeout,
+        )
+
+    def invalidate(self, user_id, *kinds):
+        """
+        Make the cached lists of the user stale - Done now and again when the
+        transaction commits, so a list read before the commit and cached
+        after the first bump isn't served afterwards
+        """
+        def bump():
+            for kind in kinds:
+                key = self._version_key(kind, user_id)
+                try:
+                    self.cache.incr(key)
+                except ValueError:
+                    # Not cached, the next read starts a new version
+                    pass
+
+        bump()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(bump)
+
+    def stats(self):
+        """ Return the hits, misses and hit rate of every kind of list """
+        with self._lock:
+            stats = {}
+            for kind, counters in self._counters.items():
+                lookups = counters['hits'] + counters['misses']
+                stats[kind] = {
+                    **counters,
+                    'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+                }
+            return stats
+
+
+_list_cache = None
+_configured = False
+
+
+def get_list_cache():
+    """ Return the list cache of the process or None if it's disabled """
+    global _list_cache, _configured
+    if not _configured:
+        _list_cache = ListCache.from_settings()
+        _configured = True
+    return _list_cache
+
+
+@receiver(setting_changed)
+def reset_list_cache(setting, **kwargs):
+    """ Rebuild the list cache when the tests change its settings """
+    global _configured
+    if setting in ('LIST_CACHE', 'CACHES'):
+        _configured = False
+
+
+def invalidate_lists(user_id, *kinds):
+    """ Make the cached lists of the user stale """
+    cache = get_list_cache()
+    if cache is not None:
+        cache.invalidate(user_id, *kinds)
+
+
+class CachedListMixin:
+    """
+    Serve the list action from the list cache - The views set list_cache_kind
+    to the kind of data of the list (RECIPES or TAGS)
+    """
+
+    list_cache_kind = None
+
+    def list(self, request, *args, **kwargs):
+        cache = get_list_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+
+        data = cache.get(self.list_cache_kind, request)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(self.list_cache_kind, request, response.data)
+        return response
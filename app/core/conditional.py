@@ -0,0 +1,100 @@
+"""
+    Conditional GET (ETag / Last-Modified) for the API views
+
+    The views describe the state of the data of a response with a cheap query
+    on the updated_at columns, so a client which already has that version of
+    the data gets a 304 without running the queryset or the serializer
+"""
+
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def collections_state(user, *models):
+    """
+    Return (last modified, version) of the rows of the models owned by the
+    user with a single query - The counts are part of the version so deleting
+    a row changes it too
+    """
+    annotations = {}
+    for index, model in enumerate(models):
+        rows = model.objects.filter(
+            user=OuterRef('pk'),
+        ).order_by().values('user')
+        annotations[f'count_{index}'] = Subquery(
+            rows.annotate(count=Count('pk')).values('count')
+        )
+        annotations[f'last_{index}'] = Subquery(
+            rows.annotate(last=Max('updated_at')).values('last')
+        )
+
+    state = get_user_model().objects.filter(
+        pk=user.pk,
+    ).values(**annotations).get()
+    last_modified = max(
+        (value for key, value in state.items()
+         if key.startswith('last_') and value is not None),
+        default=None,
+    )
+    return last_modified, sorted(state.items())
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag and Last-Modified to the list and retrieve responses and answer
+    If-None-Match / If-Modified-Since with a 304
+
+    The views implement get_conditional_state(), which returns None (no
+    conditional response) or (last modified, version) where version is any
+    value whose repr changes when the response would change
+    """
+
+    def get_conditional_state(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        # A deleted row doesn't change the last modification of a list, so
+        # only the ETag is checked
+        return self._conditional(
+            super().list, False, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(
+            super().retrieve, True, request, *args, **kwargs
+        )
+
+    def _conditional(self, handler, check_modified, request, *args, **kwargs):
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        last_modified, version = state
+        # The query string (pages, filters) and the requested format change
+        # the content as well
+        etag = quote_etag(hashlib.md5(repr((
+            version,
+            request.user.pk,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        )).encode()).hexdigest())
+        timestamp = None
+        if last_modified is not None:
+            timestamp = int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp if check_modified else None,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,26 @@
+"""
+    PostgreSQL backend with a pool of connections per process
+
+    Django opens a connection for every request when CONN_MAX_AGE is 0 and
+    keeps one per thread forever otherwise. With this backend the connection
+    closed by Django at the end of a request goes back to a bounded pool and
+    the next request of any thread reuses it, so a spike waits for a free
+    connection instead of opening more than max_connections:
+
+        DATABASES = {
+            'default': {
+                'ENGINE': 'core.db_pool',
+                ...
+                'POOL': {'MAX_SIZE': 20, 'TIMEOUT': 5},
+            }
+        }
+
+    See core.db_pool.pool for the options and get_pool_stats() for the
+    saturation metrics
+"""
+
+from core.db_pool.pool import (  # noqa: F401
+    PoolTimeout,
+    close_pools,
+    get_pool_stats,
+)
@@ -0,0 +1,81 @@
+"""
+    Database wrapper of the pooled PostgreSQL backend
+"""
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation
+
+from core.db_pool.pool import (
+    DEFAULT_POOL,
+    ConnectionPool,
+    close_pools,
+    get_pool,
+)
+
+
+class PooledDatabaseCreation(DatabaseCreation):
+    """ Close the pooled connections before dropping a test database """
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+def _ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """ PostgreSQL connections checked out from a pool of the process """
+
+    creation_class = PooledDatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def get_pool(self, conn_params):
+        """ Return the pool of the connections with these parameters """
+        config = {**DEFAULT_POOL, **self.settings_dict.get('POOL', {})}
+
+        def factory():
+            return ConnectionPool(
+                connect=lambda: super(DatabaseWrapper, self)
+                .get_new_connection(conn_params),
+                ping=_ping,
+                max_size=config['MAX_SIZE'],
+                timeout=config['TIMEOUT'],
+                max_lifetime=config['MAX_LIFETIME'],
+                max_idle=config['MAX_IDLE'],
+                check_idle=config['CHECK_IDLE'],
+                name=f'{self.alias}:{conn_params["database"]}',
+            )
+
+        return get_pool(
+            (self.alias, tuple(sorted(conn_params.items()))), factory,
+        )
+
+    @base.async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        connection = pool.getconn()
+        self._pool = pool
+        # Set when the connection is opened, as the PostgreSQL backend does
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level,
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None or self._pool is None:
+            return super()._close()
+
+        pool, self._pool = self._pool, None
+        # The connection is kept by the wrapper when it's closed in an atomic
+        # block, it can't be handed to another thread. Django closes a
+        # connection after an error only when it's unusable
+        pool.putconn(
+            self.connection,
+            discard=self.in_atomic_block or self.errors_occurred,
+        )
@@ -0,0 +1,249 @@
+"""
+    Bounded pool of database connections
+
+    The connections are checked out by the most recently used first, so the
+    ones not needed anymore stay idle and are closed when they reach
+    MAX_IDLE. A connection is checked before being handed out: a closed one
+    is dropped, and one idle for more than CHECK_IDLE seconds runs a
+    `SELECT 1` first, the server could have closed it meanwhile
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL = {
+    # Connections open at the same time, idle or in use
+    'MAX_SIZE': 20,
+    # Seconds a checkout waits for a free connection before failing
+    'TIMEOUT': 5,
+    # Seconds after which a connection is closed instead of reused
+    'MAX_LIFETIME': 1800,
+    # Seconds after which an idle connection is closed
+    'MAX_IDLE': 600,
+    # Seconds of idleness after which a connection is pinged on checkout
+    'CHECK_IDLE': 10,
+}
+
+
+class PoolTimeout(OperationalError):
+    """ Raised when no connection is free before the timeout """
+
+
+class _Entry:
+    """ A pooled connection with its times """
+
+    __slots__ = ('connection', 'created', 'last_used')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """ Pool of the connections opened by connect() """
+
+    def __init__(self, connect, ping, max_size=20, timeout=5,
+                 max_lifetime=1800, max_idle=600, check_idle=10, name=''):
+        self.connect = connect
+        self.ping = ping
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self.name = name
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._counters = dict.fromkeys((
+            'checkouts', 'connections_opened', 'connections_closed',
+            'waits', 'timeouts',
+        ), 0)
+        self._wait_time = 0.0
+        self._peak_in_use = 0
+
+    def _expired(self, entry, now):
+        return (
+            now - entry.created > self.max_lifetime
+            or now - entry.last_used > self.max_idle
+        )
+
+    def _discard(self, entry):
+        """ Close the connection of an entry which left the pool """
+        self._counters['connections_closed'] += 1
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    def _usable(self, entry, now):
+        if entry.connection.closed:
+            return False
+        if now - entry.last_used <= self.check_idle:
+            return True
+        try:
+            self.ping(entry.connection)
+        except Exception:
+            return False
+        return True
+
+    def getconn(self):
+        """ Return a connection, waiting up to timeout for a free one """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            entry = None
+            with self._condition:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        self._wait_time += time.monotonic() - started
+                        logger.warning(
+                            'Database pool %s exhausted: %s connections in '
+                            'use, %s requests waiting',
+                            self.name, len(self._in_use), self._waiting,
+                        )
+                        raise PoolTimeout(
+                            f'No database connection free after '
+                            f'{self.timeout}s'
+                        )
+                    if not waited:
+                        waited = True
+                        self._counters['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if entry is None:
+                try:
+                    entry = _Entry(self.connect())
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._counters['connections_opened'] += 1
+            elif self._expired(entry, time.monotonic()) or not self._usable(
+                entry, time.monotonic(),
+            ):
+                # Checked out of the lock, the ping is a round trip
+                with self._condition:
+                    self._size -= 1
+                    self._discard(entry)
+                continue
+
+            with self._condition:
+                self._in_use[id(entry.connection)] = entry
+                self._counters['checkouts'] += 1
+                if waited:
+                    self._wait_time += time.monotonic() - started
+                self._peak_in_use = max(self._peak_in_use, len(self._in_use))
+            return entry.connection
+
+    def putconn(self, connection, discard=False):
+        """
+        Give back a connection - It's closed instead of reused if discard is
+        true, if it's broken or too old
+        """
+        with self._condition:
+            entry = self._in_use.pop(id(connection))
+
+        if not discard and not connection.closed:
+            try:
+                # A transaction left open would be seen by the next request
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        with self._condition:
+            if discard or connection.closed or (
+                now - entry.created > self.max_lifetime
+            ):
+                self._size -= 1
+                self._discard(entry)
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._condition.notify()
+
+    def close(self):
+        """ Close the idle connections, the others when they come back """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            for entry in idle:
+                self._discard(entry)
+            # The connections in use are closed when they're given back
+            self.max_lifetime = -1
+
+    def stats(self):
+        """ Return the size, use and saturation of the pool """
+        with self._condition:
+            in_use = len(self._in_use)
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'peak_in_use': self._peak_in_use,
+                'saturation': in_use / self.max_size,
+                'wait_seconds': self._wait_time,
+                **self._counters,
+            }
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """ Return the pool of the key, created by factory() the first time """
+    global _pools, _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # The connections of the parent process of a fork can't be
+            # shared, they're left to it
+            _pools = {}
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = factory()
+        return pool
+
+
+def close_pools():
+    """ Close the connections of all the pools of the process """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def get_pool_stats():
+    """ Return the stats of every pool of the process by name """
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
@@ -0,0 +1,179 @@
+"""
+    Password hashing off the request workers
+
+    Hashing a password (PBKDF2 by default) is CPU bound and takes hundreds of
+    milliseconds. The User model sends it to a bounded pool of processes, so
+    a spike of logins or signups can't take every CPU of the server. When the
+    pool and its queue are full the request is rejected with a 503 instead of
+    waiting, which keeps the workers free for the rest of the API
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULT_PASSWORD_HASHING = {
+    # 'process', 'thread' or 'inline' (hash in the request worker)
+    'EXECUTOR': 'process',
+    # Number of passwords hashed at the same time, defaults to half the CPUs
+    'MAX_WORKERS': None,
+    # Number of passwords waiting for a free worker
+    'MAX_PENDING': 16,
+    # Seconds a request waits to get into the queue before being rejected
+    'ADMISSION_TIMEOUT': 0.5,
+    # Start method of the worker processes
+    'START_METHOD': 'spawn',
+}
+
+
+class HashingBusy(APIException):
+    """ Raised when too many passwords are being hashed """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many requests, try again later')
+    default_code = 'hashing_busy'
+
+    # Sent in the Retry-After header by the DRF exception handler
+    wait = 1
+
+
+def _init_worker():
+    """ Set up Django in the worker processes started with spawn """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _check_password(password, encoded):
+    """ Return if the password is correct and if its hash must be updated """
+    must_update = []
+    is_correct = hashers.check_password(
+        password,
+        encoded,
+        setter=lambda raw_password: must_update.append(True),
+    )
+    return is_correct, bool(must_update)
+
+
+class HashingExecutor:
+    """ Run the password hashing in a bounded pool """
+
+    def __init__(self, kind='process', max_workers=None, max_pending=16,
+                 admission_timeout=0.5, start_method='spawn'):
+        self.kind = kind
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.admission_timeout = admission_timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(
+            self.max_workers + max_pending
+        )
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """ Create the executor configured in the PASSWORD_HASHING setting """
+        config = {
+            **DEFAULT_PASSWORD_HASHING,
+            **getattr(settings, 'PASSWORD_HASHING', {}),
+        }
+        return cls(
+            kind=config['EXECUTOR'],
+            max_workers=config['MAX_WORKERS'],
+            max_pending=config['MAX_PENDING'],
+            admission_timeout=config['ADMISSION_TIMEOUT'],
+            start_method=config['START_METHOD'],
+        )
+
+    def _get_pool(self):
+        # The pool is started on the first use, not when Django loads
+        with self._lock:
+            if self._pool is None:
+                if self.kind == 'process':
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(
+                            self.start_method
+                        ),
+                        initializer=_init_worker,
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='hashing',
+                    )
+            return self._pool
+
+    def run(self, fn, *args):
+        """ Run fn(*args) in the pool and return its result """
+        if self.kind == 'inline':
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.admission_timeout):
+            raise HashingBusy()
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def make_password(self, password):
+        """ Hash the password with the preferred hasher """
+        if password is None:
+            # Unusable passwords are random strings, there's nothing to hash
+            return hashers.make_password(None)
+        return self.run(_make_password, password)
+
+    def check_password(self, password, encoded, setter=None):
+        """
+        Same as django.contrib.auth.hashers.check_password - The setter is
+        called in this process when the hash must be updated
+        """
+        if password is None or not hashers.is_password_usable(encoded):
+            return False
+
+        is_correct, must_update = self.run(_check_password, password, encoded)
+        if setter and is_correct and must_update:
+            setter(password)
+        return is_correct
+
+    def shutdown(self):
+        """ Stop the pool, it's started again on the next use """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_executor = None
+
+
+def get_hashing_executor():
+    """ Return the hashing executor of the process """
+    global _executor
+    if _executor is None:
+        _executor = HashingExecutor.from_settings()
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_hashing_executor(setting, **kwargs):
+    """ Rebuild the executor when the tests change its settings """
+    global _executor
+    if setting == 'PASSWORD_HASHING' and _executor is not None:
+        _executor.shutdown()
+        _executor = None
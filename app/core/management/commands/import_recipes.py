@@ -0,0 +1,351 @@
+"""
+    Django command to import recipes with their tags from JSONL or CSV files
+
+    Every batch of records is loaded with COPY into a temporary staging table
+    and merged into the recipes, tags and recipe tags tables with a few
+    set-based queries, in a single transaction together with the progress of
+    the file, so an interrupted import can be resumed with --resume
+
+    Records (one JSON object per line, or CSV with a header):
+        user          Email of the owner, optional with --user
+        title         Required
+        time_minutes  Required
+        price         Required
+        description   Optional
+        link          Optional
+        tags          List of names (JSONL) or names separated by | (CSV)
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.cache import RECIPES, TAGS, invalidate_lists
+from core.models import ImportProgress, Recipe, Tag, User
+
+CSV_TAGS_SEPARATOR = '|'
+
+STAGE_TABLE = 'import_recipe_stage'
+
+
+def read_jsonl(lines):
+    """ Yield the records of a JSON lines file """
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported as an invalid record
+                yield None
+
+
+def read_csv(lines):
+    """ Yield the records of a CSV file with a header """
+    for record in csv.DictReader(lines):
+        tags = record.get('tags') or ''
+        record['tags'] = [
+            name.strip()
+            for name in tags.split(CSV_TAGS_SEPARATOR) if name.strip()
+        ]
+        yield record
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+def clean_record(record, default_user=None):
+    """
+    Return the record with the values of the staging table columns or raise
+    ValueError if it's not valid
+    """
+    if not isinstance(record, dict):
+        raise ValueError('not a JSON object')
+
+    user = record.get('user') or default_user
+    if not user:
+        raise ValueError('missing user')
+    if not isinstance(user, str):
+        raise ValueError('user must be an email')
+
+    for name in ('title', 'description', 'link'):
+        if not isinstance(record.get(name) or '', str):
+            raise ValueError(f'{name} must be a string')
+
+    title = (record.get('title') or '').strip()
+    if not title or len(title) > 255:
+        raise ValueError('title must have between 1 and 255 characters')
+
+    link = record.get('link') or ''
+    if len(link) > 255:
+        raise ValueError('link must have at most 255 characters')
+
+    try:
+        time_minutes = int(record.get('time_minutes'))
+        price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('invalid time_minutes or price')
+    # Range of the integer column
+    if not -2 ** 31 <= time_minutes < 2 ** 31:
+        raise ValueError('time_minutes out of range')
+    if abs(price) >= 1000:
+        raise ValueError('price must be lower than 1000')
+
+    tags = record.get('tags') or []
+    if not isinstance(tags, list) or any(
+        not isinstance(name, str) or not name or len(name) > 255
+        for name in tags
+    ):
+        raise ValueError('tags must be a list of names')
+
+    return [
+        user,
+        title,
+        record.get('description') or '',
+        time_minutes,
+        price,
+        link,
+        json.dumps(list(dict.fromkeys(tags))),
+    ]
+
+
+class Command(BaseCommand):
+    """ Django command to import recipes in bulk """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument(
+            '--user',
+            help='Email of the owner of the records without a user',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Format of the files, guessed from the extension by default',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Records loaded and committed at once',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the records imported by a previous run',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        if connection.vendor != 'postgresql':
+            raise CommandError('import_recipes requires PostgreSQL')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        for path in options['files']:
+            file_format = options['format'] or self.guess_format(path)
+            self.import_file(path, file_format, options)
+
+    def guess_format(self, path):
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        if extension in ('jsonl', 'ndjson', 'json'):
+            return 'jsonl'
+        if extension == 'csv':
+            return 'csv'
+        raise CommandError(f'Unknown format of {path}, use --format')
+
+    def import_file(self, path, file_format, options):
+        """ Import the records of the file in batches """
+        source = os.path.abspath(path)
+        progress, _ = ImportProgress.objects.get_or_create(source=source)
+        skip = progress.records if options['resume'] else 0
+        if skip:
+            self.stdout.write(f'{path}: resuming after {skip} records')
+
+        stats = {'imported': 0, 'invalid': 0, 'unknown_user': 0}
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as lines:
+            records = READERS[file_format](lines)
+            position = skip
+            for _ in islice(records, skip):
+                pass
+
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+
+                rows = []
+                for offset, record in enumerate(batch):
+                    try:
+                        row = clean_record(record, options['user'])
+                    except ValueError as error:
+                        stats['invalid'] += 1
+                        self.stderr.write(
+                            f'{path}: record {position + offset + 1} '
+                            f'skipped, {error}'
+                        )
+                        continue
+                    rows.append([position + offset] + row)
+
+                position += len(batch)
+                with transaction.atomic():
+                    imported, unknown_user = self.load_batch(rows)
+                    ImportProgress.objects.filter(pk=progress.pk).update(
+                        records=position,
+                    )
+                stats['imported'] += imported
+                stats['unknown_user'] += unknown_user
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{path}: {position} records read, '
+                    f'{stats["imported"]} imported '
+                    f'({stats["imported"] / elapsed:.0f} recipes/s)'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: {stats["imported"]} recipes imported, '
+            f'{stats["invalid"]} invalid records, '
+            f'{stats["unknown_user"]} records of unknown users'
+        ))
+
+    def load_batch(self, rows):
+        """
+        COPY the rows into the staging table and merge them - Return the
+        number of recipes imported and of rows skipped for an unknown user
+        """
+        recipe_table = Recipe._meta.db_table
+        tag_table = Tag._meta.db_table
+        recipe_tag_table = Recipe.tags.through._meta.db_table
+        user_table = User._meta.db_table
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {STAGE_TABLE}')
+            cursor.execute(f"""
+                CREATE TEMP TABLE {STAGE_TABLE} (
+                    seq bigint PRIMARY KEY,
+                    user_email text NOT NULL,
+                    title text NOT NULL,
+                    description text NOT NULL,
+                    time_minutes integer NOT NULL,
+                    price numeric(5, 2) NOT NULL,
+                    link text NOT NULL,
+                    tags jsonb NOT NULL,
+                    user_id bigint,
+                    recipe_id bigint
+                )
+            """)
+            cursor.copy_expert(
+                f"""
+                COPY {STAGE_TABLE} (
+                    seq, user_email, title, description, time_minutes,
+                    price, link, tags
+                ) FROM STDIN WITH (
+                    FORMAT csv,
+                    FORCE_NOT_NULL (description, link)
+                )
+                """,
+                buffer,
+            )
+            # Temporary tables are never analyzed automatically
+            cursor.execute(f'ANALYZE {STAGE_TABLE}')
+
+            cursor.execute(f"""
+                UPDATE {STAGE_TABLE} AS stage SET user_id = u.id
+                FROM {user_table} AS u WHERE u.email = stage.user_email
+            """)
+            # The ids are allocated before the insert to link the tags, in
+            # the order of the file - nextval() is called on the rows of the
+            # ordered subquery, an UPDATE would scan the table in any order
+            cursor.execute(f"""
+                UPDATE {STAGE_TABLE} AS stage SET recipe_id = ids.id
+                FROM (
+                    SELECT seq, nextval(
+                        pg_get_serial_sequence('{recipe_table}', 'id')
+                    ) AS id
+                    FROM (
+                        SELECT seq FROM {STAGE_TABLE}
+                        WHERE user_id IS NOT NULL
+                        ORDER BY seq
+                    ) AS ordered
+                ) AS ids
+                WHERE stage.seq = ids.seq
+            """)
+            imported = cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO {recipe_table} (
+                    id, user_id, title, description, time_minutes, price,
+                    link, updated_at
+                )
+                SELECT
+                    recipe_id, user_id, title, description, time_minutes,
+                    price, link, now()
+                FROM {STAGE_TABLE}
+                WHERE recipe_id IS NOT NULL
+                ORDER BY seq
+            """)
+            cursor.execute(f"""
+                INSERT INTO {tag_table} (
+                    user_id, name, updated_at, recipe_count
+                )
+                SELECT DISTINCT stage.user_id, tag.name, now(), 0
+                FROM {STAGE_TABLE} AS stage
+                CROSS JOIN LATERAL jsonb_array_elements_text(stage.tags)
+                    AS tag(name)
+                WHERE stage.recipe_id IS NOT NULL
+                ON CONFLICT (user_id, name) DO NOTHING
+            """)
+            # The counts of the tags are increased by the links inserted,
+            # the recipes are new so they had none
+            cursor.execute(f"""
+                WITH inserted AS (
+                    INSERT INTO {recipe_tag_table} (recipe_id, tag_id)
+                    SELECT stage.recipe_id, tag.id
+                    FROM {STAGE_TABLE} AS stage
+                    CROSS JOIN LATERAL jsonb_array_elements_text(stage.tags)
+                        AS name(name)
+                    JOIN {tag_table} AS tag
+                        ON tag.user_id = stage.user_id
+                        AND tag.name = name.name
+                    WHERE stage.recipe_id IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                    RETURNING tag_id
+                )
+                UPDATE {tag_table} AS tag
+                SET recipe_count = tag.recipe_count + counts.count,
+                    updated_at = now()
+                FROM (
+                    SELECT tag_id, count(*) AS count
+                    FROM inserted GROUP BY tag_id
+                ) AS counts
+                WHERE tag.id = counts.tag_id
+            """)
+            cursor.execute(f"""
+                SELECT DISTINCT user_id FROM {STAGE_TABLE}
+                WHERE recipe_id IS NOT NULL
+            """)
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'DROP TABLE {STAGE_TABLE}')
+
+        # The cached lists aren't invalidated by signals for the SQL writes
+        for user_id in user_ids:
+            invalidate_lists(user_id, RECIPES, TAGS)
+
+        return imported, len(rows) - imported
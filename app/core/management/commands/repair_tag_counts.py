@@ -0,0 +1,68 @@
+"""
+    Django command to repair the recipe counts of the tags
+
+    The counts are kept by the signal handlers of core.signals and by the
+    bulk writes, a write made outside of the application (SQL, a restore of
+    the recipe tags table) can leave them wrong. The tags are checked in
+    batches of ids so the table is never locked as a whole
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Max
+
+from core.cache import RECIPES, TAGS, invalidate_lists
+from core.models import Tag
+
+
+class Command(BaseCommand):
+    """ Django command to count again the recipes of the tags """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Tags checked and repaired at once',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the wrong counts',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        last_id = Tag.objects.aggregate(last=Max('pk'))['last'] or 0
+        checked = 0
+        wrong = 0
+        for start in range(0, last_id, batch_size):
+            tags = Tag.objects.filter(
+                pk__gt=start,
+                pk__lte=start + batch_size,
+            )
+            with transaction.atomic():
+                wrong_tags = list(tags.annotate(
+                    actual=Tag.objects.recipe_counts(),
+                ).exclude(
+                    recipe_count=F('actual'),
+                ).select_for_update().values_list('pk', 'user_id'))
+                if wrong_tags and not options['dry_run']:
+                    Tag.objects.refresh_recipe_counts(
+                        [pk for pk, user_id in wrong_tags],
+                    )
+                    for user_id in {user_id for pk, user_id in wrong_tags}:
+                        invalidate_lists(user_id, RECIPES, TAGS)
+            checked += tags.count()
+            wrong += len(wrong_tags)
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} tags checked, {wrong} wrong counts {action}'
+        ))
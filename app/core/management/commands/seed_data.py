@@ -0,0 +1,340 @@
+"""
+    Django command to generate users with recipes and tags for load tests
+
+    Every user gets --recipes recipes with --tags-per-recipe tags, drawn from
+    a vocabulary of --vocabulary names whose popularity follows a Zipf law of
+    exponent --zipf: a few tags are on most recipes, most tags on a few. The
+    data of a user only depends on --seed and on the index of the user, so
+    the same options always generate the same data, in any batch size.
+
+    The ids are allocated from the sequences of the tables and the rows are
+    loaded with COPY, a batch of users per transaction, in --jobs threads
+    with a connection each: most of the time is spent by the database
+    server on the indexes of the tables. The users share a password hashed
+    once (--password), hashing it for every user would take longer than the
+    rest
+"""
+
+import csv
+import io
+import random
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Recipe, Tag, User
+
+EMAIL = '{prefix}{index}@example.com'
+
+# Emails looked up at once in the users before generating them
+EXISTING_CHECK_SIZE = 10000
+
+TAG_WORDS = [
+    'Vegan', 'Vegetarian', 'Quick', 'Dessert', 'Breakfast', 'Lunch',
+    'Dinner', 'Spicy', 'Healthy', 'Italian', 'Mexican', 'Indian', 'Chinese',
+    'Japanese', 'Thai', 'French', 'Greek', 'Spanish', 'Baking', 'Grill',
+    'Soup', 'Salad', 'Pasta', 'Rice', 'Chicken', 'Beef', 'Pork', 'Fish',
+    'Seafood', 'Cheese', 'Chocolate', 'Fruit', 'Gluten free', 'Dairy free',
+    'Low carb', 'Budget', 'Party', 'Kids', 'Summer', 'Winter',
+]
+
+TITLE_WORDS = [
+    'Roasted', 'Grilled', 'Creamy', 'Crispy', 'Spicy', 'Smoked', 'Baked',
+    'Fresh', 'Slow cooked', 'Stuffed', 'Sweet', 'Tangy', 'Herbed', 'Golden',
+]
+
+DISHES = [
+    'chicken', 'salmon', 'tofu', 'lentils', 'risotto', 'noodles', 'tacos',
+    'curry', 'stew', 'soup', 'salad', 'pie', 'cake', 'pancakes', 'burger',
+    'dumplings', 'pizza', 'omelette', 'chili', 'gnocchi',
+]
+
+
+def tag_vocabulary(size):
+    """ Names of the tags, the most popular first """
+    return [
+        TAG_WORDS[rank % len(TAG_WORDS)]
+        + (f' {rank // len(TAG_WORDS) + 1}' if rank >= len(TAG_WORDS) else '')
+        for rank in range(size)
+    ]
+
+
+def zipf_weights(size, exponent):
+    """ Cumulative weights of the ranks for a Zipf law """
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def generate_user(seed, index, recipes, tags_per_recipe, weights):
+    """
+    Return the recipes of the user as lists of fields and of the ranks of
+    their tags
+    """
+    rng = random.Random(f'{seed}:{index}')
+    total = weights[-1]
+    tags_per_recipe = min(tags_per_recipe, len(weights))
+
+    generated = []
+    for number in range(recipes):
+        ranks = set()
+        while len(ranks) < tags_per_recipe:
+            ranks.add(bisect_left(weights, rng.random() * total))
+        dish = rng.choice(DISHES)
+        cents = rng.randint(100, 99999)
+        generated.append((
+            f'{rng.choice(TITLE_WORDS)} {dish} {number + 1}',
+            f'{rng.choice(TITLE_WORDS)} {dish} with {rng.choice(DISHES)}',
+            rng.randint(5, 240),
+            f'{cents // 100}.{cents % 100:02d}',
+            f'https://example.com/recipes/{index}/{number + 1}',
+            sorted(ranks),
+        ))
+    return generated
+
+
+class Command(BaseCommand):
+    """ Django command to generate synthetic data """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=100, help='Number of users',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=100, help='Recipes per user',
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=1000,
+            help='Number of different tag names',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Exponent of the Zipf law of the popularity of the tags',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--start',
+            type=int,
+            default=0,
+            help='Index of the first user, to add users to a previous run',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed-',
+            help='Prefix of the emails of the users',
+        )
+        parser.add_argument(
+            '--password',
+            default='seed-password',
+            help='Password of all the users',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100000,
+            help='Recipes loaded and committed at once, at least a user',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Batches loaded at the same time',
+        )
+
+    def handle(self, *args, **options):
+        """ Entrypoint for command """
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_data requires PostgreSQL')
+        for name in ('users', 'vocabulary', 'batch_size', 'jobs'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} must be positive'
+                )
+        if options['recipes'] < 0 or options['tags_per_recipe'] < 0:
+            raise CommandError('--recipes and --tags-per-recipe must be >= 0')
+
+        start = options['start']
+        end = start + options['users']
+        existing = self.existing_email(options['prefix'], start, end)
+        if existing:
+            raise CommandError(
+                f'User {existing} already exists, use --start or --prefix'
+            )
+
+        self.names = tag_vocabulary(options['vocabulary'])
+        self.weights = zipf_weights(options['vocabulary'], options['zipf'])
+        self.password = make_password(options['password'])
+
+        users_per_batch = max(
+            1, options['batch_size'] // max(options['recipes'], 1),
+        )
+        batches = [
+            range(first, min(first + users_per_batch, end))
+            for first in range(start, end, users_per_batch)
+        ]
+        started = time.monotonic()
+        users = recipes = 0
+        for batch_users, batch_recipes in self.load_batches(batches, options):
+            users += batch_users
+            recipes += batch_recipes
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{users} users, {recipes} recipes '
+                f'({recipes / elapsed:.0f} recipes/s)'
+            )
+
+        with connection.cursor() as cursor:
+            for model in (User, Recipe, Recipe.tags.through, Tag):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["users"]} users and {recipes} recipes generated in '
+            f'{time.monotonic() - started:.1f}s'
+        ))
+
+    def existing_email(self, prefix, start, end):
+        """ Return the email of a user of the range which exists or None """
+        for first in range(start, end, EXISTING_CHECK_SIZE):
+            last = min(first + EXISTING_CHECK_SIZE, end)
+            emails = [
+                EMAIL.format(prefix=prefix, index=index)
+                for index in range(first, last)
+            ]
+            existing = User.objects.filter(email__in=emails).order_by(
+                'email',
+            ).values_list('email', flat=True).first()
+            if existing:
+                return existing
+        return None
+
+    def load_batches(self, batches, options):
+        """ Load the batches - Yield their numbers of users and recipes """
+        if options['jobs'] == 1:
+            for indexes in batches:
+                yield len(indexes), self.load_batch(indexes, options)
+            return
+
+        def job(indexes):
+            try:
+                return len(indexes), self.load_batch(indexes, options)
+            finally:
+                # The connection of the thread
+                connection.close()
+
+        with ThreadPoolExecutor(options['jobs']) as executor:
+            for future in as_completed([
+                executor.submit(job, indexes) for indexes in batches
+            ]):
+                yield future.result()
+
+    def load_batch(self, indexes, options):
+        """ Load the users in a transaction - Return the recipes """
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Generated data, the last batches can be lost in a crash
+                cursor.execute('SET LOCAL synchronous_commit TO OFF')
+            return self.load_users(indexes, options)
+
+    def load_users(self, indexes, options):
+        """ Generate and COPY the users - Return the number of recipes """
+        now = timezone.now().isoformat()
+        generated = [
+            generate_user(
+                options['seed'], index, options['recipes'],
+                options['tags_per_recipe'], self.weights,
+            )
+            for index in indexes
+        ]
+
+        with connection.cursor() as cursor:
+            user_ids = self.allocate_ids(cursor, User, len(indexes))
+            recipe_ids = iter(self.allocate_ids(
+                cursor, Recipe, sum(len(recipes) for recipes in generated),
+            ))
+            # The tags of a user are the ones on its recipes
+            user_ranks = [
+                sorted({rank for *_, ranks in recipes for rank in ranks})
+                for recipes in generated
+            ]
+            tag_ids = iter(self.allocate_ids(
+                cursor, Tag, sum(len(ranks) for ranks in user_ranks),
+            ))
+
+            users, tags, recipes, links = [], [], [], []
+            for index, user_id, user_recipes, ranks in zip(
+                indexes, user_ids, generated, user_ranks,
+            ):
+                users.append([
+                    user_id, self.password, False,
+                    EMAIL.format(prefix=options['prefix'], index=index),
+                    f'User {index}', True, False, now,
+                ])
+                ids = {rank: next(tag_ids) for rank in ranks}
+                counts = dict.fromkeys(ranks, 0)
+                for (
+                    title, description, time_minutes, price, link,
+                    recipe_ranks,
+                ) in user_recipes:
+                    recipe_id = next(recipe_ids)
+                    recipes.append([
+                        recipe_id, user_id, title, description,
+                        time_minutes, price, link, now,
+                    ])
+                    for rank in recipe_ranks:
+                        links.append([recipe_id, ids[rank]])
+                        counts[rank] += 1
+                tags.extend(
+                    [ids[rank], user_id, self.names[rank], now, counts[rank]]
+                    for rank in ranks
+                )
+
+            self.copy(cursor, User, [
+                'id', 'password', 'is_superuser', 'email', 'name',
+                'is_active', 'is_staff', 'updated_at',
+            ], users)
+            self.copy(cursor, Tag, [
+                'id', 'user_id', 'name', 'updated_at', 'recipe_count',
+            ], tags)
+            self.copy(cursor, Recipe, [
+                'id', 'user_id', 'title', 'description', 'time_minutes',
+                'price', 'link', 'updated_at',
+            ], recipes)
+            self.copy(cursor, Recipe.tags.through, [
+                'recipe_id', 'tag_id',
+            ], links)
+        return len(recipes)
+
+    def allocate_ids(self, cursor, model, count):
+        """ Return count ids of the sequence of the table of the model """
+        if not count:
+            return []
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, 'id', count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def copy(self, cursor, model, columns, rows):
+        """ COPY the rows into the table of the model """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f'COPY {model._meta.db_table} ({", ".join(columns)}) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
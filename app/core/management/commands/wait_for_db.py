@@ -1,28 +1,136 @@
 """
     Django command to wait for the database to be availabe
     This command solves the Database race condition of the time waiting till the db is set up for working
+
+    Every attempt first probes the server with the SSLRequest message of the
+    PostgreSQL protocol, answered with a single byte as soon as the server
+    listens, then connects through the database checks. The attempts are
+    retried with an exponential backoff until --timeout, then the command
+    fails
 """
 
+import socket
+import struct
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+# Length and code of the SSLRequest message
+SSL_REQUEST = struct.pack('!ii', 8, 80877103)
+
+# Seconds between the attempts at most
+MAX_INTERVAL = 2
+
+# Seconds the probe waits for the server
+PROBE_TIMEOUT = 1
+
+
+def probe(host, port, timeout):
+    """ Raise OSError if no PostgreSQL server listens on the host and port """
+    with socket.create_connection((host, port), timeout) as sock:
+        sock.settimeout(timeout)
+        sock.sendall(SSL_REQUEST)
+        # Yes or no to SSL, the server closes the connection afterwards
+        if sock.recv(1) not in (b'S', b'N'):
+            raise OSError(f'{host}:{port} is not a PostgreSQL server')
 
 
 class Command(BaseCommand):
     """ Django command to wait for the database """
 
+    help = 'Wait for the databases to accept connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Alias of a database to wait for, default by default',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Wait for all the databases at the same time',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds after which the command fails',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0.1,
+            help='Seconds before the first retry, doubled at every retry',
+        )
+
     def handle(self, *args, **options):
         """ Entrypoint for command"""
+        if options['all']:
+            aliases = list(connections)
+        else:
+            aliases = options['databases'] or ['default']
+
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        started = time.monotonic()
+        deadline = started + options['timeout']
+        if len(aliases) == 1:
+            self.wait_for(aliases[0], deadline, options)
+        else:
+            with ThreadPoolExecutor(len(aliases)) as executor:
+                for future in [
+                    executor.submit(self.wait_for, alias, deadline, options)
+                    for alias in aliases
+                ]:
+                    future.result()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Databases available after {time.monotonic() - started:.2f}s'
+        ))
+
+    def probe(self, alias, timeout):
+        """
+        Probe the server of the database - The servers on a Unix socket and
+        of the other vendors are only checked by connecting
+        """
+        connection = connections[alias]
+        host = connection.settings_dict['HOST']
+        if connection.vendor != 'postgresql' or not host or host[0] == '/':
+            return
+        probe(host, int(connection.settings_dict['PORT'] or 5432), timeout)
+
+    def wait_for(self, alias, deadline, options):
+        """ Retry until the database is available or raise CommandError """
+        started = time.monotonic()
+        interval = options['interval']
+        attempts = 0
+        while True:
+            attempts += 1
             try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailabe')
-                time.sleep(1)
+                self.probe(alias, PROBE_TIMEOUT)
+                self.check(databases=[alias])
+                break
+            except (OSError, Psycopg2OpError, OperationalError) as error:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database {alias} unavailable after {attempts} '
+                        f'attempts: {error}'
+                    )
+                self.stdout.write(
+                    f'Database {alias} unavailable, retrying in '
+                    f'{min(interval, remaining):.2f}s'
+                )
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 2, MAX_INTERVAL)
 
-        self.stdout.write(self.style.SUCCESS('Databases available'))
+        self.stdout.write(
+            f'Database {alias} available after '
+            f'{time.monotonic() - started:.2f}s ({attempts} attempts)'
+        )
@@ -0,0 +1,445 @@
+"""
+    Performance metrics of the API requests
+
+    RequestMetricsMiddleware times the requests of the views in the URL
+    namespaces of the METRICS setting (the recipe and user APIs): number and
+    duration of the queries, time spent in the serializers and in the
+    rendering. It sends them in the Server-Timing header, shown by the
+    developer tools of the browsers, and adds them to histograms per endpoint
+    which metrics_view serves in the Prometheus text format, along with the
+    stats of the list cache and of the connection pools.
+
+    The queries are timed by an execute wrapper added to the database
+    connections when they're opened, which does nothing out of a timed
+    request. The timings follow the request in a context variable, into the
+    threads of the async views too. Every process has its own metrics, with
+    several workers Prometheus scrapes each of them
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.deprecation import MiddlewareMixin
+
+DEFAULT_METRICS = {
+    'ENABLED': True,
+    # URL namespaces of the views timed
+    'NAMESPACES': ['recipe', 'user'],
+    # Send the timings of the requests in the Server-Timing header
+    'SERVER_TIMING': True,
+    # Upper bounds of the buckets of the duration histograms, in seconds
+    'BUCKETS': [
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+    ],
+    # Upper bounds of the buckets of the histogram of the number of queries
+    'QUERY_BUCKETS': [0, 1, 2, 3, 4, 5, 10, 20, 50],
+    # Token the scrapers send as Authorization: Bearer - Without one the
+    # metrics are only served with DEBUG
+    'TOKEN': None,
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def get_metrics_config():
+    """ Return the METRICS setting with the defaults """
+    return {**DEFAULT_METRICS, **getattr(settings, 'METRICS', {})}
+
+
+class RequestTimings:
+    """ Queries and durations of a request, in seconds """
+
+    __slots__ = ('queries', 'db', 'serialize', 'render')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+
+
+def get_request_timings():
+    """ Return the timings of the current request or None """
+    return _timings.get()
+
+
+@contextmanager
+def measure(name):
+    """
+    Add the duration of the block to the timing name (serialize, render) of
+    the request - The queries of the block are left to the database time
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    db = timings.db
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (timings.db - db)
+        setattr(timings, name, getattr(timings, name) + elapsed)
+
+
+def time_query(execute, sql, params, many, context):
+    """ Execute wrapper timing the queries of the timed requests """
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def add_query_timer(sender, connection, **kwargs):
+    """ Time the queries of the connection """
+    # First, the wrappers of execute_wrapper() are removed from the end
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class TimedSerializerMixin:
+    """
+    Count the validation and the representation of the serializers of the
+    view in the serializer time
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if _timings.get() is None:
+            return serializer
+
+        # Only the serializer of the view, not its fields or the child of a
+        # list, so the time isn't counted twice
+        for name in ('is_valid', 'to_representation'):
+            setattr(serializer, name, _timed(getattr(serializer, name)))
+        return serializer
+
+
+def _timed(method):
+    def timed(*args, **kwargs):
+        with measure('serialize'):
+            return method(*args, **kwargs)
+    return timed
+
+
+class Histogram:
+    """ Counts of the values observed in buckets, their sum and count """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # The last count is the one of the values over every bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """ Return the cumulative counts of the buckets, the sum and count """
+        cumulated = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulated.append(total)
+        return cumulated, self.sum, self.count
+
+
+# Name, help and timing of the histograms of every endpoint
+REQUEST_HISTOGRAMS = (
+    ('api_request_duration_seconds', 'Duration of the requests', None),
+    ('api_request_queries', 'Number of queries of the requests', 'queries'),
+    ('api_request_db_duration_seconds', 'Time of the queries', 'db'),
+    (
+        'api_request_serializer_duration_seconds',
+        'Time of the serializers out of the queries',
+        'serialize',
+    ),
+    (
+        'api_request_render_duration_seconds',
+        'Time of the rendering of the responses',
+        'render',
+    ),
+)
+
+
+class RequestMetrics:
+    """ Histograms of the timings of the requests per endpoint and method """
+
+    def __init__(self, buckets=None, query_buckets=None):
+        self.buckets = buckets or DEFAULT_METRICS['BUCKETS']
+        self.query_buckets = query_buckets or DEFAULT_METRICS['QUERY_BUCKETS']
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    @classmethod
+    def from_settings(cls):
+        """ Create the histograms configured in the METRICS setting """
+        config = get_metrics_config()
+        return cls(
+            buckets=config['BUCKETS'],
+            query_buckets=config['QUERY_BUCKETS'],
+        )
+
+    def observe(self, endpoint, method, timings, duration):
+        """ Add the timings of a request to the histograms of the endpoint """
+        with self._lock:
+            histograms = self._endpoints.get((endpoint, method))
+            if histograms is None:
+                histograms = self._endpoints[endpoint, method] = [
+                    Histogram(
+                        self.query_buckets if timing == 'queries'
+                        else self.buckets
+                    )
+                    for _, _, timing in REQUEST_HISTOGRAMS
+                ]
+            for histogram, (_, _, timing) in zip(
+                histograms, REQUEST_HISTOGRAMS,
+            ):
+                histogram.observe(
+                    duration if timing is None else getattr(timings, timing)
+                )
+
+    def collect(self):
+        """ Return the lines of the histograms in the Prometheus format """
+        with self._lock:
+            endpoints = sorted(
+                (key, [histogram.snapshot() for histogram in histograms])
+                for key, histograms in self._endpoints.items()
+            )
+
+        lines = []
+        for index, (name, help_text, timing) in enumerate(REQUEST_HISTOGRAMS):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            buckets = (
+                self.query_buckets if timing == 'queries' else self.buckets
+            )
+            for (endpoint, method), snapshots in endpoints:
+                cumulated, total, count = snapshots[index]
+                labels = _labels(endpoint=endpoint, method=method)
+                for bucket, bucket_count in zip(
+                    [*buckets, float('inf')], cumulated,
+                ):
+                    bucket_labels = _labels(
+                        endpoint=endpoint, method=method, le=_number(bucket),
+                    )
+                    lines.append(
+                        f'{name}_bucket{bucket_labels} {bucket_count}'
+                    )
+                lines.append(f'{name}_sum{labels} {_number(total)}')
+                lines.append(f'{name}_count{labels} {count}')
+        return lines
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _samples(name, help_text, kind, samples):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    lines.extend(
+        f'{name}{_labels(**labels)} {_number(value)}'
+        for labels, value in samples
+    )
+    return lines
+
+
+def collect_list_cache():
+    """ Return the lines of the stats of the list cache """
+    from core.cache import get_list_cache
+
+    cache = get_list_cache()
+    stats = cache.stats() if cache is not None else {}
+    lines = []
+    for counter in ('hits', 'misses'):
+        lines.extend(_samples(
+            f'list_cache_{counter}_total',
+            f'Lookups of the list cache which were {counter}',
+            'counter',
+            [({'kind': kind}, kind_stats[counter])
+             for kind, kind_stats in sorted(stats.items())],
+        ))
+    return lines
+
+
+# Name, help, type and stat of the metrics of every pool
+POOL_METRICS = (
+    ('db_pool_max_size', 'Maximum number of connections', 'gauge',
+     'max_size'),
+    ('db_pool_connections', 'Connections opened', 'gauge', 'size'),
+    ('db_pool_connections_in_use', 'Connections checked out', 'gauge',
+     'in_use'),
+    ('db_pool_waiting', 'Checkouts waiting for a connection', 'gauge',
+     'waiting'),
+    ('db_pool_saturation', 'Share of the connections in use', 'gauge',
+     'saturation'),
+    ('db_pool_checkouts_total', 'Checkouts', 'counter', 'checkouts'),
+    ('db_pool_waits_total', 'Checkouts which waited', 'counter', 'waits'),
+    ('db_pool_timeouts_total', 'Checkouts which timed out', 'counter',
+     'timeouts'),
+    ('db_pool_wait_seconds_total', 'Time the checkouts waited', 'counter',
+     'wait_seconds'),
+)
+
+
+def collect_pools():
+    """ Return the lines of the stats of the connection pools """
+    from core.db_pool import get_pool_stats
+
+    stats = sorted(get_pool_stats().items())
+    lines = []
+    for name, help_text, kind, stat in POOL_METRICS:
+        lines.extend(_samples(name, help_text, kind, [
+            ({'pool': pool}, pool_stats[stat]) for pool, pool_stats in stats
+        ]))
+    return lines
+
+
+_metrics = None
+
+
+def get_request_metrics():
+    """ Return the request histograms of the process """
+    global _metrics
+    if _metrics is None:
+        _metrics = RequestMetrics.from_settings()
+    return _metrics
+
+
+@receiver(setting_changed)
+def reset_request_metrics(setting, **kwargs):
+    """ Start new histograms when the tests change their settings """
+    global _metrics
+    if setting == 'METRICS':
+        _metrics = None
+
+
+def render_metrics():
+    """ Return all the metrics of the process in the Prometheus format """
+    lines = [
+        *get_request_metrics().collect(),
+        *collect_list_cache(),
+        *collect_pools(),
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """ Serve the metrics to Prometheus """
+    config = get_metrics_config()
+    if not config['ENABLED']:
+        raise Http404()
+    token = config['TOKEN']
+    if not token and not settings.DEBUG:
+        # Endpoints, traffic and pools aren't public
+        raise Http404()
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}',
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+def server_timing(timings, duration):
+    """ Return the value of the Server-Timing header, in milliseconds """
+    return ', '.join([
+        f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+        f'serialize;dur={timings.serialize * 1000:.2f}',
+        f'render;dur={timings.render * 1000:.2f}',
+        f'total;dur={duration * 1000:.2f}',
+    ])
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Time the requests of the views in the namespaces of the METRICS setting
+
+    First in MIDDLEWARE, the total time includes the other middleware
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        config = get_metrics_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        self.record(config, request, response, timings, started)
+        return response
+
+    async def __acall__(self, request):
+        config = get_metrics_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        # The context, so the timings, is copied to the threads of the views
+        started = time.perf_counter()
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        self.record(config, request, response, timings, started)
+        return response
+
+    def record(self, config, request, response, timings, started):
+        """ Add the timings of the request to its endpoint and header """
+        # The view is only known after the request is resolved
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not set(match.namespaces) & set(
+            config['NAMESPACES']
+        ):
+            return
+
+        duration = time.perf_counter() - started
+        get_request_metrics().observe(
+            match.view_name, request.method, timings, duration,
+        )
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(timings, duration)
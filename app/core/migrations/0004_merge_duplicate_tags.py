@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """
+    Merge the tags with the same (user, name) into the oldest one, so the
+    unique constraint of the next migration can be added
+    """
+    Tag = apps.get_model('core', 'Tag')
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeTag = Recipe.tags.through
+
+    duplicates = Tag.objects.values('user_id', 'name').annotate(
+        keep_id=Min('id'),
+        total=Count('id'),
+    ).filter(total__gt=1)
+
+    for duplicate in duplicates.iterator():
+        keep_id = duplicate['keep_id']
+        duplicate_ids = list(Tag.objects.filter(
+            user_id=duplicate['user_id'],
+            name=duplicate['name'],
+        ).exclude(id=keep_id).values_list('id', flat=True))
+
+        # Move the links of the duplicated tags to the kept tag, without
+        # linking a recipe twice to it
+        recipe_ids = set(RecipeTag.objects.filter(
+            tag_id__in=duplicate_ids,
+        ).values_list('recipe_id', flat=True))
+        recipe_ids -= set(RecipeTag.objects.filter(
+            tag_id=keep_id,
+        ).values_list('recipe_id', flat=True))
+
+        RecipeTag.objects.filter(tag_id__in=duplicate_ids).delete()
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe_id=recipe_id, tag_id=keep_id)
+            for recipe_id in recipe_ids
+        )
+        Tag.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20230911_0741'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 05:45
+
+from django.db import migrations
+
+# The recipe tags table is created by the ManyToManyField and can't declare
+# indexes - (tag_id, recipe_id) answers "which recipes have this tag" from
+# the index alone, for the tag filters of the recipe list
+CREATE_INDEX = """
+    CREATE INDEX core_recipe_tags_tag_recipe_idx
+    ON core_recipe_tags (tag_id, recipe_id)
+"""
+
+DROP_INDEX = 'DROP INDEX core_recipe_tags_tag_recipe_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:10
+
+from django.db import DatabaseError, migrations, transaction
+
+# Prefix matches of the tag names of a user, the LIKE of istartswith
+CREATE_PREFIX_INDEX = """
+    CREATE INDEX core_tag_user_name_prefix_idx
+    ON core_tag (user_id, UPPER(name::text) text_pattern_ops)
+"""
+
+# Fuzzy matches of the tag names (word similarity of pg_trgm)
+CREATE_TRIGRAM_INDEX = """
+    CREATE INDEX core_tag_name_trgm_idx
+    ON core_tag USING gin (name gin_trgm_ops)
+"""
+
+
+def create_indexes(apps, schema_editor):
+    """
+    Create the prefix index and, where pg_trgm can be installed, the trigram
+    index - Without it the tag autocomplete only matches prefixes and
+    substrings (see recipe.search)
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_PREFIX_INDEX)
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+        try:
+            # Installing an extension needs privileges the user may not have
+            with transaction.atomic(using=connection.alias):
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(CREATE_TRIGRAM_INDEX)
+        except DatabaseError:
+            pass
+
+
+def drop_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS core_tag_name_trgm_idx')
+        cursor.execute('DROP INDEX core_tag_user_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_tags_tag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
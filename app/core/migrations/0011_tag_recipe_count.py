@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 06:00
+
+from django.db import migrations, models
+
+COUNT_RECIPES = """
+    UPDATE core_tag SET recipe_count = counts.count
+    FROM (
+        SELECT tag_id, count(*) AS count
+        FROM core_recipe_tags GROUP BY tag_id
+    ) AS counts
+    WHERE core_tag.id = counts.tag_id
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_tag_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_RECIPES, migrations.RunSQL.noop),
+    ]
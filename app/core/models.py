@@ -2,13 +2,19 @@
     Database Models
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from django.conf import settings
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.hashing import get_hashing_executor
 
 
 class UserManager(BaseUserManager):
@@ -46,6 +52,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Last modification, used to answer conditional requests
+    updated_at = models.DateTimeField(auto_now=True)
 
     # To assign the User Manage
     objects = UserManager()
@@ -53,6 +61,36 @@ class User(AbstractBaseUser, PermissionsMixin):
     # Field used for authentication
     USERNAME_FIELD = 'email'
 
+    # The passwords are hashed in the pool of core.hashing instead of the
+    # request worker - authenticate() and the serializers go through these
+
+    def set_password(self, raw_password):
+        self.password = get_hashing_executor().make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return get_hashing_executor().check_password(
+            raw_password,
+            self.password,
+            setter,
+        )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """ QuerySet of the recipes """
+
+    def delete(self):
+        """ Delete the recipes and uncount them from their tags """
+        with transaction.atomic(using=self.db, savepoint=False):
+            Tag.objects.uncount_recipes(self)
+            return super().delete()
+
 
 class Recipe(models.Model):
     """ Recipe Object """
@@ -73,16 +111,132 @@ class Recipe(models.Model):
     # Many Recipes can have many Tags
     tags = models.ManyToManyField('Tag')
 
+    # Last modification - Also updated when the tags of the recipe change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Document of the full-text search, the title weighted over the
+    # description - Written by a trigger of the database (see migration 0008)
+    # on every insert or change of the title or the description
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        # The recipes are always listed by user, latest first
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx',
+            ),
+        ]
+
     """
         Special object of a class that allows to represent the string representation of this object
         Instead of represent the recipe object by the id (default) is going to be represented on the Django Admin
         by the title
     """
 
+    def delete(self, *args, **kwargs):
+        # The links are deleted by the cascade, without m2m_changed - The
+        # recipes deleted with their user aren't uncounted, nor their tags
+        # which are deleted too
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using, savepoint=False):
+            Tag.objects.uncount_recipes([self.pk])
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
 
+class TagManager(models.Manager):
+    """ Manager for Tags """
+
+    def get_or_create_many(self, user, names):
+        """
+        Return the tags of the user with the given names, creating the missing
+        ones. Runs a constant number of queries regardless of len(names):
+        one lookup for the existing tags, one bulk insert for the rest and
+        one lookup for the inserted tags.
+        The tags are returned in the order of the first occurrence of the name
+        """
+
+        # dict.fromkeys removes the duplicated names keeping the order
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        tags = {
+            tag.name: tag
+            for tag in self.filter(user=user, name__in=names)
+        }
+        missing = [
+            self.model(user=user, name=name)
+            for name in names if name not in tags
+        ]
+        if missing:
+            # Insert-or-ignore: a tag created by a concurrent request between
+            # the lookup and the insert is skipped by the unique constraint
+            # and loaded together with the inserted ones
+            self.bulk_create(missing, ignore_conflicts=True)
+            tags.update(
+                (tag.name, tag)
+                for tag in self.filter(
+                    user=user,
+                    name__in=[tag.name for tag in missing],
+                )
+            )
+
+        return [tags[name] for name in names]
+
+    def recipe_counts(self):
+        """ Expression of the number of recipes of every tag """
+        links = Recipe.tags.through.objects.filter(
+            tag_id=models.OuterRef('pk'),
+        ).order_by().values('tag_id')
+        return Coalesce(
+            models.Subquery(
+                links.annotate(count=models.Count('pk')).values('count')
+            ),
+            0,
+        )
+
+    def uncount_recipes(self, recipes):
+        """
+        Decrease the counts of the tags of the recipes (a queryset or ids)
+        about to be deleted - A single query for any number of recipes
+        """
+        links = Recipe.tags.through.objects.filter(recipe__in=recipes)
+        counts = links.filter(
+            tag_id=models.OuterRef('pk'),
+        ).order_by().values('tag_id').annotate(
+            count=models.Count('pk'),
+        ).values('count')
+        # A count made wrong by a write outside of the application must not
+        # make the deletes fail on the check of the column,
+        # repair_tag_counts fixes it
+        return self.filter(pk__in=links.values('tag_id')).update(
+            recipe_count=Greatest(
+                models.F('recipe_count') - models.Subquery(counts), 0,
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def refresh_recipe_counts(self, pks):
+        """
+        Count again the recipes of the tags with the given ids - For the
+        writes which change the links without sending m2m_changed
+        """
+        return self.filter(pk__in=pks).update(
+            recipe_count=self.recipe_counts(),
+            updated_at=timezone.now(),
+        )
+
+
 class Tag(models.Model):
     """ Tag for filtering recipes """
     name = models.CharField(max_length=255)
@@ -90,6 +244,56 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Number of recipes with the tag - Kept by the m2m_changed handlers of
+    # core.signals and by the deletes of the recipes, repaired with the
+    # repair_tag_counts command
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TagManager()
+
+    class Meta:
+        # The tags are listed by user ordered by name - Including the id makes
+        # the constraint index cover the whole list query
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                include=['id'],
+                name='core_tag_unique_user_name',
+            ),
+        ]
+        indexes = [
+            # Pages of ?ordering=count, scanned backwards
+            models.Index(
+                fields=['user', 'recipe_count', 'id'],
+                name='core_tag_user_count_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The counter is only written by its handlers - Saving an instance
+        # loaded before a change of the links must not overwrite it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
+
+
+class ImportProgress(models.Model):
+    """
+    Number of records of a file imported by the import_recipes command - It's
+    saved in the same transaction as every batch so an interrupted import
+    can be resumed exactly where it stopped
+    """
+    source = models.CharField(max_length=1024, unique=True)
+    records = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source}: {self.records}'
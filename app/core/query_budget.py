@@ -0,0 +1,142 @@
+"""
+    Query budgets for the API endpoints
+
+    Every view can declare the maximum number of queries that each of its
+    actions is allowed to run in the `query_budgets` attribute:
+
+        class RecipeViewSet(viewsets.ModelViewSet):
+            query_budgets = {'list': 3, 'retrieve': 3}
+
+    The keys are the viewset actions, or the lowercase HTTP methods for plain
+    API views. The budgets are checked by QueryBudgetMiddleware when the
+    QUERY_BUDGETS_ENFORCED setting is on (it defaults to DEBUG) and can be
+    asserted in the tests with the QueryBudget context manager
+"""
+
+import asyncio
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+class QueryBudgetExceeded(AssertionError):
+    """ Raised when a block of code runs more queries than its budget """
+
+
+class QueryCounter:
+    """ Context manager which counts the queries run in every database """
+
+    def __init__(self):
+        self.count = 0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """ Execute wrapper - Called by Django for every query """
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.count = 0
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        self._stack = None
+
+
+class QueryBudget(QueryCounter):
+    """
+    Count the queries of a block and raise QueryBudgetExceeded if they are
+    more than the budget:
+
+        with QueryBudget(3, 'recipe list'):
+            client.get(RECIPES_URL)
+    """
+
+    def __init__(self, budget, label='block'):
+        super().__init__()
+        self.budget = budget
+        self.label = label
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.count > self.budget:
+            raise QueryBudgetExceeded(
+                f'{self.label} ran {self.count} queries, '
+                f'its budget is {self.budget}'
+            )
+
+
+def get_view_budget(view_func, method):
+    """
+    Return the (label, budget) declared by the view for the HTTP method or
+    None if the view doesn't declare a budget
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    if not budgets:
+        return None
+
+    method = method.lower()
+    # Viewsets are mapped to actions (list, retrieve...) by the router
+    actions = getattr(view_func, 'actions', None)
+    name = actions.get(method, method) if actions else method
+    if name not in budgets:
+        return None
+
+    return f'{view_class.__name__}.{name}', budgets[name]
+
+
+class QueryBudgetMiddleware(MiddlewareMixin):
+    """
+    Fail the requests which run more queries than the view budget
+
+    Under ASGI the views run in other threads, whose queries can't be counted
+    here: the async views count them themselves (core.async_api) and the
+    other views aren't checked
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_BUDGETS_ENFORCED', False):
+            return self.get_response(request)
+
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+
+        self.check_budget(request, counter.count)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+
+        count = getattr(request, '_query_count', None)
+        if count is not None and getattr(
+            settings, 'QUERY_BUDGETS_ENFORCED', False,
+        ):
+            self.check_budget(request, count)
+
+        return response
+
+    def check_budget(self, request, count):
+        """ Raise QueryBudgetExceeded if the view ran too many queries """
+        # The resolver match is used instead of process_view, which would
+        # be run in a thread under ASGI
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return
+
+        view_budget = get_view_budget(match.func, request.method)
+        if view_budget is not None:
+            label, budget = view_budget
+            if count > budget:
+                raise QueryBudgetExceeded(
+                    f'{request.method} {request.path} ({label}) ran '
+                    f'{count} queries, its budget is {budget}'
+                )
@@ -0,0 +1,89 @@
+"""
+    JSON renderer and parser backed by orjson
+
+    Drop-in replacements of the DRF JSONRenderer and JSONParser: the output
+    is byte for byte the one of the standard library encoder with the DRF
+    settings (compact, UTF-8, U+2028/U+2029 escaped) and the parsed data is
+    the same. The types orjson doesn't know (Decimal, datetime, lazy
+    strings...) are converted by the DRF encoder, and whatever orjson can't
+    handle (integers over 64 bits, indented output, other charsets) is left
+    to the DRF classes. orjson is optional, without it both classes are the
+    DRF ones
+
+    Floats are the exception: orjson writes the exponent of very large or
+    small floats without '+' and padding (1e16, not 1e+16) and NaN as null.
+    The API doesn't send floats, the decimals are strings
+
+    The rendering is counted in the render time of the request (core.metrics)
+"""
+
+import codecs
+import io
+
+from django.conf import settings
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.metrics import measure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """ JSONRenderer rendering with orjson """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # The datetimes go through the DRF encoder, which writes UTC as Z
+        encoder = self.encoder_class()
+        try:
+            rendered = orjson.dumps(
+                data,
+                default=encoder.default,
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Valid JSON but not valid JavaScript, escaped like JSONRenderer does
+        return rendered.replace(
+            b'\xe2\x80\xa8', b'\\u2028',
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029',
+        )
+
+
+class ORJSONParser(JSONParser):
+    """ JSONParser parsing with orjson """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # The standard library accepts a few documents orjson rejects
+            # (integers over 64 bits, lone surrogates) and reports the errors
+            return super().parse(io.BytesIO(body), media_type, parser_context)
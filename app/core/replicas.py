@@ -0,0 +1,128 @@
+"""
+    Reads of the API views on replicas of the database
+
+    The views with ReplicaReadMixin run the queries of their safe requests
+    (GET, HEAD, OPTIONS) on a replica picked at random, the ReplicaRouter in
+    DATABASE_ROUTERS sends them there. The writes always go to the default
+    database.
+
+    A replica lags behind the primary, so after a request which writes the
+    reads of the user stay on the primary for STICKY_SECONDS: a client never
+    reads older data than what it wrote. The users are remembered in the
+    Django cache, which must be shared by the processes for that to hold
+    across them
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULT_DATABASE_REPLICAS = {
+    # Aliases of the replicas in DATABASES
+    'ALIASES': [],
+    # Seconds the reads of a user stay on the primary after a write
+    'STICKY_SECONDS': 5,
+    # Alias of the CACHES backend remembering the users who wrote
+    'CACHE_ALIAS': 'default',
+}
+
+_read_database = contextvars.ContextVar('read_database', default=None)
+
+
+def get_replicas_config():
+    """ Return the DATABASE_REPLICAS setting with the defaults """
+    return {
+        **DEFAULT_DATABASE_REPLICAS,
+        **getattr(settings, 'DATABASE_REPLICAS', {}),
+    }
+
+
+def get_read_database():
+    """ Return the replica read by the current request or None """
+    return _read_database.get()
+
+
+def _sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """ Read the data of the user from the primary for a while """
+    config = get_replicas_config()
+    if config['ALIASES'] and config['STICKY_SECONDS'] > 0:
+        caches[config['CACHE_ALIAS']].set(
+            _sticky_key(user_id), True, config['STICKY_SECONDS'],
+        )
+
+
+def choose_replica(user):
+    """
+    Return the replica to read the data of the user from or None if it must
+    be read from the primary
+    """
+    config = get_replicas_config()
+    if not config['ALIASES']:
+        return None
+    # A transaction of the request (ATOMIC_REQUESTS, tests) can hold writes
+    # the replicas don't see
+    if transaction.get_connection().in_atomic_block:
+        return None
+    if user.is_authenticated and caches[config['CACHE_ALIAS']].get(
+        _sticky_key(user.pk),
+    ):
+        return None
+    return random.choice(config['ALIASES'])
+
+
+class ReplicaRouter:
+    """ Route the reads to the replica chosen for the request """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Not the database of the instance, which can come from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas_config()['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas get the schema from the primary
+        if db != DEFAULT_DB_ALIAS and db in get_replicas_config()['ALIASES']:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Read from a replica in the safe requests of the view and stick the user
+    to the primary when it writes
+    """
+
+    def initial(self, request, *args, **kwargs):
+        # The user is authenticated on the primary
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            if request.user.is_authenticated:
+                stick_to_primary(request.user.pk)
+            return
+
+        replica = choose_replica(request.user)
+        if replica is not None:
+            self._read_database_token = _read_database.set(replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_database_token', None)
+        if token is not None:
+            _read_database.reset(token)
+            self._read_database_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,152 @@
+"""
+    Signal handlers of the core models
+"""
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import get_token_cache
+from core.cache import RECIPES, TAGS, invalidate_lists
+from core.models import Recipe, Tag
+
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    """ Stop accepting a deleted token """
+    get_token_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def uncache_user_tokens(sender, instance, created=False, **kwargs):
+    """
+    Drop the cached tokens of a user when it changes, so deactivating it or
+    changing its password takes effect on the next request
+    """
+    if created:
+        return
+
+    cache = get_token_cache()
+    keys = ()
+    if cache.shared is not None:
+        # Other processes may have cached tokens this one has never seen
+        keys = Token.objects.filter(user_id=instance.pk).values_list(
+            'key', flat=True,
+        )
+    cache.delete_user(instance.pk, keys)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipes_on_tags_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """ Update the last modification of the recipes whose tags changed """
+    if not reverse:
+        # recipe.tags.add/remove/clear()
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.updated_at = timezone.now()
+            Recipe.objects.filter(pk=instance.pk).update(
+                updated_at=instance.updated_at,
+            )
+        return
+
+    # tag.recipe_set.add/remove/clear() - pk_set has the recipe ids, except
+    # on clear where they must be read before the links are removed
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_recipe_ids', None)
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if pk_set:
+        Recipe.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+
+
+def _add_to_recipe_counts(tags, count):
+    # A count made wrong by a write outside of the application must not make
+    # the deletes fail on the check of the column, repair_tag_counts fixes it
+    tags.update(
+        recipe_count=Greatest(F('recipe_count') + count, 0),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def count_tag_recipes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep the recipe_count of the tags - The links removed are read before
+    the remove/clear, pk_set has the requested ids, not only the linked ones
+    """
+    if reverse:
+        # tag.recipe_set.add/remove/clear()
+        links = sender.objects.filter(tag_id=instance.pk)
+        tags = Tag.objects.filter(pk=instance.pk)
+        if action == 'post_add' and pk_set:
+            _add_to_recipe_counts(tags, len(pk_set))
+        elif action == 'pre_remove':
+            instance._removed_links = links.filter(
+                recipe_id__in=pk_set,
+            ).count()
+        elif action == 'pre_clear':
+            instance._removed_links = links.count()
+        elif action in ('post_remove', 'post_clear'):
+            removed = instance.__dict__.pop('_removed_links', 0)
+            if removed:
+                _add_to_recipe_counts(tags, -removed)
+        return
+
+    # recipe.tags.add/remove/clear()
+    links = sender.objects.filter(recipe_id=instance.pk)
+    if action == 'post_add' and pk_set:
+        _add_to_recipe_counts(Tag.objects.filter(pk__in=pk_set), 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        if action == 'pre_remove':
+            links = links.filter(tag_id__in=pk_set)
+        instance._removed_tag_ids = list(
+            links.values_list('tag_id', flat=True)
+        )
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop('_removed_tag_ids', None)
+        if removed:
+            _add_to_recipe_counts(Tag.objects.filter(pk__in=removed), -1)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe_lists(sender, instance, **kwargs):
+    """ Make the cached recipe lists of the owner stale """
+    invalidate_lists(instance.user_id, RECIPES)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_lists_on_recipe_delete(sender, instance, **kwargs):
+    """ Deleting a recipe changes the counts of its tags too """
+    invalidate_lists(instance.user_id, RECIPES, TAGS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_lists(sender, instance, **kwargs):
+    """ The tags are nested in the recipes, both lists are stale """
+    invalidate_lists(instance.user_id, RECIPES, TAGS)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_lists_on_tags_change(sender, instance, action, **kwargs):
+    """
+    Make the lists stale when the tags of a recipe change - The counts of
+    the tags change too
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_lists(instance.user_id, RECIPES, TAGS)
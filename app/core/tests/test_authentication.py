@@ -0,0 +1,159 @@
+"""
+    Tests for the cached token authentication
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    get_token_cache,
+)
+
+
+def create_user(email='auth@example.com', password='pass1234'):
+    """ Create and return a user """
+    return get_user_model().objects.create_user(email, password)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """ Test the authentication with cached tokens """
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_token_no_queries(self):
+        """ Test the second authentication with a token runs no query """
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_cached_user_not_shared(self):
+        """ Test every request gets its own user from the cache """
+        self.auth.authenticate_credentials(self.token.key)
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        # Changed by a request but never saved
+        user.name = 'Changed'
+        user.set_password('newpass1234')
+
+        with self.assertNumQueries(0):
+            other, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertIsNot(other, user)
+        self.assertEqual(other.name, self.user.name)
+        self.assertTrue(other.check_password('pass1234'))
+        self.assertIs(token.user, other)
+        self.assertFalse(other._state.adding)
+
+    def test_invalid_token(self):
+        """ Test invalid tokens are rejected and not cached """
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+        self.assertIsNone(get_token_cache().get('invalid'))
+
+    def test_deleted_token_rejected(self):
+        """ Test a deleted token stops working immediately """
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_rejected(self):
+        """ Test the token of a deactivated user stops working """
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_password_change_uncaches_token(self):
+        """ Test changing the password drops the cached token """
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.set_password('newpass1234')
+        self.user.save()
+
+        self.assertIsNone(get_token_cache().get(self.token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_cache(self):
+        """ Test the tokens are shared through the Django cache """
+        self.auth.authenticate_credentials(self.token.key)
+
+        # A new process only sees the shared cache
+        get_token_cache().clear()
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+        self.user.is_active = False
+        self.user.save()
+        get_token_cache().clear()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+
+class TokenCacheTests(TestCase):
+    """ Test the LRU and expiration of the token cache """
+
+    def setUp(self):
+        user = create_user()
+        self.tokens = [Token(key=f'key{i}', user=user) for i in range(3)]
+
+    def test_least_recently_used_evicted(self):
+        """ Test the least recently used token is evicted when full """
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('key0', self.tokens[0])
+        cache.set('key1', self.tokens[1])
+        cache.get('key0')
+        cache.set('key2', self.tokens[2])
+
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNone(cache.get('key1'))
+        self.assertIsNotNone(cache.get('key2'))
+
+    @patch('core.authentication.time.monotonic')
+    def test_expired_token(self, patched_monotonic):
+        """ Test the tokens expire after the TTL """
+        cache = TokenCache(ttl=60)
+        patched_monotonic.return_value = 100
+        cache.set('key0', self.tokens[0])
+
+        patched_monotonic.return_value = 159
+        self.assertIsNotNone(cache.get('key0'))
+        patched_monotonic.return_value = 161
+        self.assertIsNone(cache.get('key0'))
+
+    def test_stats(self):
+        """ Test the hits and misses are counted """
+        cache = TokenCache()
+        cache.get('key0')
+        cache.set('key0', self.tokens[0])
+        cache.get('key0')
+        cache.get('key0')
+
+        stats = cache.stats()
+
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
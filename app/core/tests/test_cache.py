@@ -0,0 +1,133 @@
+"""
+    Tests for the cache of the list responses
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import RECIPES, get_list_cache
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'list-cache-tests',
+        },
+    },
+    LIST_CACHE={'ENABLED': True},
+)
+class ListCacheTests(TestCase):
+    """ Test the lists are cached and invalidated """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='cache@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=Decimal('3.00'),
+        )
+
+    def get_titles(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_recipe_list_cached(self):
+        """ Test the second request doesn't run the list queries """
+        before = get_list_cache().stats().get(
+            RECIPES, {'hits': 0, 'misses': 0},
+        )
+        first = self.client.get(RECIPES_URL)
+
+        # Only the aggregate query of the ETag
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(first.data, second.data)
+        stats = get_list_cache().stats()[RECIPES]
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(
+            stats['hit_rate'],
+            stats['hits'] / (stats['hits'] + stats['misses']),
+        )
+
+    def test_invalidated_on_recipe_save_and_delete(self):
+        """ Test saving or deleting a recipe invalidates the list """
+        self.get_titles()
+
+        self.recipe.title = 'Soup'
+        self.recipe.save()
+        self.assertEqual(self.get_titles(), ['Soup'])
+
+        self.recipe.delete()
+        self.assertEqual(self.get_titles(), [])
+
+    def test_invalidated_on_tags_change(self):
+        """ Test changing the tags of a recipe or a tag invalidates it """
+        self.client.get(RECIPES_URL)
+
+        self.recipe.tags.add(self.tag)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'],
+            'Vegetarian',
+        )
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
+
+    def test_cached_per_user_and_params(self):
+        """ Test the users and the query parameters don't share entries """
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(self.get_titles(), [])
+
+        self.client.force_authenticate(self.user)
+        res = self.client.get(RECIPES_URL + '?page_size=1')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_invalidated_by_bulk_endpoint(self):
+        """ Test the bulk endpoint invalidates the list """
+        self.get_titles()
+        payload = [{'id': self.recipe.id, 'title': 'Bulk'}]
+
+        self.client.post(
+            reverse('recipe:recipe-bulk'),
+            payload,
+            format='json',
+        )
+
+        self.assertEqual(self.get_titles(), ['Bulk'])
+
+    @override_settings(LIST_CACHE={'ENABLED': False})
+    def test_cache_disabled(self):
+        """ Test the lists can be served without the cache """
+        self.assertIsNone(get_list_cache())
+        self.assertEqual(self.get_titles(), ['Salad'])
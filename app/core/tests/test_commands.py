@@ -1,13 +1,26 @@
 """
 Test custom Django management commands.
 """
+import json
+import os
+import socket
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.import_recipes import clean_record, read_csv
+from core.management.commands.seed_data import generate_user, zipf_weights
+from core.management.commands.wait_for_db import SSL_REQUEST, probe
+from core.models import ImportProgress, Recipe, Tag
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,4 +44,299 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db_backoff(self, patched_probe, patched_sleep,
+                                 patched_check):
+        """Test the delay between the attempts doubles up to a limit."""
+        patched_check.side_effect = [OperationalError] * 6 + [True]
+
+        call_command('wait_for_db', interval=0.25, stdout=StringIO())
+
+        self.assertEqual(
+            [c.args[0] for c in patched_sleep.call_args_list],
+            [0.25, 0.5, 1, 2, 2, 2],
+        )
+
+    @patch('time.sleep')
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db_timeout(self, patched_probe, patched_sleep,
+                                 patched_check):
+        """Test the command fails when the database isn't up in time."""
+        patched_probe.side_effect = ConnectionRefusedError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        patched_sleep.assert_not_called()
+        patched_check.assert_not_called()
+
+    @patch('core.management.commands.wait_for_db.Command.probe')
+    def test_wait_for_db_databases(self, patched_probe, patched_check):
+        """Test waiting for several databases checks each of them."""
+        call_command(
+            'wait_for_db', databases=['default', 'other'], stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            sorted(c.kwargs['databases'] for c in patched_check.mock_calls),
+            [['default'], ['other']],
+        )
+
+
+class ProbeTests(SimpleTestCase):
+    """Test the readiness probe of wait_for_db."""
+
+    def serve(self, reply):
+        """Answer the first connection with reply - Return the port."""
+        server = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(server.close)
+
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                self.received = conn.recv(8)
+                conn.sendall(reply)
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        self.addCleanup(thread.join)
+        return server.getsockname()[1]
+
+    def test_probe_postgresql(self):
+        """Test the probe sends an SSLRequest to the server."""
+        port = self.serve(b'N')
+
+        probe('127.0.0.1', port, 1)
+
+        self.assertEqual(self.received, SSL_REQUEST)
+
+    def test_probe_other_server(self):
+        """Test the probe fails when the server doesn't speak PostgreSQL."""
+        port = self.serve(b'HTTP/1.1 400 Bad Request\r\n')
+
+        with self.assertRaises(OSError):
+            probe('127.0.0.1', port, 1)
+
+    def test_probe_closed_port(self):
+        """Test the probe fails when nothing listens."""
+        server = socket.create_server(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        server.close()
+
+        with self.assertRaises(OSError):
+            probe('127.0.0.1', port, 1)
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'import@example.com',
+            'pass1234',
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_import_jsonl(self):
+        """Test importing recipes and tags from JSON lines."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        records = [
+            {'title': 'Salad', 'time_minutes': 5, 'price': '3.5',
+             'tags': ['Vegan', 'Lunch']},
+            {'title': 'Soup', 'time_minutes': 30, 'price': 4,
+             'description': 'Hot', 'tags': ['Lunch']},
+            {'title': 'Bad price', 'time_minutes': 5, 'price': 'free'},
+            {'title': 'Unknown', 'time_minutes': 5, 'price': 1,
+             'user': 'nobody@example.com'},
+        ]
+        path = self.write_file(
+            'recipes.jsonl',
+            '\n'.join(json.dumps(record) for record in records),
+        )
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, batch_size=2,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([r.title for r in recipes], ['Salad', 'Soup'])
+        self.assertEqual(recipes[0].price, Decimal('3.50'))
+        self.assertEqual(recipes[1].description, 'Hot')
+        self.assertEqual(
+            sorted(recipes[0].tags.values_list('name', flat=True)),
+            ['Lunch', 'Vegan'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'recipe_count')),
+            {'Vegan': 1, 'Lunch': 2},
+        )
+        self.assertEqual(ImportProgress.objects.get().records, 4)
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV with the user of every row."""
+        path = self.write_file(
+            'recipes.csv',
+            'user,title,time_minutes,price,tags\n'
+            'import@example.com,Pancakes,15,2.00,Breakfast|Sweet\n',
+        )
+
+        call_command('import_recipes', path, stdout=StringIO())
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Pancakes')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Breakfast', 'Sweet'],
+        )
+
+    def test_import_resume(self):
+        """Test resuming skips the records already imported."""
+        path = self.write_file(
+            'recipes.jsonl',
+            '\n'.join(
+                json.dumps({'title': f'R{i}', 'time_minutes': 1, 'price': 1})
+                for i in range(5)
+            ),
+        )
+        ImportProgress.objects.create(source=os.path.abspath(path), records=3)
+
+        call_command(
+            'import_recipes', path,
+            user=self.user.email, resume=True, stdout=StringIO(),
+        )
+
+        titles = Recipe.objects.values_list('title', flat=True)
+        self.assertEqual(sorted(titles), ['R3', 'R4'])
+        self.assertEqual(ImportProgress.objects.get().records, 5)
+
+    def test_read_csv_tags(self):
+        """Test the tags of the CSV files are split."""
+        records = list(read_csv(StringIO('title,tags\nA, x | y ||\nB,\n')))
+
+        self.assertEqual(records[0]['tags'], ['x', 'y'])
+        self.assertEqual(records[1]['tags'], [])
+
+    def test_clean_record_errors(self):
+        """Test invalid records are rejected."""
+        valid = {'title': 'A', 'time_minutes': 1, 'price': 1, 'user': 'u'}
+        invalid = [
+            None,
+            {**valid, 'user': None},
+            {**valid, 'title': ''},
+            {**valid, 'price': 1000},
+            {**valid, 'time_minutes': 'soon'},
+            {**valid, 'tags': 'Vegan'},
+            {**valid, 'title': 5},
+            {**valid, 'link': 7},
+            {**valid, 'description': ['A']},
+            {**valid, 'user': 1},
+            {**valid, 'time_minutes': 10 ** 12},
+            {**valid, 'time_minutes': -2 ** 31 - 1},
+        ]
+
+        self.assertEqual(clean_record(valid)[:2], ['u', 'A'])
+        for record in invalid:
+            with self.assertRaises(ValueError):
+                clean_record(record)
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command."""
+
+    def seed(self, **options):
+        options = {
+            'users': 3, 'recipes': 4, 'tags_per_recipe': 2,
+            'vocabulary': 6, 'batch_size': 5, **options,
+        }
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def recipes_of(self, prefix):
+        """Return the data of the recipes of the users with the prefix."""
+        recipes = Recipe.objects.filter(
+            user__email__startswith=prefix,
+        ).prefetch_related('tags').order_by('user__email', 'title')
+        return [
+            (
+                recipe.user.email.replace(prefix, ''), recipe.title,
+                recipe.description, recipe.time_minutes, recipe.price,
+                sorted(tag.name for tag in recipe.tags.all()),
+            )
+            for recipe in recipes
+        ]
+
+    def test_seed_data(self):
+        """Test generating users with their recipes and tags."""
+        self.seed(password='pass1234')
+
+        users = get_user_model().objects.filter(email__startswith='seed-')
+        self.assertEqual(
+            sorted(users.values_list('email', flat=True)),
+            [f'seed-{i}@example.com' for i in range(3)],
+        )
+        self.assertTrue(users[0].check_password('pass1234'))
+        self.assertEqual(Recipe.objects.filter(user__in=users).count(), 12)
+        for recipe in Recipe.objects.filter(user__in=users):
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertIsNotNone(recipe.search_vector)
+        for tag in Tag.objects.filter(user__in=users):
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+            self.assertTrue(tag.recipe_count > 0)
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed generates the same data in any batches."""
+        self.seed(prefix='a-', batch_size=4)
+        self.seed(prefix='b-', batch_size=100, jobs=1)
+        self.seed(prefix='c-', seed=1)
+
+        self.assertEqual(self.recipes_of('a-'), self.recipes_of('b-'))
+        self.assertNotEqual(self.recipes_of('a-'), self.recipes_of('c-'))
+
+    def test_seed_data_existing_users(self):
+        """Test the users of a previous run aren't generated again."""
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(start=3)
+
+        self.assertEqual(
+            get_user_model().objects.filter(email__startswith='seed-').count(),
+            6,
+        )
+
+    def test_seed_data_overlapping_users(self):
+        """Test a range with existing users in the middle is rejected."""
+        self.seed(start=1, users=1)
+
+        with self.assertRaisesMessage(CommandError, 'seed-1@example.com'):
+            self.seed(users=3)
+
+        self.assertEqual(
+            get_user_model().objects.filter(email__startswith='seed-').count(),
+            1,
+        )
+
+    def test_zipf_tags(self):
+        """Test the first tags of the vocabulary are the most frequent."""
+        recipes = generate_user(0, 0, 2000, 1, zipf_weights(50, 1.1))
+        counts = [0] * 50
+        for *_, ranks in recipes:
+            counts[ranks[0]] += 1
+
+        self.assertGreater(counts[0], counts[5])
+        self.assertGreater(counts[5], counts[40])
@@ -0,0 +1,158 @@
+"""
+    Tests for the pool of database connections
+"""
+
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.db_pool.base import DatabaseWrapper
+from core.db_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """ Connection which records its rollbacks and closes """
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.broken = False
+
+    def rollback(self):
+        if self.broken:
+            raise Exception('server closed the connection')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ Test the checkouts of the pool """
+
+    def make_pool(self, **kwargs):
+        self.opened = []
+        self.pings = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        def ping(conn):
+            self.pings.append(conn)
+            if conn.broken:
+                raise Exception('server closed the connection')
+
+        return ConnectionPool(connect, ping, name='test', **kwargs)
+
+    def test_connections_reused(self):
+        """ Test a connection given back is checked out again """
+        pool = self.make_pool()
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(first.rollbacks, 1)
+
+    def test_timeout_when_full(self):
+        """ Test a checkout fails when every connection stays in use """
+        pool = self.make_pool(max_size=2, timeout=0.01)
+        pool.getconn()
+        pool.getconn()
+
+        with self.assertLogs('core.db_pool.pool', 'WARNING'):
+            with self.assertRaises(PoolTimeout):
+                pool.getconn()
+
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 2)
+        self.assertEqual(stats['saturation'], 1.0)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+
+    def test_broken_connection_discarded(self):
+        """ Test a connection which can't roll back isn't reused """
+        pool = self.make_pool()
+        conn = pool.getconn()
+        conn.broken = True
+
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_idle_connection_pinged(self):
+        """ Test the connections idle for long are checked on checkout """
+        pool = self.make_pool(check_idle=5)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(self.pings, [])
+        pool.putconn(conn)
+
+        conn.broken = True
+        with patch('core.db_pool.pool.time.monotonic') as monotonic:
+            monotonic.return_value = pool._idle[0].last_used + 6
+            new = pool.getconn()
+
+        self.assertEqual(self.pings, [conn])
+        self.assertIsNot(new, conn)
+        self.assertTrue(conn.closed)
+
+    def test_max_lifetime(self):
+        """ Test the old connections are closed when given back """
+        pool = self.make_pool(max_lifetime=0)
+        conn = pool.getconn()
+
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['connections_closed'], 1)
+
+    def test_waiting_checkout_served(self):
+        """ Test a checkout waits for a connection given back """
+        pool = self.make_pool(max_size=1, timeout=1)
+        conn = pool.getconn()
+
+        with patch.object(pool._condition, 'wait') as wait:
+            wait.side_effect = lambda timeout: pool._idle.append(
+                pool._in_use.pop(id(conn))
+            )
+            self.assertIs(pool.getconn(), conn)
+
+        self.assertEqual(pool.stats()['waits'], 1)
+
+
+class PooledBackendTests(TransactionTestCase):
+    """ Test the database wrapper of the pooled backend """
+
+    def test_connection_back_to_pool(self):
+        """ Test closing a connection gives it back to the pool """
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'core.db_pool',
+            'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.1},
+        }
+        first = DatabaseWrapper(settings_dict, alias='pool-test')
+        second = DatabaseWrapper(settings_dict, alias='pool-test')
+        pool = first.get_pool(first.get_connection_params())
+        self.addCleanup(pool.close)
+
+        with first.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = first.connection
+        with self.assertLogs('core.db_pool.pool', 'WARNING'):
+            with self.assertRaises(PoolTimeout):
+                second.ensure_connection()
+        first.close()
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIs(second.connection, raw)
+        self.assertEqual(pool.stats()['connections_opened'], 1)
+        second.close()
@@ -0,0 +1,101 @@
+"""
+    Tests for the password hashing executor
+"""
+
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import HashingBusy, HashingExecutor
+
+
+class HashingExecutorTests(SimpleTestCase):
+    """ Test hashing the passwords in a pool """
+
+    def test_process_pool(self):
+        """ Test hashing and checking passwords in worker processes """
+        executor = HashingExecutor(kind='process', max_workers=1)
+        try:
+            encoded = executor.make_password('pass1234')
+
+            self.assertTrue(executor.check_password('pass1234', encoded))
+            self.assertFalse(executor.check_password('wrong', encoded))
+        finally:
+            executor.shutdown()
+
+    def test_unusable_password(self):
+        """ Test no password matches an unusable password """
+        executor = HashingExecutor(kind='inline')
+        encoded = executor.make_password(None)
+
+        self.assertFalse(executor.check_password('', encoded))
+        self.assertFalse(executor.check_password(None, encoded))
+
+    def test_admission_control(self):
+        """ Test the requests are rejected when the pool is full """
+        executor = HashingExecutor(
+            kind='thread',
+            max_workers=1,
+            max_pending=0,
+            admission_timeout=0,
+        )
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=executor.run, args=(block,))
+        thread.start()
+        try:
+            started.wait(5)
+            with self.assertRaises(HashingBusy):
+                executor.make_password('pass1234')
+        finally:
+            release.set()
+            thread.join()
+            executor.shutdown()
+
+        self.assertTrue(executor.make_password('pass1234'))
+
+
+@override_settings(PASSWORD_HASHING={'EXECUTOR': 'thread'})
+class HashingApiTests(TestCase):
+    """ Test the user endpoints with the hashing executor """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_with_executor(self):
+        """ Test the token endpoint checks the password in the executor """
+        get_user_model().objects.create_user('hash@example.com', 'pass1234')
+        payload = {'email': 'hash@example.com', 'password': 'pass1234'}
+
+        res = self.client.post(reverse('user:token'), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+
+    @patch('core.hashing.HashingExecutor.run', side_effect=HashingBusy)
+    def test_signup_rejected_when_busy(self, patched_run):
+        """ Test a signup is rejected with a 503 when the pool is full """
+        payload = {
+            'email': 'busy@example.com',
+            'password': 'pass1234',
+            'name': 'Busy',
+        }
+
+        res = self.client.post(reverse('user:create'), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+        self.assertFalse(
+            get_user_model().objects.filter(email=payload['email']).exists()
+        )
@@ -0,0 +1,310 @@
+"""
+    Tests for the performance metrics of the requests
+"""
+
+import re
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.async_api import async_patterns
+from core.metrics import Histogram, RequestMetrics, RequestTimings, measure
+from core.models import Recipe
+from recipe import urls
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+METRICS_URL = reverse('api-metrics')
+METRICS_TOKEN = 'secret'
+
+urlpatterns = [
+    path('api/metrics/', metrics.metrics_view, name='api-metrics'),
+    path('api/recipe/', include(
+        (async_patterns(urls.router.urls, urls.ASYNC_VIEWS), 'recipe'),
+    )),
+]
+
+
+def parse_server_timing(header):
+    """ Return {name: (milliseconds, description)} of the header """
+    timings = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        timings[name] = (float(params['dur']), params.get('desc'))
+    return timings
+
+
+@override_settings(
+    METRICS={'TOKEN': METRICS_TOKEN}, LIST_CACHE={'ENABLED': False},
+)
+class RequestMetricsTests(TestCase):
+    """ Test the timings of the API requests """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='metrics@example.com',
+            password='pass1234',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+
+    def get_metrics(self):
+        """ Return the response of the metrics with the token """
+        return self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}',
+        )
+
+    def test_server_timing_header(self):
+        """ Test the timings of the request are sent in Server-Timing """
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = parse_server_timing(res['Server-Timing'])
+        self.assertEqual(
+            set(timings), {'db', 'serialize', 'render', 'total'},
+        )
+        self.assertEqual(timings['db'][1], f'"{len(queries)} queries"')
+        self.assertGreater(timings['serialize'][0], 0)
+        self.assertGreater(timings['render'][0], 0)
+        self.assertGreaterEqual(
+            timings['total'][0],
+            timings['db'][0] + timings['serialize'][0] + timings['render'][0],
+        )
+
+    def test_serializer_timed(self):
+        """ Test the serializers of the views are timed """
+        res = self.client.patch(ME_URL, {'name': 'Chef'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = parse_server_timing(res['Server-Timing'])
+        self.assertGreater(timings['serialize'][0], 0)
+
+    def test_histograms_per_endpoint(self):
+        """ Test the requests are counted in the histograms of the view """
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        self.client.get(ME_URL)
+
+        res = self.get_metrics()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertNotIn('Server-Timing', res)
+        content = res.content.decode()
+        self.assertIn(
+            'api_request_duration_seconds_count'
+            '{endpoint="recipe:recipe-list",method="GET"} 2\n',
+            content,
+        )
+        self.assertIn(
+            'api_request_queries_count'
+            '{endpoint="user:me",method="GET"} 1\n',
+            content,
+        )
+        self.assertIn(
+            'api_request_render_duration_seconds_bucket'
+            '{endpoint="recipe:recipe-list",method="GET",le="+Inf"} 2\n',
+            content,
+        )
+        self.assertNotIn('api-metrics', content)
+
+    @override_settings(
+        METRICS={'TOKEN': METRICS_TOKEN, 'SERVER_TIMING': False},
+    )
+    def test_server_timing_off(self):
+        """ Test the requests are only counted without the header """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertIn(
+            'endpoint="recipe:recipe-list"',
+            self.get_metrics().content.decode(),
+        )
+
+    @override_settings(METRICS={'ENABLED': False})
+    def test_disabled(self):
+        """ Test nothing is timed when the metrics are off """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_metrics_token(self):
+        """ Test the metrics are only served with the token if there's one """
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong',
+        )
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.get_metrics()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS={})
+    def test_no_token_only_debug(self):
+        """ Test the metrics without a token are only served in DEBUG """
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        with override_settings(DEBUG=True):
+            res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_pool_and_list_cache_metrics(self):
+        """ Test the stats of the pools and the list cache are exported """
+        pools = {'default:devdb': {
+            'max_size': 20, 'size': 3, 'in_use': 2, 'waiting': 0,
+            'saturation': 0.1, 'checkouts': 9, 'waits': 0, 'timeouts': 0,
+            'wait_seconds': 0.0,
+        }}
+
+        with override_settings(LIST_CACHE={'ENABLED': True}), patch(
+            'core.db_pool.get_pool_stats', return_value=pools,
+        ):
+            self.client.get(RECIPES_URL)
+            self.client.get(RECIPES_URL)
+            content = self.get_metrics().content.decode()
+
+        self.assertIn(
+            'db_pool_connections_in_use{pool="default:devdb"} 2\n', content,
+        )
+        self.assertIn('list_cache_hits_total{kind="recipes"} 1\n', content)
+        self.assertIn('list_cache_misses_total{kind="recipes"} 1\n', content)
+
+
+class MeasureTests(TestCase):
+    """ Test the timings of the blocks and the queries """
+
+    def setUp(self):
+        self.timings = RequestTimings()
+        token = metrics._timings.set(self.timings)
+        self.addCleanup(metrics._timings.reset, token)
+
+    def test_queries_timed(self):
+        """ Test the connections time the queries of the request """
+        connection.ensure_connection()
+        self.assertEqual(
+            connection.execute_wrappers.count(metrics.time_query), 1,
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertEqual(self.timings.queries, 1)
+        self.assertGreater(self.timings.db, 0)
+
+    def test_queries_out_of_block(self):
+        """ Test the time of the queries isn't counted in the block """
+        # Start and end of the block, of the query in it
+        with patch('core.metrics.time.perf_counter') as perf_counter:
+            perf_counter.side_effect = [0, 1, 4, 10]
+            with measure('serialize'), connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        self.assertEqual(self.timings.db, 3)
+        self.assertEqual(self.timings.serialize, 7)
+
+    def test_nothing_timed_out_of_request(self):
+        """ Test the blocks out of a request aren't timed """
+        metrics._timings.set(None)
+
+        with measure('render'), connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertEqual(self.timings.render, 0)
+        self.assertEqual(self.timings.queries, 0)
+
+
+class HistogramTests(SimpleTestCase):
+    """ Test the histograms in the Prometheus format """
+
+    def test_buckets(self):
+        """ Test the counts of the buckets are cumulative """
+        histogram = Histogram([1, 5])
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.snapshot(), ([2, 3, 4], 11.5, 4))
+
+    def test_collect(self):
+        """ Test the lines of the histograms of an endpoint """
+        request_metrics = RequestMetrics(buckets=[0.1], query_buckets=[2])
+        timings = RequestTimings()
+        timings.queries = 3
+        request_metrics.observe('recipe:recipe-list', 'GET', timings, 0.05)
+
+        lines = request_metrics.collect()
+
+        labels = 'endpoint="recipe:recipe-list",method="GET"'
+        self.assertIn(
+            f'api_request_duration_seconds_bucket{{{labels},le="0.1"}} 1',
+            lines,
+        )
+        self.assertIn(
+            f'api_request_queries_bucket{{{labels},le="2"}} 0', lines,
+        )
+        self.assertIn(f'api_request_queries_sum{{{labels}}} 3', lines)
+        self.assertIn('# TYPE api_request_queries histogram', lines)
+
+    def test_labels_escaped(self):
+        """ Test the quotes and backslashes of the labels are escaped """
+        self.assertEqual(
+            metrics._labels(endpoint='a"b\\c\n'), r'{endpoint="a\"b\\c\n"}',
+        )
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    METRICS={},
+    LIST_CACHE={'ENABLED': False},
+    ASYNC_API={'MAX_WORKERS': 1},
+)
+class AsyncMetricsTests(TransactionTestCase):
+    """ Test the async views are timed in the threads of the executor """
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='metrics@example.com',
+            password='pass1234',
+        )
+        self.token = Token.objects.create(user=user)
+        Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'),
+        )
+
+    async def test_async_view_timed(self):
+        """ Test the queries of the async views are counted """
+        res = await AsyncClient().get(
+            RECIPES_URL, authorization=f'Token {self.token.key}',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = parse_server_timing(res['Server-Timing'])
+        queries = re.fullmatch(r'"(\d+) queries"', timings['db'][1])
+        self.assertGreater(int(queries[1]), 0)
+        self.assertGreater(timings['render'][0], 0)
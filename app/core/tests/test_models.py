@@ -82,4 +82,19 @@ class ModelTests(TestCase):
         user = create_user()
         tag = models.Tag.objects.create(user=user, name="Tag 1")
 
-        self.assertEqual(str(tag), tag.name)
\ No newline at end of file
+        self.assertEqual(str(tag), tag.name)
+
+    def test_get_or_create_many_tags(self):
+        """ Test getting or creating several tags at once """
+        user = create_user()
+        existing = models.Tag.objects.create(user=user, name='Vegan')
+
+        tags = models.Tag.objects.get_or_create_many(
+            user,
+            ['Dinner', 'Vegan', 'Dinner'],
+        )
+
+        self.assertEqual([tag.name for tag in tags], ['Dinner', 'Vegan'])
+        self.assertEqual(tags[1], existing)
+        self.assertIsNotNone(tags[0].pk)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
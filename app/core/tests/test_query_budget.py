@@ -0,0 +1,75 @@
+"""
+    Tests for the query budgets
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from rest_framework import generics
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from core.query_budget import (
+    QueryBudget,
+    QueryBudgetExceeded,
+    QueryCounter,
+)
+
+
+class UserCountView(generics.GenericAPIView):
+    """ View which runs two queries """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    query_budgets = {'get': 1}
+
+    def get(self, request):
+        users = get_user_model().objects
+        return Response({'count': users.count(), 'exists': users.exists()})
+
+
+urlpatterns = [
+    path('count/', UserCountView.as_view()),
+]
+
+
+class QueryBudgetTests(TestCase):
+    """ Test the query budget helpers """
+
+    def test_query_counter(self):
+        """ Test the queries of the block are counted """
+        with QueryCounter() as counter:
+            get_user_model().objects.count()
+            get_user_model().objects.exists()
+
+        self.assertEqual(counter.count, 2)
+
+    def test_query_budget_respected(self):
+        """ Test no error is raised when the block is within the budget """
+        with QueryBudget(1):
+            get_user_model().objects.count()
+
+    def test_query_budget_exceeded(self):
+        """ Test an error is raised when the block exceeds the budget """
+        with self.assertRaises(QueryBudgetExceeded):
+            with QueryBudget(1):
+                get_user_model().objects.count()
+                get_user_model().objects.count()
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryBudgetMiddlewareTests(TestCase):
+    """ Test the budgets declared in the views """
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=True)
+    def test_view_over_budget_fails(self):
+        """ Test a view over its budget fails when the budgets are enforced """
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/count/')
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=False)
+    def test_budget_not_enforced(self):
+        """ Test the budgets are ignored when they aren't enforced """
+        res = self.client.get('/count/')
+
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,133 @@
+"""
+    Tests for the orjson renderer and parser
+"""
+
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Recipe, Tag
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class ORJSONRendererTests(SimpleTestCase):
+    """ Test the output is the one of the DRF renderer """
+
+    def assertSameOutput(self, data, media_type=None, context=None):
+        expected = JSONRenderer().render(data, media_type, context)
+        rendered = ORJSONRenderer().render(data, media_type, context)
+        self.assertEqual(rendered, expected)
+        return rendered
+
+    def test_strings(self):
+        """ Test the escapes and the characters written as UTF-8 """
+        self.assertSameOutput({
+            'control': ''.join(chr(i) for i in range(32)),
+            'quotes': '"\\/\'',
+            'text': 'Crème brûlée 🍮 <b>&</b>',
+            'separators': 'line\u2028paragraph\u2029',
+        })
+
+    def test_types_of_the_drf_encoder(self):
+        """ Test the types converted by the DRF encoder """
+        self.assertSameOutput({
+            'decimal': Decimal('5.25'),
+            'datetime': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc,
+            ),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(3, 4, 5),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Not found'),
+            'bytes': b'abc',
+            'tuple': (1, 2),
+            'keys': {1: 'one', None: 'none'},
+        })
+
+    def test_numbers(self):
+        """ Test the integers, including the ones over 64 bits """
+        self.assertSameOutput([0, -1, 2 ** 63 - 1, 2 ** 64, 1.5, 0.1, True])
+
+    def test_indent_and_empty(self):
+        """ Test the indented output and None use the DRF renderer """
+        rendered = self.assertSameOutput(
+            {'a': [1]}, 'application/json; indent=2',
+        )
+        self.assertIn(b'\n', rendered)
+        self.assertSameOutput(None)
+
+    def test_without_orjson(self):
+        """ Test the renderer works without orjson """
+        with patch.object(renderers, 'orjson', None):
+            self.assertSameOutput({'price': Decimal('1.00')})
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class ORJSONParserTests(SimpleTestCase):
+    """ Test the parsed data is the one of the DRF parser """
+
+    def parse(self, parser, body, context=None):
+        return parser.parse(io.BytesIO(body), parser_context=context)
+
+    def assertSameData(self, body, context=None):
+        expected = self.parse(JSONParser(), body, context)
+        parsed = self.parse(ORJSONParser(), body, context)
+        self.assertEqual(parsed, expected)
+        self.assertEqual(
+            [type(value) for value in parsed],
+            [type(value) for value in expected],
+        )
+
+    def test_documents(self):
+        """ Test documents parsed by orjson and by the fallback """
+        self.assertSameData('[1, 1.5, "é", null, {"a": [true]}]'.encode())
+        self.assertSameData(f'[{2 ** 70}, "\\ud800"]'.encode())
+        self.assertSameData(
+            '["é"]'.encode('latin-1'), {'encoding': 'latin-1'},
+        )
+
+    def test_invalid_documents(self):
+        """ Test the invalid documents raise a ParseError """
+        for body in [b'[1,', b'[NaN]', b'\xff']:
+            with self.assertRaises(ParseError):
+                self.parse(ORJSONParser(), body)
+
+
+class ORJSONResponseTests(TestCase):
+    """ Test the API responses are the ones of the DRF renderer """
+
+    def test_recipe_list(self):
+        """ Test the recipe list is rendered byte for byte """
+        user = get_user_model().objects.create_user(
+            email='render@example.com',
+            password='pass1234',
+        )
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Crème brûlée',
+            time_minutes=30,
+            price=Decimal('7.10'),
+        )
+        recipe.tags.add(Tag.objects.create(user=user, name='Dessert'))
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(reverse('recipe:recipe-list'))
+
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
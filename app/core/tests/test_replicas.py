@@ -0,0 +1,168 @@
+"""
+    Tests for the reads on the replicas of the database
+"""
+
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.replicas import ReplicaRouter, get_read_database
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+# The test database is the only one, it stands for the replica
+REPLICA = DEFAULT_DB_ALIAS
+
+
+class ReplicaRouterTests(TestCase):
+    """ Test the decisions of the router """
+
+    def test_writes_to_primary(self):
+        """ Test the writes go to the primary out of any request """
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(Recipe))
+        self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS={'ALIASES': ['replica']})
+    def test_replicas_not_migrated(self):
+        """ Test the migrations only run on the primary """
+        router = ReplicaRouter()
+
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+        self.assertIsNone(router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+
+
+@override_settings(
+    DATABASE_REPLICAS={'ALIASES': [REPLICA], 'STICKY_SECONDS': 60},
+    LIST_CACHE={'ENABLED': False},
+)
+class ReplicaReadTests(TransactionTestCase):
+    """
+    Test the views read from the replicas - Not in the transaction of a
+    TestCase, which keeps the reads on the primary
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='replica@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+        self.read_databases = []
+        get_queryset = RecipeViewSet.get_queryset
+
+        def spy(view):
+            self.read_databases.append(get_read_database())
+            return get_queryset(view)
+
+        patcher = patch.object(RecipeViewSet, 'get_queryset', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_recipe(self, client):
+        res = client.post(RECIPES_URL, {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_reads_on_replica(self):
+        """ Test the safe requests read from a replica """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.read_databases, [REPLICA])
+        self.assertIsNone(get_read_database())
+
+    def test_reads_stick_to_primary_after_write(self):
+        """ Test the user who wrote reads from the primary """
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        ))
+
+        self.create_recipe(self.client)
+        self.client.get(RECIPES_URL)
+        other.get(RECIPES_URL)
+
+        self.assertEqual(self.read_databases, [None, REPLICA])
+
+    @override_settings(DATABASE_REPLICAS={
+        'ALIASES': [REPLICA], 'STICKY_SECONDS': 0,
+    })
+    def test_no_stickiness(self):
+        """ Test the reads go back to the replicas after the window """
+        self.create_recipe(self.client)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(self.read_databases, [REPLICA])
+
+    @override_settings(DATABASE_REPLICAS={'ALIASES': []})
+    def test_no_replicas(self):
+        """ Test everything is read from the primary without replicas """
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(self.read_databases, [None])
+
+    def test_reads_in_transaction_on_primary(self):
+        """ Test the reads in a transaction stay on the primary """
+        with transaction.atomic():
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(self.read_databases, [None])
+
+
+@skipUnless(
+    getattr(settings, 'DATABASE_REPLICAS', {}).get('ALIASES'),
+    'No replica configured in DB_REPLICA_HOSTS',
+)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """ Test the queries run on the configured replicas """
+
+    databases = '__all__'
+
+    def test_list_queries_on_replica(self):
+        """ Test the recipe list is read from the replica """
+        user = get_user_model().objects.create_user(
+            email='replica@example.com',
+            password='pass1234',
+        )
+        Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'),
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        counts = {}
+
+        def count(alias):
+            def wrapper(execute, sql, params, many, context):
+                counts[alias] = counts.get(alias, 0) + 1
+                return execute(sql, params, many, context)
+            return wrapper
+
+        replica = settings.DATABASE_REPLICAS['ALIASES'][0]
+        with override_settings(
+            DATABASE_REPLICAS={'ALIASES': [replica]},
+            LIST_CACHE={'ENABLED': False},
+        ), connections[replica].execute_wrapper(count(replica)):
+            res = client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertGreater(counts.get(replica, 0), 0)
@@ -0,0 +1,156 @@
+"""
+    Tests for the recipe counts of the tags
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Recipe, Tag
+
+
+class TagRecipeCountTests(TestCase):
+    """ Test the counts follow the changes of the recipe tags """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'counts@example.com',
+            'pass1234',
+        )
+        self.vegan, self.quick, self.dessert = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dessert')
+        ]
+        self.salad = self.create_recipe('Salad')
+        self.curry = self.create_recipe('Curry')
+
+    def create_recipe(self, title):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def assertCounts(self, vegan, quick, dessert):
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'recipe_count')),
+            {'Vegan': vegan, 'Quick': quick, 'Dessert': dessert},
+        )
+
+    def test_recipe_tags_add_remove_clear(self):
+        """ Test changing the tags of a recipe """
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry.tags.add(self.vegan)
+        # Already linked, not counted twice
+        self.salad.tags.add(self.vegan)
+        self.assertCounts(2, 1, 0)
+
+        # Not linked, not uncounted
+        self.salad.tags.remove(self.quick, self.dessert)
+        self.assertCounts(2, 0, 0)
+
+        self.curry.tags.clear()
+        self.assertCounts(1, 0, 0)
+
+        self.salad.tags.set([self.dessert])
+        self.assertCounts(0, 0, 1)
+
+    def test_tag_recipes_add_remove_clear(self):
+        """ Test changing the recipes of a tag """
+        self.vegan.recipe_set.add(self.salad, self.curry)
+        self.vegan.recipe_set.add(self.salad)
+        self.assertCounts(2, 0, 0)
+
+        self.vegan.recipe_set.remove(self.salad)
+        self.assertCounts(1, 0, 0)
+
+        self.quick.recipe_set.add(self.salad)
+        self.vegan.recipe_set.clear()
+        self.assertCounts(0, 1, 0)
+
+    def test_recipe_delete(self):
+        """ Test deleting a recipe uncounts its tags """
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry.tags.add(self.vegan)
+
+        self.salad.delete()
+
+        self.assertCounts(1, 0, 0)
+
+    def test_recipes_queryset_delete(self):
+        """ Test deleting recipes in bulk uncounts them in one query """
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry.tags.add(self.vegan)
+        recipes = [self.create_recipe(f'Soup {i}') for i in range(10)]
+        for recipe in recipes:
+            recipe.tags.add(self.dessert)
+
+        # The uncount, then the recipes and their links
+        with self.assertNumQueries(4):
+            Recipe.objects.filter(title__startswith='Soup').delete()
+        self.assertCounts(2, 1, 0)
+
+        Recipe.objects.filter(pk=self.salad.pk).delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_user_delete_not_uncounted(self):
+        """ Test the tags deleted with the user aren't uncounted first """
+        for i in range(10):
+            self.create_recipe(f'Soup {i}').tags.add(self.vegan)
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'pass1234',
+        )
+        tags = Tag.objects.filter(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ])
+
+        self.assertFalse(tags.exists())
+        self.assertTrue(get_user_model().objects.filter(pk=other.pk).exists())
+
+    def test_wrong_count_not_negative(self):
+        """ Test a count already wrong doesn't go below zero """
+        self.salad.tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=0)
+
+        self.salad.delete()
+
+        self.assertCounts(0, 0, 0)
+
+    def test_stale_tag_save(self):
+        """ Test saving a tag loaded before a change keeps the count """
+        self.salad.tags.add(self.vegan)
+
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+
+        self.vegan.refresh_from_db()
+        self.assertEqual(self.vegan.name, 'Plant based')
+        self.assertEqual(self.vegan.recipe_count, 1)
+
+    def test_repair_tag_counts(self):
+        """ Test the command repairs the wrong counts """
+        self.salad.tags.add(self.vegan, self.quick)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=7)
+        Tag.objects.filter(pk=self.dessert.pk).update(recipe_count=2)
+
+        out = StringIO()
+        call_command('repair_tag_counts', dry_run=True, stdout=out)
+        self.assertIn('3 tags checked, 2 wrong counts found', out.getvalue())
+        self.assertCounts(7, 1, 2)
+
+        out = StringIO()
+        call_command('repair_tag_counts', batch_size=1, stdout=out)
+        self.assertIn('2 wrong counts repaired', out.getvalue())
+        self.assertCounts(1, 1, 0)
@@ -0,0 +1,98 @@
+"""
+    Bulk writes of recipes
+
+    Used by the bulk endpoint of the RecipeViewSet to save many validated
+    recipes with a constant number of queries: the recipes, their tags and
+    the links between them are all written with bulk inserts/updates
+"""
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.cache import RECIPES, TAGS, invalidate_lists
+from core.models import Recipe, Tag
+
+
+def save_recipes(user, items):
+    """
+    Create or update the recipes of the user in a single transaction
+
+    items is a list of (recipe, validated_data): recipe is None for the new
+    recipes. The tags of a recipe are replaced only if 'tags' is in its
+    validated data. Return the saved recipes in the order of the items
+    """
+    RecipeTag = Recipe.tags.through
+
+    with transaction.atomic():
+        recipes = []
+        created = []
+        updated = []
+        updated_fields = set()
+        tag_names = {}
+
+        for recipe, validated_data in items:
+            data = dict(validated_data)
+            tags = data.pop('tags', None)
+            if recipe is None:
+                recipe = Recipe(user=user, **data)
+                created.append(recipe)
+            else:
+                for attr, value in data.items():
+                    setattr(recipe, attr, value)
+                updated_fields.update(data)
+                updated.append(recipe)
+            if tags is not None:
+                tag_names[id(recipe)] = [tag['name'] for tag in tags]
+            recipes.append(recipe)
+
+        if created:
+            if connection.features.can_return_rows_from_bulk_insert:
+                Recipe.objects.bulk_create(created)
+            else:
+                # The ids of the new recipes are needed to link their tags
+                for recipe in created:
+                    recipe.save()
+        if updated:
+            # bulk_update doesn't set the auto_now fields and the through
+            # table writes don't send m2m_changed
+            now = timezone.now()
+            for recipe in updated:
+                recipe.updated_at = now
+            Recipe.objects.bulk_update(
+                updated,
+                sorted(updated_fields | {'updated_at'}),
+            )
+
+        # Tags are resolved once for all the recipes
+        tags = {
+            tag.name: tag
+            for tag in Tag.objects.get_or_create_many(
+                user,
+                [name for names in tag_names.values() for name in names],
+            )
+        }
+
+        replaced = [
+            recipe.id for recipe in updated if id(recipe) in tag_names
+        ]
+        counted = {tag.id for tag in tags.values()}
+        if replaced:
+            old_links = RecipeTag.objects.filter(recipe_id__in=replaced)
+            counted.update(old_links.values_list('tag_id', flat=True))
+            old_links.delete()
+        RecipeTag.objects.bulk_create(
+            [
+                RecipeTag(recipe_id=recipe.id, tag_id=tags[name].id)
+                for recipe in recipes
+                for name in dict.fromkeys(tag_names.get(id(recipe), []))
+            ],
+            ignore_conflicts=True,
+        )
+
+        # The bulk writes don't send the signals which keep the counts of the
+        # tags and invalidate the lists
+        if counted:
+            Tag.objects.refresh_recipe_counts(counted)
+        invalidate_lists(user.pk, RECIPES, TAGS)
+
+    return recipes
@@ -0,0 +1,33 @@
+"""
+    Filters of the recipe list
+
+    The tag filters are EXISTS subqueries on the recipe tags table instead of
+    joins, so a recipe with many of the tags is returned once without a
+    DISTINCT over the whole result
+"""
+
+from django.db.models import Exists, OuterRef
+
+from core.models import Recipe
+
+ANY = 'any'
+ALL = 'all'
+
+
+def filter_by_tags(queryset, tag_ids, match=ANY):
+    """
+    Filter the recipes with any (match=ANY) or all (match=ALL) of the tags
+    """
+    RecipeTag = Recipe.tags.through
+
+    def has_tags(ids):
+        return Exists(RecipeTag.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=ids,
+        ))
+
+    if match == ALL:
+        for tag_id in tag_ids:
+            queryset = queryset.filter(has_tags([tag_id]))
+        return queryset
+    return queryset.filter(has_tags(tag_ids))
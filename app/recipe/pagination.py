@@ -0,0 +1,204 @@
+"""
+    Pagination for the Recipes API
+
+    Keyset (cursor) pagination: every page is fetched with a WHERE on the
+    ordering column of the last row instead of an OFFSET, so all the pages
+    cost the same no matter how deep the client has scrolled. The cursor is
+    opaque to the clients, they only follow the next/previous links
+"""
+
+import json
+import math
+
+from django.db import connection
+from django.db.models import (
+    BooleanField,
+    CharField,
+    F,
+    Func,
+    IntegerField,
+    Value,
+)
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class BaseCursorPagination(CursorPagination):
+    """ Cursor pagination with a page size chosen by the client """
+
+    # The default page size is PAGE_SIZE in the REST_FRAMEWORK settings
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class RowComparison(Func):
+    """
+    (a, b) < (x, y) in SQL - The rows are compared column by column, like the
+    keys of an index, so PostgreSQL seeks to the position in the index
+    """
+    output_field = BooleanField()
+
+    def __init__(self, fields, operator, values):
+        self.operator = operator
+        super().__init__(*map(F, fields), *map(Value, values))
+
+    def as_sql(self, compiler, connection):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        half = len(sqls) // 2
+        columns, values = ', '.join(sqls[:half]), ', '.join(sqls[half:])
+        return f'({columns}) {self.operator} ({values})', params
+
+
+class KeysetCursorPagination(BaseCursorPagination):
+    """
+    Cursor pagination on all the fields of the ordering
+
+    CursorPagination only keeps the first field in the cursor and skips the
+    rows which share its value with an OFFSET, which grows with the ties and
+    skips or repeats rows when the value changes between pages. Here the
+    cursor holds every field, so the ordering must be unique and all its
+    fields in the same direction
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            fields = [field.lstrip('-') for field in self.ordering]
+            descending = self.ordering[0].startswith('-')
+            queryset = queryset.filter(RowComparison(
+                fields,
+                '<' if descending != reverse else '>',
+                self._decode_position(position, [
+                    queryset.model._meta.get_field(field) for field in fields
+                ]),
+            ))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering,
+            )
+
+        started = position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = started, position
+            self.has_previous = following is not None
+            self.previous_position = following
+        else:
+            self.has_next = following is not None
+            self.next_position = following
+            self.has_previous, self.previous_position = started, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return json.dumps([instance[field] for field in fields])
+        return json.dumps([getattr(instance, field) for field in fields])
+
+    def _decode_position(self, position, fields):
+        """
+        Return the values of the fields in the position - The cursor comes
+        from the client, values the columns can't hold are a 404
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if (
+            not isinstance(values, list) or len(values) != len(fields)
+            or not all(map(self._valid_value, fields, values))
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _valid_value(field, value):
+        if isinstance(field, IntegerField):
+            low, high = connection.ops.integer_field_range(
+                field.get_internal_type(),
+            )
+            return (
+                isinstance(value, int) and not isinstance(value, bool)
+                and (low is None or value >= low)
+                and (high is None or value <= high)
+            )
+        if isinstance(field, CharField):
+            return isinstance(value, str) and '\x00' not in value
+        return False
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """
+    Pagination for the recipes, latest first - The results of a search are
+    ordered by rank, the id breaks the ties
+    """
+    ordering = '-id'
+    search_ordering = ('-rank', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+    def decode_cursor(self, request):
+        """ Return the cursor, its position must be an id or a rank """
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            if self.ordering[0].lstrip('-') == 'rank':
+                valid = math.isfinite(float(cursor.position))
+            else:
+                valid = 0 < int(cursor.position) < 2 ** 63
+        except ValueError:
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+class TagCursorPagination(KeysetCursorPagination):
+    """
+    Pagination for the tags, by name in reverse order (?ordering=name) or
+    with more recipes first (?ordering=count), the latest first among the
+    tags with as many recipes
+    """
+    ordering = ('-name', '-id')
+    orderings = {
+        'name': ('-name', '-id'),
+        'count': ('-recipe_count', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get('ordering', 'name')
+        if ordering not in self.orderings:
+            raise ValidationError({
+                'ordering': [_('Expected name or count')],
+            })
+        return self.orderings[ordering]
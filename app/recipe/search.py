@@ -0,0 +1,96 @@
+"""
+    Search of recipes and tags
+
+    The search document of a recipe is the search_vector column, kept up to
+    date by a trigger of the database and indexed with GIN. The text of the
+    clients is parsed like a web search: words, "quoted phrases", OR and
+    -excluded words
+
+    The tags are autocompleted with the trigram word similarity of pg_trgm
+    when the extension is installed, so misspelled names match too, and
+    with prefixes and substrings otherwise
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (
+    BooleanField,
+    Case,
+    F,
+    FloatField,
+    Func,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+# Text search configuration of the trigger of migration core 0008
+SEARCH_CONFIG = 'english'
+
+
+def search_recipes(queryset, text):
+    """
+    Filter the recipes matching the text and annotate their rank - The rank
+    is a double precision so it can be used as the position of a cursor
+    without losing precision on the way to the client and back
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+    )
+
+
+class WordSimilar(Func):
+    """ text <% name: the text is similar to a word of the name """
+    function = ''
+    arg_joiner = ' <%% '
+    output_field = BooleanField()
+
+
+class WordSimilarity(Func):
+    """ Similarity of the text to the most similar word of the name """
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+
+_trigram_available = {}
+
+
+def has_trigram(using):
+    """ Return if pg_trgm is installed in the database (cached) """
+    if using not in _trigram_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available[using] = cursor.fetchone() is not None
+    return _trigram_available[using]
+
+
+def autocomplete_tags(queryset, text, limit):
+    """
+    Return the best limit tags for the text - The tags starting with the
+    text go first, then by similarity and by number of recipes
+    """
+    queryset = queryset.annotate(
+        is_prefix=Case(
+            When(name__istartswith=text, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    )
+
+    if has_trigram(queryset.db):
+        text_value = Value(text)
+        queryset = queryset.filter(
+            Q(name__istartswith=text) | Q(WordSimilar(text_value, 'name')),
+        ).annotate(
+            similarity=WordSimilarity(text_value, 'name'),
+        ).order_by('-is_prefix', '-similarity', '-recipe_count', 'name')
+    else:
+        queryset = queryset.filter(
+            name__icontains=text,
+        ).order_by('-is_prefix', '-recipe_count', 'name')
+
+    return queryset[:limit]
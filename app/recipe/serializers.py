@@ -1,5 +1,8 @@
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
+from core.cache import TAGS, invalidate_lists
 from core.models import (
     Recipe,
     Tag,
@@ -11,8 +14,26 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
+
+    def validate_name(self, value):
+        """ Check the user doesn't have another tag with the same name """
+
+        # Nested in a recipe the tags are matched by name, not renamed
+        if self.root is not self:
+            return value
+
+        user = self.context['request'].user
+        tags = Tag.objects.filter(user=user, name=value)
+        if self.instance is not None:
+            tags = tags.exclude(pk=self.instance.pk)
+        if tags.exists():
+            raise serializers.ValidationError(
+                _('A tag with this name already exists'),
+            )
+
+        return value
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -25,14 +46,50 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
+        """Handle getting or creating tags as needed, in bulk."""
+        auth_user = self.context['request'].user
+        tag_objs = Tag.objects.get_or_create_many(
+            auth_user,
+            [tag['name'] for tag in tags],
+        )
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
+
+    def _set_tags(self, tags, recipe):
+        """
+        Replace the tags of the recipe - Only the links added and removed
+        are written, nothing if the tags are the same
+        """
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        tag_ids = {
+            tag.id for tag in Tag.objects.get_or_create_many(
+                auth_user,
+                [tag['name'] for tag in tags],
+            )
+        }
+        # Prefetched by the views
+        current_ids = {tag.id for tag in recipe.tags.all()}
+        added = tag_ids - current_ids
+        removed = current_ids - tag_ids
+        if not added and not removed:
+            return
+
+        # Written on the through table without m2m_changed: the counts of the
+        # tags are refreshed once and the recipe is saved by update()
+        RecipeTag = Recipe.tags.through
+        if removed:
+            RecipeTag.objects.filter(
+                recipe_id=recipe.id, tag_id__in=removed,
+            ).delete()
+        if added:
+            RecipeTag.objects.bulk_create(
+                [RecipeTag(recipe_id=recipe.id, tag_id=tag_id)
+                 for tag_id in added],
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+        Tag.objects.refresh_recipe_counts(added | removed)
+        getattr(recipe, '_prefetched_objects_cache', {}).pop('tags', None)
+        invalidate_lists(auth_user.pk, TAGS)
 
     def create(self, validated_data):
         """Create a recipe."""
@@ -46,8 +103,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         """Update recipe."""
         tags = validated_data.pop('tags', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_tags(tags, instance)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -0,0 +1,248 @@
+"""
+    Tests for the async recipe and tag views served under ASGI
+"""
+
+import asyncio
+import json
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import include, path, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.async_api import (
+    DatabaseExecutor,
+    async_patterns,
+    get_database_executor,
+    threaded_iterator,
+)
+from core.models import Recipe, Tag
+from core.query_budget import QueryBudgetExceeded
+from recipe import urls
+from recipe.views import RecipeViewSet
+
+urlpatterns = [
+    path('api/recipe/', include(
+        (async_patterns(urls.router.urls, urls.ASYNC_VIEWS), 'recipe'),
+    )),
+]
+
+
+# The views run their queries in other threads, which don't see the data
+# of the transaction of a TestCase
+@override_settings(
+    ROOT_URLCONF=__name__,
+    LIST_CACHE={'ENABLED': False},
+    ASYNC_API={'MAX_WORKERS': 2},
+)
+class AsyncApiTests(TransactionTestCase):
+    """ Test the async views answer as the sync ones """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='async@example.com',
+            password='pass1234',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick')
+        ]
+        self.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Soup {i}',
+                time_minutes=i,
+                price=Decimal('5.50'),
+            )
+            recipe.tags.add(*tags[i % 2:])
+            self.recipes.append(recipe)
+
+    async def get(self, url):
+        """ Return the response of the async views """
+        return await self.client.get(
+            url, authorization=f'Token {self.token.key}',
+        )
+
+    def sync_get(self, url):
+        """ Return the response of the sync views """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            with override_settings(ROOT_URLCONF='app.urls'):
+                return client.get(url)
+        finally:
+            # The test client leaves the connections of the thread open
+            connections.close_all()
+
+    def test_views_are_async(self):
+        """ Test only the list and detail views are made async """
+        views = {
+            pattern.name: pattern.callback
+            for pattern in urlpatterns[0].url_patterns
+        }
+
+        self.assertTrue(asyncio.iscoroutinefunction(views['recipe-list']))
+        self.assertTrue(asyncio.iscoroutinefunction(views['tag-detail']))
+        self.assertFalse(asyncio.iscoroutinefunction(views['recipe-bulk']))
+        self.assertIs(views['recipe-list'].cls, RecipeViewSet)
+
+    async def test_lists_and_details(self):
+        """ Test the async responses are the same as the sync ones """
+        urls = [
+            reverse('recipe:recipe-list'),
+            reverse('recipe:recipe-list') + '?tags_match=all',
+            reverse('recipe:recipe-detail', args=[self.recipes[0].id]),
+            reverse('recipe:tag-list'),
+            reverse('recipe:tag-list') + '?ordering=count',
+        ]
+
+        for url in urls:
+            res = await self.get(url)
+            expected = await asyncio.get_running_loop().run_in_executor(
+                None, self.sync_get, url,
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, expected.content)
+
+    async def test_not_found(self):
+        """ Test the errors of the views are answered """
+        res = await self.get(
+            reverse('recipe:recipe-detail', args=[self.recipes[-1].id + 1]),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_auth_required(self):
+        """ Test the async views authenticate the requests """
+        res = await AsyncClient().get(reverse('recipe:tag-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_export(self):
+        """ Test the export is streamed under ASGI """
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = await self.get(reverse('recipe:recipe-export'))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            # Iterated on the event loop, like the ASGI handler does
+            content = b''.join(res.streaming_content).decode()
+
+        titles = [json.loads(line)['title'] for line in content.splitlines()]
+        self.assertEqual(titles, ['Soup 2', 'Soup 1', 'Soup 0'])
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=True)
+    async def test_query_budget_enforced(self):
+        """ Test the queries of the async views are checked """
+        with patch.dict(RecipeViewSet.query_budgets, {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.get(reverse('recipe:recipe-list'))
+
+    async def test_queries_in_database_threads(self):
+        """ Test the views run in the threads of the database executor """
+        threads = set()
+        list_view = RecipeViewSet.list
+
+        def spy(view, request, *args, **kwargs):
+            threads.add(threading.current_thread().name)
+            return list_view(view, request, *args, **kwargs)
+
+        with patch.object(RecipeViewSet, 'list', spy):
+            await asyncio.gather(*[
+                self.get(reverse('recipe:recipe-list'))
+                for _ in range(6)
+            ])
+
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('db') for name in threads))
+        self.assertEqual(get_database_executor().max_workers, 2)
+
+
+class DatabaseExecutorTests(SimpleTestCase):
+    """ Test the pool running the database work of the async views """
+
+    def test_bounded(self):
+        """ Test no more than max_workers calls run at the same time """
+        executor = DatabaseExecutor(max_workers=2)
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            threading.Event().wait(0.02)
+            with lock:
+                running.pop()
+            return threading.current_thread().name
+
+        async def main():
+            return await asyncio.gather(
+                *[executor.run(work) for _ in range(8)]
+            )
+
+        try:
+            names = asyncio.run(main())
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(set(names)), 2)
+
+    def test_threaded_iterator(self):
+        """ Test the items are produced in a thread until it's closed """
+        produced = []
+        finished = threading.Event()
+
+        def numbers():
+            try:
+                for number in range(100):
+                    produced.append(threading.current_thread().name)
+                    yield number
+            finally:
+                finished.set()
+
+        executor = DatabaseExecutor(max_workers=1)
+        with patch('core.async_api.get_database_executor',
+                   return_value=executor):
+            try:
+                items = threaded_iterator(numbers(), buffer_size=2)
+                self.assertEqual([next(items), next(items)], [0, 1])
+                items.close()
+                self.assertTrue(finished.wait(5))
+            finally:
+                executor.shutdown()
+
+        self.assertLess(len(produced), 100)
+        self.assertTrue(all(name.startswith('db') for name in produced))
+
+    def test_threaded_iterator_error(self):
+        """ Test the errors of the iterable are raised to the consumer """
+        def failing():
+            yield 1
+            raise ValueError('broken')
+
+        executor = DatabaseExecutor(max_workers=1)
+        with patch('core.async_api.get_database_executor',
+                   return_value=executor):
+            try:
+                with self.assertRaisesMessage(ValueError, 'broken'):
+                    list(threaded_iterator(failing()))
+            finally:
+                executor.shutdown()
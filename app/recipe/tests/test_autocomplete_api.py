@@ -0,0 +1,111 @@
+"""
+    Tests for the tag autocomplete
+"""
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.search import has_trigram
+
+AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+
+
+class TagAutocompleteTests(TestCase):
+    """ Test the autocomplete of the tags """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='autocomplete@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tags(self, *names):
+        return [
+            Tag.objects.create(user=self.user, name=name) for name in names
+        ]
+
+    def use_tag(self, tag, times):
+        for _ in range(times):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title='Recipe',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            recipe.tags.add(tag)
+
+    def names(self, **params):
+        res = self.client.get(AUTOCOMPLETE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in res.data]
+
+    def test_prefix_ranked_by_usage(self):
+        """ Test the tags with the prefix are ranked by their recipes """
+        vegan, vegetarian, _ = self.create_tags(
+            'Vegan', 'Vegetarian', 'Dessert',
+        )
+        self.use_tag(vegetarian, 2)
+        self.use_tag(vegan, 1)
+
+        self.assertEqual(self.names(q='veg'), ['Vegetarian', 'Vegan'])
+
+    def test_limit(self):
+        """ Test the number of tags is limited """
+        self.create_tags('Soup', 'Sour', 'Soy')
+
+        self.assertEqual(len(self.names(q='so', limit=2)), 2)
+
+    def test_limited_to_user(self):
+        """ Test only the tags of the user are returned """
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        Tag.objects.create(user=other, name='Vegan')
+
+        self.assertEqual(self.names(q='veg'), [])
+
+    def test_invalid_params(self):
+        """ Test a missing text or an invalid limit are rejected """
+        for params in [{}, {'q': ' '}, {'q': 'a', 'limit': 0},
+                       {'q': 'a', 'limit': 'ten'}, {'q': 'a', 'limit': 51}]:
+            res = self.client.get(AUTOCOMPLETE_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params,
+            )
+
+    @override_settings(LIST_CACHE={'ENABLED': True})
+    def test_cached_until_tags_change(self):
+        """ Test the results are cached and invalidated by new tags """
+        self.create_tags('Vegan')
+        self.names(q='veg')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(q='veg'), ['Vegan'])
+
+        self.create_tags('Vegetarian')
+        self.assertEqual(self.names(q='veg'), ['Vegan', 'Vegetarian'])
+
+    def test_substring_without_trigram(self):
+        """ Test the tags containing the text follow the prefixes """
+        if has_trigram('default'):
+            self.skipTest('pg_trgm is installed')
+        self.create_tags('Pancake', 'Cake')
+
+        self.assertEqual(self.names(q='cake'), ['Cake', 'Pancake'])
+
+    def test_misspelled_with_trigram(self):
+        """ Test misspelled names match by similarity """
+        if not has_trigram('default'):
+            self.skipTest('pg_trgm is not installed')
+        self.create_tags('Chicken', 'Pork')
+
+        self.assertEqual(self.names(q='chiken'), ['Chicken'])
@@ -0,0 +1,178 @@
+"""
+    Tests for the bulk recipe API
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(i, tags=()):
+    """ Return the payload of a new recipe """
+    return {
+        'title': f'Recipe {i}',
+        'time_minutes': 10,
+        'price': '4.50',
+        'tags': [{'name': name} for name in tags],
+    }
+
+
+class BulkRecipeApiTests(TestCase):
+    """ Test creating and updating recipes in bulk """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='bulk@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, **params):
+        defaults = {
+            'title': 'Existing',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+        }
+        defaults.update(params)
+        return Recipe.objects.create(user=self.user, **defaults)
+
+    def test_bulk_create(self):
+        """ Test creating several recipes with tags """
+        payload = [
+            recipe_payload(1, ['Vegan', 'Lunch']),
+            recipe_payload(2, ['Vegan']),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([r['status'] for r in results], ['created'] * 2)
+        first = Recipe.objects.get(id=results[0]['id'])
+        self.assertEqual(first.user, self.user)
+        self.assertEqual(first.title, 'Recipe 1')
+        self.assertEqual(
+            sorted(first.tags.values_list('name', flat=True)),
+            ['Lunch', 'Vegan'],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_update(self):
+        """ Test updating recipes replaces only the fields sent """
+        recipe = self.create_recipe(link='https://example.com')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        untouched = self.create_recipe()
+        untouched.tags.add(Tag.objects.get(name='Old'))
+
+        payload = [
+            {'id': recipe.id, 'title': 'Updated', 'tags': [{'name': 'New'}]},
+            {'id': untouched.id, 'time_minutes': 50},
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in res.data['results']],
+            ['updated', 'updated'],
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Updated')
+        self.assertEqual(recipe.link, 'https://example.com')
+        self.assertEqual(list(recipe.tags.values_list('name', flat=True)),
+                         ['New'])
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.time_minutes, 50)
+        self.assertEqual(untouched.tags.count(), 1)
+
+    def test_bulk_errors_per_item(self):
+        """ Test invalid items are reported and the valid ones saved """
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        other_recipe = Recipe.objects.create(
+            user=other_user,
+            title='Other',
+            time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        payload = [
+            recipe_payload(1),
+            {'title': 'No time or price'},
+            {'id': other_recipe.id, 'title': 'Stolen'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['created', 'error', 'error'],
+        )
+        self.assertIn('time_minutes', results[1]['errors'])
+        self.assertIn('id', results[2]['errors'])
+        other_recipe.refresh_from_db()
+        self.assertEqual(other_recipe.title, 'Other')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_invalid_ids(self):
+        """ Test ids which aren't integers are reported per item """
+        recipe = self.create_recipe()
+        payload = [
+            {'id': [recipe.id], 'title': 'List'},
+            {'id': {}, 'title': 'Object'},
+            {'id': True, 'title': 'Bool'},
+            {'id': 2 ** 70, 'title': 'Too big'},
+            {'id': recipe.id, 'title': 'Updated'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['error'] * 4 + ['updated'],
+        )
+        for result in results[:4]:
+            self.assertIn('id', result['errors'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Updated')
+
+    def test_bulk_all_invalid(self):
+        """ Test a bad request is returned when no item is valid """
+        res = self.client.post(BULK_URL, [{'title': 'x'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_not_a_list(self):
+        """ Test the payload must be a list """
+        res = self.client.post(BULK_URL, recipe_payload(1), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_constant_queries(self):
+        """ Test the number of queries doesn't depend on the recipes sent """
+        def count_queries(n):
+            payload = [
+                recipe_payload(i, [f'Tag {i}', 'Common']) for i in range(n)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(count_queries(2), count_queries(40))
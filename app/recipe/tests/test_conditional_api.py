@@ -0,0 +1,137 @@
+"""
+    Tests for the conditional requests (ETag / Last-Modified)
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+def detail_url(recipe_id):
+    """ Create and return recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """ Test the unchanged responses are answered with a 304 """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='etag@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=Decimal('3.00'),
+        )
+        self.recipe.tags.add(self.tag)
+
+    def assertNotModified(self, url, etag):
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def assertModified(self, url, etag):
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_recipe_list_not_modified(self):
+        """ Test the list is answered with a 304 after one query """
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            self.assertNotModified(RECIPES_URL, res['ETag'])
+
+    def test_recipe_list_changes(self):
+        """ Test creating, deleting or retagging recipes changes the ETag """
+        etag = self.client.get(RECIPES_URL)['ETag']
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=5,
+            price=Decimal('3.00'),
+        )
+        self.assertModified(RECIPES_URL, etag)
+
+        etag = self.client.get(RECIPES_URL)['ETag']
+        recipe.delete()
+        self.assertModified(RECIPES_URL, etag)
+
+        etag = self.client.get(RECIPES_URL)['ETag']
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+        self.assertModified(RECIPES_URL, etag)
+
+    def test_query_params_change_etag(self):
+        """ Test the pages of a list have different ETags """
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.assertModified(RECIPES_URL + '?page_size=1', etag)
+
+    def test_recipe_detail(self):
+        """ Test the detail changes when the tags of the recipe change """
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        self.recipe.tags.remove(self.tag)
+        self.assertModified(url, etag)
+
+        etag = self.client.get(url)['ETag']
+        self.tag.recipe_set.add(self.recipe)
+        self.assertModified(url, etag)
+
+    def test_recipe_detail_not_found(self):
+        """ Test the recipes of other users are still not found """
+        res = self.client.get(detail_url(self.recipe.id + 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_updated_on_tags_change(self):
+        """ Test changing the tags updates the modification of the recipe """
+        before = self.recipe.updated_at
+
+        self.recipe.tags.clear()
+
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, before)
+
+    def test_tag_list(self):
+        """ Test the tag list is answered with a 304 until a tag changes """
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertNotModified(TAGS_URL, etag)
+
+        Tag.objects.create(user=self.user, name='Dinner')
+        self.assertModified(TAGS_URL, etag)
+
+    def test_me(self):
+        """ Test the user profile is answered with a 304 """
+        res = self.client.get(ME_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertNotModified(ME_URL, etag)
+        res = self.client.get(
+            ME_URL,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
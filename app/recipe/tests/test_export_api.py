@@ -0,0 +1,75 @@
+"""
+    Tests for the recipe export API
+"""
+
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer
+from recipe.views import RecipeViewSet
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class ExportRecipeApiTests(TestCase):
+    """ Test exporting the recipes as NDJSON """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='export@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def export(self):
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_recipes(self):
+        """ Test every recipe of the user is exported with its tags """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('2.50'),
+            )
+            recipe.tags.add(tag)
+            recipes.append(recipe)
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        Recipe.objects.create(
+            user=other_user,
+            title='Other',
+            time_minutes=5,
+            price=Decimal('2.50'),
+        )
+
+        # Chunks smaller than the number of recipes
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            lines = self.export()
+
+        recipes.reverse()
+        expected = RecipeDetailSerializer(recipes, many=True).data
+        self.assertEqual(lines, json.loads(json.dumps(expected)))
+
+    def test_export_empty(self):
+        """ Test exporting without recipes returns an empty body """
+        self.assertEqual(self.export(), [])
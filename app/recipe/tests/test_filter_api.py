@@ -0,0 +1,134 @@
+"""
+    Tests for the tag filters of the recipe list
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeTagFilterTests(TestCase):
+    """ Test the ?tags= parameter of the recipe list """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='filter@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+
+        self.salad = self.create_recipe('Salad', self.vegan, self.quick)
+        self.curry = self.create_recipe('Curry', self.vegan)
+        self.cake = self.create_recipe('Cake', self.dessert)
+        self.create_recipe('Steak')
+
+    def create_recipe(self, title, *tags):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def titles(self, **params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_filter_any(self):
+        """ Test the recipes with any of the tags are returned once """
+        titles = self.titles(tags=f'{self.vegan.id},{self.quick.id}')
+
+        self.assertEqual(titles, ['Curry', 'Salad'])
+
+    def test_filter_all(self):
+        """ Test the recipes with all the tags are returned """
+        titles = self.titles(
+            tags=f'{self.vegan.id},{self.quick.id}',
+            tags_match='all',
+        )
+
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_other_user_tag(self):
+        """ Test the tags of other users don't match anything """
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        tag = Tag.objects.create(user=other, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=other,
+            title='Other salad',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.tags.add(tag)
+
+        self.assertEqual(self.titles(tags=str(tag.id)), [])
+
+    def test_filter_with_search(self):
+        """ Test the tag filters combine with the search """
+        titles = self.titles(tags=str(self.vegan.id), search='curry')
+
+        self.assertEqual(titles, ['Curry'])
+
+    def test_filter_uses_exists(self):
+        """ Test the filter is a semi-join without DISTINCT """
+        with CaptureQueriesContext(connection) as queries:
+            self.titles(
+                tags=f'{self.vegan.id},{self.dessert.id}',
+                tags_match='all',
+            )
+
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if '"core_recipe"."title"' in query['sql']
+        )
+        self.assertEqual(sql.count('EXISTS'), 2)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_max_tags(self):
+        """ Test the number of tags of the filter is capped """
+        ids = [self.vegan.id] + [self.vegan.id + 1000 + i for i in range(49)]
+
+        res = self.client.get(RECIPES_URL, {'tags': ','.join(map(str, ids))})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        ids.append(self.vegan.id + 2000)
+        res = self.client.get(RECIPES_URL, {'tags': ','.join(map(str, ids))})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_invalid_filters(self):
+        """ Test invalid tags or match modes are rejected """
+        for params in [
+            {'tags': 'vegan'},
+            {'tags': ','},
+            {'tags': '-1'},
+            {'tags': str(2 ** 63)},
+            {'tags': ','.join(map(str, range(1, 52))), 'tags_match': 'all'},
+            {'tags': str(self.vegan.id), 'tags_match': 'some'},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params,
+            )
@@ -0,0 +1,98 @@
+"""
+    Tests for the read path of the recipe list without the serializer
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.listing import recipe_rows
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(LIST_CACHE={'ENABLED': False})
+class ValuesListParityTests(TestCase):
+    """ Test the list is the same with and without the serializer """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='listing@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Zesty', 'Árabe', 'Quick', 'Vegan')
+        ]
+        prices = ['0.10', '5.00', '999.99', '-3.50', '12.30']
+        for i, price in enumerate(prices * 3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Soup {i} – crème' if i % 2 else f'Stew {i}',
+                description='Slow cooked soup' if i % 3 else '',
+                time_minutes=i,
+                price=Decimal(price),
+                link='' if i % 2 else f'https://example.com/{i}',
+            )
+            recipe.tags.add(*tags[i % 4:][::-1])
+
+    def fetch_all(self, params):
+        """ Return the bodies of all the pages """
+        bodies = []
+        res = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            bodies.append(res.content)
+            if not res.data['next']:
+                return bodies
+            res = self.client.get(res.data['next'])
+
+    def test_same_responses(self):
+        """ Test the bodies are byte for byte the serializer ones """
+        tag = Tag.objects.get(name='Quick')
+        for params in [
+            {},
+            {'page_size': 4},
+            {'search': 'soup', 'page_size': 3},
+            {'tags': str(tag.id), 'page_size': 2},
+        ]:
+            fast = self.fetch_all(params)
+            with patch.object(RecipeViewSet, 'list_values', False):
+                slow = self.fetch_all(params)
+            self.assertEqual(fast, slow, params)
+
+    def test_same_data(self):
+        """ Test the rows are the data of the serializer """
+        recipes = Recipe.objects.order_by('-id')
+        expected = RecipeSerializer(
+            recipes.prefetch_related('tags'), many=True,
+        ).data
+
+        rows = recipe_rows(list(recipes.values(
+            'id', 'title', 'time_minutes', 'price', 'link',
+        )))
+
+        self.assertEqual(
+            rows,
+            [
+                {**recipe, 'tags': sorted(recipe['tags'],
+                                          key=lambda tag: tag['id'])}
+                for recipe in expected
+            ],
+        )
+        self.assertEqual(
+            [list(row) for row in rows],
+            [list(recipe) for recipe in expected],
+        )
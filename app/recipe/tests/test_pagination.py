@@ -0,0 +1,107 @@
+"""
+    Tests for the pagination of the recipes and tags APIs
+"""
+
+import base64
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationTests(TestCase):
+    """ Test the lists are paginated with a cursor """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='pages@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def fetch_all(self, url):
+        """ Follow the next links and return the pages """
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            url = res.data['next']
+        return pages
+
+    def test_recipes_paginated(self):
+        """ Test the recipes are returned in pages, latest first """
+        recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.00'),
+            )
+            for i in range(5)
+        ]
+
+        pages = self.fetch_all(RECIPES_URL + '?page_size=2')
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [recipe['id'] for page in pages for recipe in page]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_tags_paginated(self):
+        """ Test the tags are returned in pages, by name descending """
+        for name in ['Apple', 'Cake', 'Bread', 'Dinner']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.fetch_all(TAGS_URL + '?page_size=3')
+
+        self.assertEqual([len(page) for page in pages], [3, 1])
+        names = [tag['name'] for page in pages for tag in page]
+        self.assertEqual(names, ['Dinner', 'Cake', 'Bread', 'Apple'])
+
+    def test_page_size_capped(self):
+        """ Test the clients can't ask for pages over the maximum size """
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag {i:03}') for i in range(120)
+        )
+
+        res = self.client.get(TAGS_URL + '?page_size=1000')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 100)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """ Test an invalid cursor returns a not found error """
+        res = self.client.get(RECIPES_URL + '?cursor=invalid')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_cursor_position(self):
+        """ Test a cursor with a position which isn't an id or a rank """
+        cases = [
+            ({}, ['abc', '1e400', '1.5', '0', str(2 ** 63)]),
+            ({'search': 'soup'}, ['abc', '1e400', 'nan']),
+        ]
+
+        for params, positions in cases:
+            for position in positions:
+                cursor = base64.b64encode(
+                    urlencode({'p': position}).encode(),
+                ).decode()
+                res = self.client.get(
+                    RECIPES_URL, {**params, 'cursor': cursor},
+                )
+                self.assertEqual(
+                    res.status_code, status.HTTP_404_NOT_FOUND, position,
+                )
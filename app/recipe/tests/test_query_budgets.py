@@ -0,0 +1,137 @@
+"""
+    Test the recipe APIs stay within their query budgets
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def recipe_detail_url(recipe_id):
+    """ Create and return recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def tag_detail_url(tag_id):
+    """ Create and return tag detail URL """
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+@override_settings(QUERY_BUDGETS_ENFORCED=True)
+class RecipeQueryBudgetTests(TestCase):
+    """
+    Every request goes through QueryBudgetMiddleware, which raises an error
+    if the view runs more queries than its budget. The requests are
+    authenticated with a real token so its query is counted as well
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='budget@example.com',
+            password='pass1234',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            recipe.tags.add(*tags)
+        self.recipe = recipe
+        self.tag = tags[0]
+
+    def test_recipe_list(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_retrieve(self):
+        res = self.client.get(recipe_detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_create(self):
+        payload = {
+            'title': 'New recipe',
+            'time_minutes': 5,
+            'price': '2.50',
+            'tags': [{'name': 'Tag 1'}, {'name': 'New tag'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_recipe_update(self):
+        payload = {
+            'title': 'Updated recipe',
+            'time_minutes': 5,
+            'price': '2.50',
+            'tags': [{'name': 'Tag 1'}, {'name': 'New tag'}],
+        }
+        url = recipe_detail_url(self.recipe.id)
+        res = self.client.put(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_partial_update(self):
+        payload = {'tags': [{'name': 'Tag 2'}]}
+        url = recipe_detail_url(self.recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_destroy(self):
+        res = self.client.delete(recipe_detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_recipe_bulk(self):
+        payload = [
+            {'id': self.recipe.id, 'tags': [{'name': 'New tag'}]},
+            {
+                'title': 'New recipe',
+                'time_minutes': 5,
+                'price': '2.50',
+                'tags': [{'name': 'Tag 1'}],
+            },
+        ]
+        url = reverse('recipe:recipe-bulk')
+        res = self.client.post(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_list(self):
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_update(self):
+        url = tag_detail_url(self.tag.id)
+        res = self.client.patch(url, {'name': 'Renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_destroy(self):
+        res = self.client.delete(tag_detail_url(self.tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
@@ -4,7 +4,9 @@
 
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -302,3 +304,127 @@ class PrivateRecipeAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.tags.count(), 0)
+
+
+class RecipeTagsQueryCountTests(TestCase):
+    """ Test the number of queries needed to handle the tags of a recipe """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='tags@example.com', password='pass1234')
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, method, url, n_tags):
+        """ Send n_tags tags to the url and return the executed queries """
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+            'tags': [{'name': f'Tag {i}'} for i in range(n_tags)],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.client, method)(url, payload, format='json')
+
+        self.assertIn(res.status_code, (status.HTTP_200_OK,
+                                        status.HTTP_201_CREATED))
+        return len(queries)
+
+    def test_create_recipe_tags_constant_queries(self):
+        """ Creating a recipe runs the same queries for 1 or 30 tags """
+        few = self.count_queries('post', RECIPES_URL, 1)
+        many = self.count_queries('post', RECIPES_URL, 30)
+
+        self.assertEqual(few, many)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_create_recipe_existing_tags_constant_queries(self):
+        """ Reusing existing tags doesn't add queries per tag """
+        for i in range(30):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        few = self.count_queries('post', RECIPES_URL, 2)
+        many = self.count_queries('post', RECIPES_URL, 30)
+
+        self.assertEqual(few, many)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_update_recipe_tags_constant_queries(self):
+        """ Updating the tags of a recipe runs a constant number of queries """
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        few = self.count_queries('patch', url, 1)
+        recipe.tags.clear()
+        many = self.count_queries('patch', url, 30)
+
+        self.assertEqual(few, many)
+        self.assertEqual(recipe.tags.count(), 30)
+
+    def test_update_recipe_tags_diff(self):
+        """ Only the links of the tags added and removed are written """
+        kept, removed = Tag.objects.get_or_create_many(
+            self.user, ['Kept', 'Removed'],
+        )
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(kept, removed)
+        RecipeTag = Recipe.tags.through
+        kept_link = RecipeTag.objects.get(recipe=recipe, tag=kept)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        res = self.client.patch(
+            url, {'tags': [{'name': 'Kept'}, {'name': 'Added'}]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['tags']),
+            ['Added', 'Kept'],
+        )
+        self.assertEqual(
+            RecipeTag.objects.get(recipe=recipe, tag=kept).pk, kept_link.pk,
+        )
+        self.assertEqual(
+            dict(Tag.objects.filter(user=self.user).values_list(
+                'name', 'recipe_count',
+            )),
+            {'Kept': 1, 'Removed': 0, 'Added': 1},
+        )
+
+    def test_update_recipe_same_tags_no_write(self):
+        """ Sending the same tags doesn't write the links """
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(*Tag.objects.get_or_create_many(
+            self.user, ['Vegan', 'Quick'],
+        ))
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        table = Recipe.tags.through._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                url, {'tags': [{'name': 'Quick'}, {'name': 'Vegan'}]},
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([
+            query for query in queries
+            if table in query['sql'] and not query['sql'].startswith('SELECT')
+        ])
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_duplicated_tag_names(self):
+        """ Duplicated tag names in the payload create a single tag """
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
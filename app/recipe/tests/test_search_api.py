@@ -0,0 +1,133 @@
+"""
+    Tests for the full-text search of recipes
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, title, description=''):
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        description=description,
+        time_minutes=10,
+        price=Decimal('5.00'),
+    )
+
+
+class RecipeSearchTests(TestCase):
+    """ Test the ?search= parameter of the recipe list """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='search@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def titles(self, res):
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """ Test the recipes match by title or description, stemmed """
+        create_recipe(self.user, 'Tomato soup')
+        create_recipe(self.user, 'Pasta', 'Boil it with tomatoes')
+        create_recipe(self.user, 'Fried rice')
+
+        res = self.search('tomato')
+
+        self.assertEqual(self.titles(res), ['Tomato soup', 'Pasta'])
+
+    def test_title_ranked_over_description(self):
+        """ Test a match in the title ranks over one in the description """
+        create_recipe(self.user, 'Pasta', 'Served with a curry sauce')
+        create_recipe(self.user, 'Green curry')
+
+        res = self.search('curry')
+
+        self.assertEqual(self.titles(res), ['Green curry', 'Pasta'])
+
+    def test_search_syntax(self):
+        """ Test the phrases and excluded words of the web search syntax """
+        create_recipe(self.user, 'Chicken curry')
+        create_recipe(self.user, 'Curry chicken wings')
+
+        self.assertEqual(
+            self.titles(self.search('"chicken curry"')),
+            ['Chicken curry'],
+        )
+        self.assertEqual(
+            self.titles(self.search('curry -wings')),
+            ['Chicken curry'],
+        )
+
+    def test_search_follows_updates(self):
+        """ Test the search document is updated with the recipe """
+        recipe = create_recipe(self.user, 'Lentil soup')
+        recipe.title = 'Bean stew'
+        recipe.save()
+
+        self.assertEqual(self.titles(self.search('lentil')), [])
+        self.assertEqual(self.titles(self.search('beans')), ['Bean stew'])
+
+    def test_search_limited_to_user(self):
+        """ Test only the recipes of the user are searched """
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        create_recipe(other, 'Apple pie')
+        create_recipe(self.user, 'Apple crumble')
+
+        res = self.search('apple')
+
+        self.assertEqual(self.titles(res), ['Apple crumble'])
+
+    def test_blank_search_ignored(self):
+        """ Test a blank search returns the whole list """
+        create_recipe(self.user, 'Salad')
+
+        res = self.search('  ')
+
+        self.assertEqual(self.titles(res), ['Salad'])
+
+    def test_search_paginated(self):
+        """ Test the ranked results are paginated without gaps """
+        for i in range(4):
+            create_recipe(self.user, f'Bread {i}', 'Bake the bread')
+        for i in range(3):
+            create_recipe(self.user, f'Cake {i}', 'Bread crumbs on top')
+
+        ids = []
+        res = self.search('bread', page_size=2)
+        while True:
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = Recipe.objects.filter(
+            title__startswith='Bread',
+        ).order_by('-id')
+        self.assertEqual(len(set(ids)), 7)
+        self.assertEqual(
+            ids[:4],
+            [recipe.id for recipe in expected],
+        )
@@ -0,0 +1,187 @@
+"""
+    Tests for the recipe counts of the tags API
+"""
+
+import base64
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class TagRecipeCountApiTests(TestCase):
+    """ Test the counts of the tags API """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='counts@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, tags):
+        payload = {
+            'title': 'Recipe',
+            'time_minutes': 10,
+            'price': Decimal('5.00'),
+            'tags': [{'name': name} for name in tags],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def counts(self, **params):
+        res = self.client.get(TAGS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [
+            (tag['name'], tag['recipe_count'])
+            for tag in res.data['results']
+        ]
+
+    def test_counts_follow_recipe_writes(self):
+        """ Test creating, updating and deleting recipes changes the counts """
+        first = self.create_recipe(['Vegan', 'Quick'])
+        self.create_recipe(['Vegan'])
+        self.assertEqual(self.counts(), [('Vegan', 2), ('Quick', 1)])
+
+        url = reverse('recipe:recipe-detail', args=[first])
+        self.client.patch(url, {'tags': [{'name': 'Dessert'}]}, format='json')
+        self.assertEqual(
+            self.counts(),
+            [('Vegan', 1), ('Quick', 0), ('Dessert', 1)],
+        )
+
+        self.client.delete(url)
+        self.assertEqual(
+            self.counts(),
+            [('Vegan', 1), ('Quick', 0), ('Dessert', 0)],
+        )
+
+    def test_counts_follow_bulk_writes(self):
+        """ Test the bulk endpoint keeps the counts """
+        recipe = self.create_recipe(['Vegan'])
+
+        self.client.post(reverse('recipe:recipe-bulk'), [
+            {'id': recipe, 'tags': [{'name': 'Quick'}]},
+            {'title': 'New', 'time_minutes': 5, 'price': '1.00',
+             'tags': [{'name': 'Quick'}, {'name': 'Vegan'}]},
+        ], format='json')
+
+        self.assertEqual(self.counts(), [('Vegan', 1), ('Quick', 2)])
+
+    def test_assigned_only(self):
+        """ Test listing only the tags with recipes """
+        self.create_recipe(['Vegan'])
+        Tag.objects.create(user=self.user, name='Unused')
+
+        self.assertEqual(self.counts(assigned_only=1), [('Vegan', 1)])
+        self.assertEqual(len(self.counts(assigned_only=0)), 2)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_by_count(self):
+        """ Test listing the tags with more recipes first, in pages """
+        self.create_recipe(['Apple', 'Banana'])
+        self.create_recipe(['Banana'])
+        self.create_recipe(['Banana', 'Cherry'])
+        self.create_recipe(['Cherry'])
+
+        names = []
+        res = self.client.get(TAGS_URL, {'ordering': 'count', 'page_size': 1})
+        while True:
+            names += [tag['name'] for tag in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(names, ['Banana', 'Cherry', 'Apple'])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'size'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_by_count_ties(self):
+        """ Test the tags with as many recipes are paged without an OFFSET """
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+        Tag.objects.filter(pk=tags[2].pk).update(recipe_count=3)
+
+        pages = []
+        res = self.client.get(TAGS_URL, {'ordering': 'count', 'page_size': 2})
+        while True:
+            pages.append([tag['name'] for tag in res.data['results']])
+            if not res.data['next']:
+                break
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(res.data['next'])
+            self.assertFalse(any(
+                'OFFSET' in query['sql'] for query in queries.captured_queries
+            ))
+
+        self.assertEqual(
+            pages,
+            [['Tag 2', 'Tag 4'], ['Tag 3', 'Tag 1'], ['Tag 0']],
+        )
+
+        # And back
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Tag 3', 'Tag 1'],
+        )
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Tag 2', 'Tag 4'],
+        )
+        self.assertIsNone(res.data['previous'])
+
+    def test_invalid_cursor(self):
+        """ Test a cursor with a wrong position is not found """
+        Tag.objects.create(user=self.user, name='Vegan')
+        positions = {
+            'count': [
+                'notjson', '[1]', '["x", 1]', '[{"x": 1}, 1]',
+                f'["x", {2 ** 70}]', f'[1, {2 ** 70}]', '[true, 1]',
+                '[1.5, 1]', '[null, 1]',
+            ],
+            'name': ['[1, 1]', '["a\\u0000", 1]', '["a", "1"]'],
+        }
+
+        for ordering, values in positions.items():
+            for position in values:
+                cursor = base64.b64encode(
+                    urlencode({'p': position}).encode(),
+                ).decode()
+                res = self.client.get(
+                    TAGS_URL, {'ordering': ordering, 'cursor': cursor},
+                )
+                self.assertEqual(
+                    res.status_code, status.HTTP_404_NOT_FOUND, position,
+                )
+
+    def test_recipe_count_read_only(self):
+        """ Test the count can't be written """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        self.client.patch(
+            reverse('recipe:tag-detail', args=[tag.id]),
+            {'recipe_count': 10},
+        )
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+        self.assertFalse(Recipe.objects.exists())
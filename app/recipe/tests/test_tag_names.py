@@ -0,0 +1,76 @@
+"""
+    Tests for the uniqueness of the tag names
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class TagNameTests(TestCase):
+    """ Test a user can't have two tags with the same name """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='names@example.com',
+            password='pass1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_duplicated_tag_error(self):
+        """ Test the database rejects a duplicated tag """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user=self.user, name='Vegan')
+
+    def test_same_name_other_user(self):
+        """ Test other users can have a tag with the same name """
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='pass1234',
+        )
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=other, name='Vegan')
+
+        self.assertEqual(Tag.objects.filter(name='Vegan').count(), 2)
+
+    def test_rename_to_existing_name_error(self):
+        """ Test renaming a tag to the name of another tag fails """
+        Tag.objects.create(user=self.user, name='Vegan')
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        res = self.client.patch(url, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dinner')
+
+    def test_recipe_reuses_existing_tag(self):
+        """ Test a recipe with an existing tag name doesn't duplicate it """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Salad',
+            'time_minutes': 5,
+            'price': Decimal('3.00'),
+            'tags': [{'name': 'Vegan'}, {'name': 'Lunch'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertIn(tag, recipe.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
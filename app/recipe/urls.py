@@ -9,6 +9,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
+from core.async_api import async_patterns, get_async_api_config
 from recipe import views
 
 router = DefaultRouter()
@@ -16,8 +17,16 @@ router = DefaultRouter()
 router.register('recipes', views.RecipeViewSet)
 router.register('tags', views.TagViewSet)
 
+# Views served asynchronously under ASGI (core.async_api), the writes of
+# these URLs as well as their reads
+ASYNC_VIEWS = ('recipe-list', 'recipe-detail', 'tag-list', 'tag-detail')
+
 app_name = 'recipe'
 
+routes = router.urls
+if get_async_api_config()['ENABLED']:
+    routes = async_patterns(routes, ASYNC_VIEWS)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(routes)),
 ]
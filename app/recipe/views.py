@@ -2,29 +2,86 @@
     Views for the Recipes API
 """
 
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import (
+    Count,
+    Max,
+    Prefetch,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
+
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
+from core.async_api import threaded_iterator
+from core.authentication import CachedTokenAuthentication
+from core.cache import RECIPES, TAGS, CachedListMixin, get_list_cache
+from core.conditional import ConditionalGetMixin, collections_state
+from core.metrics import TimedSerializerMixin
 from core.models import Recipe, Tag
+from core.replicas import ReplicaReadMixin
 from recipe import serializers
+from recipe.bulk import save_recipes
+from recipe.filters import ALL, ANY, filter_by_tags
+from recipe.listing import ValuesListMixin
+from recipe.pagination import RecipeCursorPagination, TagCursorPagination
+from recipe.search import autocomplete_tags, search_recipes
+
+# The tags of the recipes in the order of recipe.listing
+TAGS_BY_ID = Prefetch('tags', queryset=Tag.objects.order_by('id'))
 
 """
     ModelViewSet is specific to CRUD Operations with Models
 """
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    ConditionalGetMixin,
+                    CachedListMixin,
+                    ValuesListMixin,
+                    TimedSerializerMixin,
+                    viewsets.ModelViewSet):
     """ View for manage recipe APIs"""
 
+    list_cache_kind = RECIPES
+
     serializer_class = serializers.RecipeDetailSerializer
 
     # Queryset represents the objects which are available for all the viewset
     queryset = Recipe.objects.all()
 
     # In order to use every endpoint the user must be authenticated -> This can be proved with this two classes
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+
+    # Maximum number of queries per action (see core.query_budget) - The
+    # token authentication query is included
+    query_budgets = {
+        'list': 4,
+        'retrieve': 4,
+        'create': 10,
+        'update': 11,
+        'partial_update': 11,
+        'destroy': 6,
+        'bulk': 13,
+    }
+
+    # Maximum number of recipes in a request to the bulk endpoint
+    bulk_max_items = 500
+
+    # Maximum number of tags of ?tags=, with ?tags_match=all every one is a
+    # subquery
+    filter_max_tags = 50
+
+    # Number of recipes read from the database cursor at once by the export
+    export_chunk_size = 2000
 
     """
         To obtain the recipes of the autenticated users there must be the queryset filtered
@@ -32,13 +89,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """ Retrieve recipes for authenticated user """
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        # The tags are loaded in a single query for all the recipes
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).prefetch_related(TAGS_BY_ID).order_by('-id')
+
+        if self.action != 'list':
+            return queryset
+
+        # ?tags=1,4,7 filters the list by the ids of the tags, any of them
+        # by default or all of them with ?tags_match=all
+        tags = self.request.query_params.get('tags', '').strip()
+        if tags:
+            queryset = filter_by_tags(
+                queryset,
+                self._get_tag_ids(tags),
+                self._get_tags_match(),
+            )
+
+        # ?search= filters the list with the full-text search, best first
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = search_recipes(queryset, search).order_by(
+                '-rank', '-id',
+            )
+        return queryset
+
+    def _get_tag_ids(self, tags):
+        try:
+            ids = [
+                int(tag_id) for tag_id in tags.split(',') if tag_id.strip()
+            ]
+        except ValueError:
+            ids = []
+        ids = list(dict.fromkeys(ids))
+        # Out of the range of the id column the query would fail
+        if (
+            not ids or len(ids) > self.filter_max_tags
+            or not all(0 < tag_id < 2 ** 63 for tag_id in ids)
+        ):
+            raise ValidationError({
+                'tags': [_('Expected a list of ids separated by commas')],
+            })
+        return ids
+
+    def _get_tags_match(self):
+        match = self.request.query_params.get('tags_match', ANY)
+        if match not in (ANY, ALL):
+            raise ValidationError({
+                'tags_match': [
+                    _('Expected %(any)s or %(all)s') % {'any': ANY, 'all': ALL}
+                ],
+            })
+        return match
 
     """
         Overwritting the method that uses Django to obtain the serializers to modify therefore, everytime the detail endpoint
         is called, is going to be used the Detail Serializer
     """
 
+    def get_conditional_state(self):
+        """ Return the state of the list or the recipe for the ETag """
+        if self.action == 'list':
+            # The tags are part of the recipes - Renaming or deleting one
+            # changes the list too
+            return collections_state(self.request.user, Recipe, Tag)
+
+        try:
+            states = list(Recipe.objects.filter(
+                pk=self.kwargs['pk'],
+                user=self.request.user,
+            ).order_by().values('updated_at').annotate(
+                tags_last=Max('tags__updated_at'),
+                tags_count=Count('tags'),
+            ))
+        except (ValueError, TypeError):
+            states = None
+        if not states:
+            # Not found, the view returns the 404
+            return None
+
+        state = states[0]
+        last_modified = max(
+            filter(None, [state['updated_at'], state['tags_last']])
+        )
+        return last_modified, sorted(state.items())
+
     def get_serializer_class(self):
         """ Return the serializer class for detail request """
         if self.action == 'list':
@@ -49,18 +185,226 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """ Create a new recipe """
         serializer.save(user=self.request.user)
 
+    @staticmethod
+    def _is_recipe_id(value):
+        # Not a bool, and in the range of the id column
+        return (
+            isinstance(value, int) and not isinstance(value, bool)
+            and 0 < value < 2 ** 63
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create or update a list of recipes in a single transaction
+
+        Items with an id update that recipe (only the fields sent, like a
+        PATCH), items without it create a new one. Invalid items are reported
+        in the results and the valid ones are saved
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(_('Expected a list of recipes'))
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                _('A request can save at most %(max)d recipes')
+                % {'max': self.bulk_max_items}
+            )
 
-class TagViewSet(mixins.DestroyModelMixin,
+        # The recipes to update are loaded in a single query
+        ids = [
+            item['id'] for item in items
+            if isinstance(item, dict) and self._is_recipe_id(item.get('id'))
+        ]
+        instances = {}
+        if ids:
+            instances = Recipe.objects.filter(user=request.user).in_bulk(ids)
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            instance = None
+            if isinstance(item, dict) and 'id' in item:
+                if not self._is_recipe_id(item['id']):
+                    results.append({
+                        'index': index,
+                        'status': 'error',
+                        'errors': {'id': [_('A valid integer is required.')]},
+                    })
+                    continue
+                instance = instances.get(item['id'])
+                if instance is None:
+                    results.append({
+                        'index': index,
+                        'status': 'error',
+                        'errors': {'id': [_('Not found')]},
+                    })
+                    continue
+
+            serializer = self.get_serializer(
+                instance,
+                data=item,
+                partial=instance is not None,
+            )
+            if not serializer.is_valid():
+                results.append({
+                    'index': index,
+                    'status': 'error',
+                    'errors': serializer.errors,
+                })
+                continue
+
+            result = {
+                'index': index,
+                'status': 'created' if instance is None else 'updated',
+            }
+            results.append(result)
+            valid.append((result, instance, serializer.validated_data))
+
+        recipes = save_recipes(
+            request.user,
+            [(instance, data) for result, instance, data in valid],
+        )
+        for (result, instance, data), recipe in zip(valid, recipes):
+            result['id'] = recipe.id
+
+        response_status = status.HTTP_200_OK
+        if items and not valid:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=response_status)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream all the recipes of the user as newline-delimited JSON, one
+        recipe per line in the format of the detail endpoint
+        """
+        lines = self._export_lines()
+        if isinstance(request._request, ASGIRequest):
+            # Iterated by the ASGI handler on the event loop
+            lines = threaded_iterator(lines)
+        response = StreamingHttpResponse(
+            lines,
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
+    def _export_lines(self):
+        """
+        Generate the lines of the export - The recipes are read through a
+        server-side cursor and their tags are fetched once per chunk, so the
+        memory used doesn't depend on the number of recipes
+        """
+        recipes = Recipe.objects.filter(
+            user=self.request.user,
+        ).order_by('-id').iterator(chunk_size=self.export_chunk_size)
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+        chunk = []
+        for recipe in recipes:
+            chunk.append(recipe)
+            if len(chunk) == self.export_chunk_size:
+                yield self._export_chunk(chunk, encoder)
+                chunk = []
+        if chunk:
+            yield self._export_chunk(chunk, encoder)
+
+    def _export_chunk(self, recipes, encoder):
+        prefetch_related_objects(recipes, TAGS_BY_ID)
+        serializer = serializers.RecipeDetailSerializer(recipes, many=True)
+        return ''.join(
+            encoder.encode(data) + '\n' for data in serializer.data
+        )
+
+
+class TagViewSet(ReplicaReadMixin,
+                 ConditionalGetMixin,
+                 CachedListMixin,
+                 TimedSerializerMixin,
+                 mixins.DestroyModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.ListModelMixin,
                  viewsets.GenericViewSet):
     """ Manage Tags in the database """
-    serializers_class = serializers.TagSerializer
+    serializer_class = serializers.TagSerializer
+    list_cache_kind = TAGS
     queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TagCursorPagination
+    query_budgets = {
+        'list': 3,
+        'update': 4,
+        'partial_update': 4,
+        'destroy': 4,
+        'autocomplete': 3,
+    }
+
+    # Number of tags returned by the autocomplete, by default and at most
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+
+    # Seconds the autocomplete results are cached - The UI asks for the same
+    # prefixes on every keystroke, and the changes of the tags invalidate them
+    autocomplete_cache_timeout = 30
+
+    def get_conditional_state(self):
+        """ Return the state of the tags of the user for the ETag """
+        return collections_state(self.request.user, Tag)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Return the tags best matching ?q=, ranked by similarity and by
+        number of recipes - ?limit= sets the number of tags
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text or len(text) > 255:
+            raise ValidationError({
+                'q': [_('Expected between 1 and 255 characters')],
+            })
+        try:
+            limit = int(request.query_params.get(
+                'limit', self.autocomplete_limit,
+            ))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= self.autocomplete_max_limit:
+            raise ValidationError({
+                'limit': [
+                    _('Expected a number between 1 and %(max)d')
+                    % {'max': self.autocomplete_max_limit}
+                ],
+            })
+
+        cache = get_list_cache()
+        if cache is not None:
+            data = cache.get(TAGS, request)
+            if data is not None:
+                return Response(data)
+
+        tags = autocomplete_tags(
+            Tag.objects.filter(user=request.user), text, limit,
+        )
+        data = self.get_serializer(tags, many=True).data
+        if cache is not None:
+            cache.set(TAGS, request, data, self.autocomplete_cache_timeout)
+        return Response(data)
 
     # Retrieving only the Tags which are created by the user - Ordering by name make sure that is DB agnostic
     def get_queryset(self):
         """ Retrieve recipes for authenticated user """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(
+            user=self.request.user,
+        ).order_by('-name')
+
+        # ?assigned_only=1 lists only the tags used by some recipe
+        assigned_only = self.request.query_params.get('assigned_only', '0')
+        if assigned_only not in ('0', '1'):
+            raise ValidationError({'assigned_only': [_('Expected 0 or 1')]})
+        if self.action == 'list' and assigned_only == '1':
+            queryset = queryset.filter(recipe_count__gt=0)
+        return queryset
@@ -0,0 +1,59 @@
+"""
+    Test the user APIs stay within their query budgets
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+@override_settings(QUERY_BUDGETS_ENFORCED=True)
+class UserQueryBudgetTests(TestCase):
+    """ Requests over the budget of their view raise an error """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_user(self):
+        return get_user_model().objects.create_user(
+            email='budget@example.com',
+            password='pass1234',
+            name='Budget',
+        )
+
+    def test_create_user(self):
+        payload = {
+            'email': 'new@example.com',
+            'password': 'pass1234',
+            'name': 'New',
+        }
+        res = self.client.post(CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_token(self):
+        self.create_user()
+
+        payload = {'email': 'budget@example.com', 'password': 'pass1234'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_me(self):
+        token = Token.objects.create(user=self.create_user())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        payload = {'name': 'Other', 'password': 'new1234'}
+        res = self.client.patch(ME_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
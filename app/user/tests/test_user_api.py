@@ -6,9 +6,12 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.authentication import get_token_cache
+
 # Creating a URL Path for the user/create Endpoint
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -188,3 +191,48 @@ class PrivateApiTests(TestCase):
         self.assertEqual(self.user.name, payload['email'])
         self.assertEqual(self.user.password, payload['password'])
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CachedUserApiTests(TestCase):
+    """ Test updating the user authenticated from the token cache """
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user(
+            email='cached@example.com',
+            password='testpass123',
+            name='Cached',
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # Cached by the first request
+        self.client.get(ME_URL)
+
+    def test_update_keeps_changes_behind_cache(self):
+        """ Test an update doesn't write back the cached fields """
+        # Changed by another process, without clearing this cache
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password='changed-elsewhere',
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'Renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Renamed')
+        self.assertEqual(self.user.password, 'changed-elsewhere')
+
+    def test_update_deactivated_behind_cache(self):
+        """ Test a user deactivated by another process can't update """
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False, password='changed-elsewhere',
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'Renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.name, 'Cached')
+        self.assertEqual(self.user.password, 'changed-elsewhere')
@@ -2,40 +2,72 @@
     View for the User API
 """
 
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext as _
+
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.conditional import ConditionalGetMixin
+from core.metrics import TimedSerializerMixin
+from core.replicas import ReplicaReadMixin
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(TimedSerializerMixin, generics.CreateAPIView):
     """ Create a new User in the System """
     serializer_class = UserSerializer
+    query_budgets = {'post': 2}
 
 
 # Built in View for Token
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(TimedSerializerMixin, ObtainAuthToken):
     """ Create a new token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    query_budgets = {'post': 5}
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin,
+                     ConditionalGetMixin,
+                     TimedSerializerMixin,
+                     generics.RetrieveUpdateAPIView):
     """ Manage authenticated user """
 
-    user_serializer = UserSerializer
+    serializer_class = UserSerializer
 
     # To manage the authentication of the users
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     # Authorization Management
     permission_classes = [permissions.IsAuthenticated]
 
+    query_budgets = {'get': 1, 'put': 5, 'patch': 5}
+
+    def get_conditional_state(self):
+        """ The authenticated user is already loaded, no query is needed """
+        user = self.request.user
+        return user.updated_at, (user.pk, user.updated_at)
+
     # Overwrittes the get_object which get the objects which are passed into the HTTP Request
     def get_object(self):
         """ Retrieve and return the authenticated user """
 
         # Returns the user object which is authenticated - Then is going to be sent to the serializer and later on
         # promted
-        return self.request.user
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+
+        # The authenticated user can come from the token cache of the process
+        # and be older than the database - Saving it would undo the changes
+        # of the other processes, like a new password or a deactivation
+        user = get_user_model().objects.filter(
+            pk=self.request.user.pk, is_active=True,
+        ).first()
+        if user is None:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user